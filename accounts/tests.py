@@ -1,3 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils.translation import gettext
 
-# Create your tests here.
+User = get_user_model()
+
+
+class UserListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        User.objects.bulk_create([
+            User(username=f'student{i:02d}', email=f'student{i:02d}@example.com', password='!')
+            for i in range(55)
+        ])
+        self.client.force_login(self.admin)
+
+    def test_pages_by_cursor_and_shows_the_total(self):
+        response = self.client.get(reverse('accounts:user_list'))
+        self.assertEqual(response.status_code, 200)
+        page = response.context['users']
+        self.assertEqual(len(page), 50)
+        self.assertEqual(page.paginator.count, 56)
+        self.assertContains(response, f'56 {gettext("users")}')
+
+        response = self.client.get(reverse('accounts:user_list'), {'cursor': page.next_cursor})
+        self.assertEqual(len(response.context['users']), 6)
+
+    def test_total_follows_the_filters(self):
+        response = self.client.get(reverse('accounts:user_list'), {'q': 'student0'})
+        self.assertEqual(response.context['users'].paginator.count, 10)
@@ -6,10 +6,11 @@ from django.utils.translation import gettext_lazy as _
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt, csrf_protect
-from django.core.paginator import Paginator
+from core.pagination import paginate
 from django.db.models import Q, Count, Sum
 from django.utils import timezone
 from django.conf import settings
+import hashlib
 import json
 from datetime import timedelta
 
@@ -364,10 +365,8 @@ def notifications_view(request):
     """View all notifications"""
     notifications = UserNotification.objects.filter(user=request.user)
     
-    # Pagination
-    paginator = Paginator(notifications, 20)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination
+    page_obj = paginate(request, notifications, 20)
     
     return render(request, 'accounts/notifications.html', {
         'notifications': page_obj,
@@ -623,10 +622,8 @@ def activity_view(request):
     if date_to:
         activities = activities.filter(created_at__date__lte=date_to)
     
-    # Pagination
-    paginator = Paginator(activities, 50)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination
+    page_obj = paginate(request, activities, 50)
     
     # Activity stats
     stats = {
@@ -866,10 +863,11 @@ def user_list(request):
     if user_type:
         users = users.filter(user_type=user_type)
     
-    # Pagination
-    paginator = Paginator(users, 50)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination; the exact total is cached per filter combination
+    filters = request.GET.copy()
+    filters.pop('cursor', None)
+    count_key = 'user_list:count:' + hashlib.md5(filters.urlencode().encode('utf-8')).hexdigest()
+    page_obj = paginate(request, users, 50, count_key=count_key)
     
     return render(request, 'accounts/admin/user_list.html', {
         'users': page_obj,
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
-from .models import Advertisement, AdPlacement
+from .models import Advertisement, AdPlacement, AdDailyStat
 
 @admin.register(AdPlacement)
 class AdPlacementAdmin(admin.ModelAdmin):
@@ -54,3 +54,18 @@ class AdvertisementAdmin(admin.ModelAdmin):
             # يمكنك إضافة منطق هنا عند إنشاء إعلان جديد
             pass
         super().save_model(request, obj, form, change)
+
+
+@admin.register(AdDailyStat)
+class AdDailyStatAdmin(admin.ModelAdmin):
+    list_display = ('date', 'ad', 'placement', 'impressions', 'clicks', 'get_ctr')
+    list_filter = ('date', 'placement')
+    search_fields = ('ad__title',)
+    date_hierarchy = 'date'
+    readonly_fields = ('ad', 'placement', 'date', 'impressions', 'clicks')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
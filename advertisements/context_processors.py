@@ -4,21 +4,12 @@ def ad_context(request):
     """
     معالج سياق لإضافة معلومات الإعلانات إلى جميع القوالب
     """
-    from django.core.cache import cache
-    from django.utils import timezone
+    from .serving import ad_index
     
     context = {}
     
-    # إضافة تعداد الإعلانات النشطة (مخبأ لأداء أفضل)
+    # إضافة تعداد الإعلانات النشطة من فهرس الإعلانات في الذاكرة
     if request.user.is_authenticated and request.user.user_type in ['admin', 'editor']:
-        cache_key = 'active_ads_count'
-        active_count = cache.get(cache_key)
-        
-        if active_count is None:
-            from .models import Advertisement
-            active_count = sum(1 for ad in Advertisement.objects.all() if ad.is_active())
-            cache.set(cache_key, active_count, 300)  # 5 دقائق
-        
-        context['active_ads_count'] = active_count
+        context['active_ads_count'] = len(ad_index.snapshot().live)
     
     return context
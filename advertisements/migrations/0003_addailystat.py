@@ -0,0 +1,32 @@
+# Generated by Django 5.2.10 on 2026-10-17 02:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisements', '0002_advertisement_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('impressions', models.PositiveIntegerField(default=0, verbose_name='Impressions')),
+                ('clicks', models.PositiveIntegerField(default=0, verbose_name='Clicks')),
+                ('ad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='advertisements.advertisement', verbose_name='Advertisement')),
+                ('placement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='advertisements.adplacement', verbose_name='Ad Placement')),
+            ],
+            options={
+                'verbose_name': 'Ad Daily Stat',
+                'verbose_name_plural': 'Ad Daily Stats',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date', 'placement'], name='advertiseme_date_66c526_idx')],
+                'unique_together': {('ad', 'placement', 'date')},
+            },
+        ),
+    ]
@@ -1,9 +1,9 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
-from django.core.cache import cache
 from django.utils import timezone
 import uuid
 from articles.models import Tag
+from core.cache_versions import bump
 
 class AdPlacement(models.Model):
     PLACEMENT_CHOICES = [
@@ -48,7 +48,7 @@ class AdPlacement(models.Model):
     def save(self, *args, **kwargs):
         # مسح الكاش عند حفظ التغييرات
         super().save(*args, **kwargs)
-        cache.delete(f'ad_{self.code}_*')
+        bump(f'placement:{self.code}')
 
 class Advertisement(models.Model):
     AD_TYPE_CHOICES = [
@@ -122,16 +122,18 @@ class Advertisement(models.Model):
         return self.active and self.start_date <= now <= self.end_date
     
     def record_impression(self):
-        """تسجيل ظهور للإعلان"""
+        """تسجيل ظهور للإعلان (عبر المخزن المؤقت بدون كتابة فورية)"""
+        from .stats import record_event, IMPRESSION
+        record_event(self.id, self.placement_id, IMPRESSION)
         self.impressions += 1
         self.last_impression = timezone.now()
-        self.save(update_fields=['impressions', 'last_impression'])
     
     def record_click(self):
-        """تسجيل نقرة على الإعلان"""
+        """تسجيل نقرة على الإعلان (عبر المخزن المؤقت بدون كتابة فورية)"""
+        from .stats import record_event, CLICK
+        record_event(self.id, self.placement_id, CLICK)
         self.clicks += 1
         self.last_click = timezone.now()
-        self.save(update_fields=['clicks', 'last_click'])
     
     def get_ctr(self):
         """حساب نسبة النقر للظهور"""
@@ -139,6 +141,18 @@ class Advertisement(models.Model):
             return (self.clicks / self.impressions) * 100
         return 0
     
+    def get_content_for_api(self):
+        """محتوى الإعلان حسب نوعه (رابط الصورة، النص، كود HTML أو رابط الفيديو)"""
+        if self.ad_type == 'banner' and self.image:
+            return self.image.url
+        if self.ad_type == 'text':
+            return self.text_content
+        if self.ad_type == 'html':
+            return self.html_code
+        if self.ad_type == 'video':
+            return self.video_url
+        return ''
+    
     def days_remaining(self):
         """عدد الأيام المتبقية حتى انتهاء الإعلان"""
         if self.end_date:
@@ -182,13 +196,41 @@ class Advertisement(models.Model):
         # تنظيف البيانات قبل الحفظ
         self.clean()
         
-        # مسح الكاش عند الحفظ
+        # مسح كاش المكان القديم عند نقل الإعلان
         if self.pk:
-            old_ad = Advertisement.objects.get(pk=self.pk)
-            if old_ad.placement != self.placement:
-                cache.delete(f'ad_{old_ad.placement.code}_*')
+            old_ad = Advertisement.objects.select_related('placement').filter(pk=self.pk).first()
+            if old_ad and old_ad.placement_id != self.placement_id:
+                bump(f'placement:{old_ad.placement.code}')
         
         super().save(*args, **kwargs)
         
         # مسح كاش المكان الجديد
-        cache.delete(f'ad_{self.placement.code}_*')
\ No newline at end of file
+        bump(f'placement:{self.placement.code}')
+
+class AdDailyStat(models.Model):
+    """إحصائيات الظهور والنقر اليومية لكل إعلان في كل مكان"""
+    ad = models.ForeignKey(Advertisement, on_delete=models.CASCADE, related_name='daily_stats',
+                           verbose_name=_('Advertisement'))
+    placement = models.ForeignKey(AdPlacement, on_delete=models.CASCADE, related_name='daily_stats',
+                                  verbose_name=_('Ad Placement'))
+    date = models.DateField(verbose_name=_('Date'))
+    impressions = models.PositiveIntegerField(default=0, verbose_name=_('Impressions'))
+    clicks = models.PositiveIntegerField(default=0, verbose_name=_('Clicks'))
+    
+    class Meta:
+        ordering = ['-date']
+        verbose_name = _('Ad Daily Stat')
+        verbose_name_plural = _('Ad Daily Stats')
+        unique_together = ['ad', 'placement', 'date']
+        indexes = [
+            models.Index(fields=['date', 'placement']),
+        ]
+    
+    def __str__(self):
+        return f'{self.ad} @ {self.placement} on {self.date}'
+    
+    def get_ctr(self):
+        """حساب نسبة النقر للظهور لهذا اليوم"""
+        if self.impressions > 0:
+            return (self.clicks / self.impressions) * 100
+        return 0
@@ -0,0 +1,153 @@
+"""
+اختيار الإعلانات عشوائياً بوزن الأولوية
+
+جداول alias (طريقة Walker/Vose) تُبنى مرة واحدة لكل قائمة مرشحين في لقطة
+فهرس الإعلانات، ثم يتم اختيار N إعلانات مختلفة في O(N) بغض النظر عن عدد
+الحملات. يدعم المولد بذرة ثابتة للاختبارات، وتحديد عدد مرات الظهور لكل زائر.
+"""
+import hashlib
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# عدد المحاولات الإضافية قبل الرجوع للاختيار الكامل عند كثرة التكرار أو الاستبعاد
+MAX_REJECTION_FACTOR = 8
+
+_rng = random.Random(getattr(settings, 'AD_SAMPLER_SEED', None))
+
+
+def seed(value):
+    """تثبيت بذرة المولد الافتراضي (للاختبارات)"""
+    _rng.seed(value)
+
+
+def weight(ad):
+    return max(ad.priority, 1)
+
+
+class AliasTable:
+    """جدول alias لقائمة ثابتة من الإعلانات موزونة بالأولوية"""
+
+    __slots__ = ('items', 'ids', '_prob', '_alias')
+
+    def __init__(self, items):
+        self.items = list(items)
+        self.ids = frozenset(ad.id for ad in self.items)
+        n = len(self.items)
+        self._prob = [1.0] * n
+        self._alias = list(range(n))
+        if not n:
+            return
+
+        weights = [weight(ad) for ad in self.items]
+        total = float(sum(weights))
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self._prob[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+
+    def __len__(self):
+        return len(self.items)
+
+    def draw(self, rng=None):
+        """اختيار عنصر واحد في O(1)"""
+        rng = rng or _rng
+        i = int(rng.random() * len(self.items))
+        if rng.random() >= self._prob[i]:
+            i = self._alias[i]
+        return self.items[i]
+
+    def sample(self, count, rng=None, exclude=frozenset()):
+        """
+        اختيار count إعلانات مختلفة بوزن الأولوية
+        exclude: معرفات إعلانات مستبعدة (مثل التي بلغت حد الظهور للزائر)
+        """
+        rng = rng or _rng
+        exclude = self.ids & exclude
+        available = len(self.items) - len(exclude)
+        count = min(count, available)
+        if count <= 0:
+            return []
+
+        # الرفض يصبح مكلفاً عندما يقترب العدد المطلوب من عدد المرشحين
+        if count * 2 > available:
+            candidates = [ad for ad in self.items if ad.id not in exclude]
+            return ordered_sample(candidates, count, rng)
+
+        chosen = []
+        seen = set(exclude)
+        for _ in range(count * MAX_REJECTION_FACTOR):
+            ad = self.draw(rng)
+            if ad.id in seen:
+                continue
+            seen.add(ad.id)
+            chosen.append(ad)
+            if len(chosen) == count:
+                return chosen
+
+        candidates = [ad for ad in self.items if ad.id not in seen]
+        return chosen + ordered_sample(candidates, count - len(chosen), rng)
+
+
+def ordered_sample(candidates, count, rng=None):
+    """اختيار موزون بدون تكرار بمفاتيح Efraimidis-Spirakis (لقوائم صغيرة)"""
+    rng = rng or _rng
+    keyed = sorted(
+        candidates,
+        key=lambda ad: rng.random() ** (1.0 / weight(ad)),
+        reverse=True,
+    )
+    return keyed[:count]
+
+
+def visitor_key(request):
+    """بصمة مختصرة للزائر لتحديد مرات الظهور"""
+    session_key = getattr(getattr(request, 'session', None), 'session_key', None)
+    if session_key:
+        raw = session_key
+    else:
+        raw = '{}|{}'.format(
+            request.META.get('REMOTE_ADDR', ''),
+            request.META.get('HTTP_USER_AGENT', ''),
+        )
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+class FrequencyCap:
+    """حد أقصى لمرات ظهور الإعلان الواحد للزائر داخل نافذة زمنية ثابتة"""
+
+    def _setting(self, name, default):
+        return getattr(settings, f'AD_FREQUENCY_{name}', default)
+
+    @property
+    def enabled(self):
+        return bool(self._setting('CAP', None))
+
+    def _key(self, visitor):
+        window = self._setting('WINDOW', 3600)
+        return f'ads:cap:{visitor}:{int(time.time() // window)}'
+
+    def seen(self, visitor):
+        """عدد مرات ظهور كل إعلان للزائر في النافذة الحالية"""
+        return cache.get(self._key(visitor)) or {}
+
+    def exhausted(self, counts):
+        limit = self._setting('CAP', None)
+        return frozenset(ad_id for ad_id, n in counts.items() if n >= limit)
+
+    def record(self, visitor, counts, ads):
+        # قيمة واحدة لكل زائر: قراءة وكتابة واحدة لكل طلب، والدقة هنا تقريبية
+        for ad in ads:
+            counts[ad.id] = counts.get(ad.id, 0) + 1
+        cache.set(self._key(visitor), counts, self._setting('WINDOW', 3600))
+
+
+frequency_cap = FrequencyCap()
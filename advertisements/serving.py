@@ -0,0 +1,216 @@
+"""
+فهرس الإعلانات القابلة للعرض داخل ذاكرة العملية
+
+تُبنى لقطة الفهرس باستعلام واحد وتجمع الإعلانات النشطة حسب كود المكان
+ومعرف الوسم المستهدف، فيصبح اختيار الإعلانات في كل طلب مجرد بحث في
+قواميس ثم اختيار عشوائي موزون من جداول alias محسوبة مسبقاً (sampling).
+يتم تحديث اللقطة عند تغيّر رقم الإصدار المشترك في الكاش (تزيده إشارات
+الحفظ والحذف)، أو عند الوصول إلى أقرب تاريخ بداية أو نهاية لإعلان، أو عند
+انتهاء مدة صلاحيتها.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Advertisement
+from .sampling import AliasTable, frequency_cap
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'ads:index_version'
+
+# الحد الأقصى لجداول alias المحفوظة لتركيبات الوسوم داخل اللقطة الواحدة
+MAX_CACHED_TABLES = 1024
+
+
+class AdSnapshot:
+    """نسخة ثابتة من الإعلانات القابلة للعرض مجمعة للبحث السريع"""
+
+    def __init__(self, version, ads, now):
+        self.version = version
+        self.built_at = time.monotonic()
+        # كل الإعلانات غير المنتهية (ومنها المجدولة) للتحقق حسب المعرف
+        self.ads = ads
+
+        self.live = []
+        self.by_placement = defaultdict(list)
+        self.by_tag = defaultdict(list)
+        self.untargeted = []
+        self.placements = {}
+
+        boundaries = []
+        for ad in sorted(ads.values(), key=lambda ad: ad.priority, reverse=True):
+            if ad.start_date > now:
+                boundaries.append(ad.start_date)
+                continue
+            boundaries.append(ad.end_date)
+
+            self.live.append(ad)
+            self.placements[ad.placement.code] = ad.placement
+            self.by_placement[ad.placement.code].append(ad)
+            for tag_id in ad.targeted_tag_ids:
+                self.by_tag[tag_id].append(ad)
+            if not ad.targeted_tag_ids:
+                self.untargeted.append(ad)
+
+        # اللقطة صالحة حتى أقرب بداية أو نهاية لإعلان
+        self.valid_until = min(boundaries) if boundaries else None
+
+        # جداول الأماكن تُحسب مسبقاً، وجداول تركيبات الوسوم عند أول طلب
+        self._tables = {
+            (code, None, True): AliasTable(placement_ads)
+            for code, placement_ads in self.by_placement.items()
+        }
+        self._tables[(None, None, True)] = AliasTable(self.live)
+
+    def is_current(self, now):
+        return self.valid_until is None or now < self.valid_until
+
+    def candidates(self, placement_code=None, tag_ids=None, include_untargeted=True):
+        """الإعلانات النشطة المطابقة للمكان و/أو الوسوم"""
+        if tag_ids is None:
+            if placement_code is None:
+                return self.live
+            return self.by_placement.get(placement_code, [])
+
+        seen = set()
+        matched = []
+        for tag_id in tag_ids:
+            for ad in self.by_tag.get(tag_id, ()):
+                if ad.id not in seen:
+                    seen.add(ad.id)
+                    matched.append(ad)
+        if include_untargeted:
+            matched.extend(self.untargeted)
+
+        if placement_code is not None:
+            matched = [ad for ad in matched if ad.placement.code == placement_code]
+        return matched
+
+    def table(self, placement_code=None, tag_ids=None, include_untargeted=True):
+        """جدول alias لقائمة المرشحين (محفوظ داخل اللقطة)"""
+        if tag_ids is not None:
+            tag_ids = tuple(sorted(set(tag_ids)))
+        key = (placement_code, tag_ids, include_untargeted)
+        table = self._tables.get(key)
+        if table is None:
+            table = AliasTable(self.candidates(placement_code, tag_ids, include_untargeted))
+            if len(self._tables) < MAX_CACHED_TABLES:
+                self._tables[key] = table
+        return table
+
+
+class AdIndex:
+    """فهرس الإعلانات مع إعادة بناء كسولة عند تغيّر الإصدار أو حدود الجدولة"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._checked_at = 0.0
+
+    def _setting(self, name, default):
+        return getattr(settings, f'AD_INDEX_{name}', default)
+
+    def _shared_version(self):
+        return cache.get(VERSION_KEY, 0)
+
+    @property
+    def version(self):
+        """رقم الإصدار المشترك (يتغير عند أي تعديل على الإعلانات)"""
+        return self._shared_version()
+
+    def invalidate(self):
+        """زيادة رقم الإصدار المشترك وإسقاط لقطة هذه العملية"""
+        if not cache.add(VERSION_KEY, 1, None):
+            try:
+                cache.incr(VERSION_KEY)
+            except ValueError:
+                cache.add(VERSION_KEY, 1, None)
+        with self._lock:
+            self._snapshot = None
+
+    def _is_fresh(self, snapshot):
+        now = time.monotonic()
+        if now - snapshot.built_at >= self._setting('TTL', 300):
+            return False
+        if not snapshot.is_current(timezone.now()):
+            return False
+        # فحص الإصدار المشترك مرة كل فترة قصيرة فقط
+        if now - self._checked_at < self._setting('CHECK_INTERVAL', 5):
+            return True
+        self._checked_at = now
+        return snapshot.version == self._shared_version()
+
+    def _build(self):
+        version = self._shared_version()
+        now = timezone.now()
+        ads = {}
+        for ad in Advertisement.objects.filter(
+            active=True,
+            end_date__gte=now,
+        ).select_related('placement').prefetch_related('tags'):
+            ad.targeted_tag_ids = frozenset(tag.id for tag in ad.tags.all())
+            ads[ad.id] = ad
+        return AdSnapshot(version, ads, now)
+
+    def snapshot(self):
+        """اللقطة الحالية، مع إعادة بنائها عند الحاجة"""
+        snapshot = self._snapshot
+        if snapshot is not None and self._is_fresh(snapshot):
+            return snapshot
+
+        # خيط واحد يعيد البناء، والبقية تستمر باللقطة القديمة إن وجدت
+        if not self._lock.acquire(blocking=snapshot is None):
+            return snapshot
+        try:
+            if self._snapshot is not None and self._snapshot is not snapshot:
+                return self._snapshot
+            try:
+                self._snapshot = self._build()
+            except Exception:
+                logger.exception('Failed to build advertisement index')
+                if snapshot is None:
+                    raise
+                return snapshot
+            self._checked_at = time.monotonic()
+            return self._snapshot
+        finally:
+            self._lock.release()
+
+    def get(self, ad_id):
+        """الإعلان حسب المعرف، أو None إذا لم يكن ضمن الإعلانات القابلة للعرض"""
+        return self.snapshot().ads.get(ad_id)
+
+    def select(self, placement_code=None, count=1, tag_ids=None, include_untargeted=True,
+               visitor=None, rng=None):
+        """
+        اختيار count إعلانات نشطة مختلفة بوزن الأولوية
+        tag_ids: تقييد الاختيار بالإعلانات المستهدفة لهذه الوسوم
+        include_untargeted: إضافة الإعلانات غير المستهدفة لأي وسم
+        visitor: بصمة الزائر (sampling.visitor_key) لتطبيق حد مرات الظهور
+        rng: مولد عشوائي بديل (random.Random) لنتائج قابلة للتكرار
+        """
+        table = self.snapshot().table(placement_code, tag_ids, include_untargeted)
+        if not table:
+            return []
+
+        if visitor is None or not frequency_cap.enabled:
+            return table.sample(count, rng)
+
+        counts = frequency_cap.seen(visitor)
+        ads = table.sample(count, rng, exclude=frequency_cap.exhausted(counts))
+        if ads:
+            frequency_cap.record(visitor, counts, ads)
+        return ads
+
+    def placements(self):
+        """الأماكن التي تحتوي على إعلانات نشطة حالياً"""
+        return self.snapshot().placements
+
+
+ad_index = AdIndex()
@@ -1,7 +1,8 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
-from django.core.cache import cache
+from core.cache_versions import bump
 from .models import Advertisement, AdPlacement
+from .serving import ad_index
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,12 +12,14 @@ def clear_ad_cache_on_save(sender, instance, **kwargs):
     """
     مسح الكاش عند حفظ إعلان جديد أو تعديله
     """
+    ad_index.invalidate()
+    
     if instance.placement:
         # مسح كاش هذا المكان المحدد
-        cache.delete(f'ad_{instance.placement.code}_*')
+        bump(f'placement:{instance.placement.code}')
     
     # مسح إحصائيات الكاش
-    cache.delete('active_ads_count')
+    bump('ads')
     logger.info(f'Ad cache cleared after save: {instance.title}')
 
 @receiver(post_delete, sender=Advertisement)
@@ -24,10 +27,12 @@ def clear_ad_cache_on_delete(sender, instance, **kwargs):
     """
     مسح الكاش عند حذف إعلان
     """
+    ad_index.invalidate()
+    
     if instance.placement:
-        cache.delete(f'ad_{instance.placement.code}_*')
+        bump(f'placement:{instance.placement.code}')
     
-    cache.delete('active_ads_count')
+    bump('ads')
     logger.info(f'Ad cache cleared after delete: {instance.title}')
 
 @receiver(post_save, sender=AdPlacement)
@@ -36,5 +41,14 @@ def clear_placement_cache(sender, instance, **kwargs):
     """
     مسح كاش الأماكن عند التغيير
     """
-    cache.delete(f'ad_{instance.code}_*')
+    ad_index.invalidate()
+    bump(f'placement:{instance.code}')
     logger.info(f'Placement cache cleared: {instance.code}')
+
+@receiver(m2m_changed, sender=Advertisement.tags.through)
+def refresh_index_on_targeting_change(sender, instance, action, **kwargs):
+    """
+    تحديث فهرس الإعلانات عند تغيير الوسوم المستهدفة
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        ad_index.invalidate()
@@ -0,0 +1,71 @@
+"""
+أماكن الإعلانات في الصفحات المخزنة (hole punching)
+
+كل إعلان يُعرض داخل علامتين تصفان اختياره (المكان، العدد، الوسوم، ترتيبه في
+الاختيار). عند تخزين الصفحة في الكاش يُستبدل الإعلان بفجوة تحمل نفس الوصف،
+وعند خدمتها من الكاش تُملأ كل فجوة بإعلان مختار لهذا الزائر (مع حد مرات
+الظهور)، فلا يرى كل الزوار الإعلان الذي اختير لأول زائر.
+"""
+import json
+import re
+
+from .serving import ad_index
+from .utils import generate_ad_code
+
+_SLOT = re.compile(r'<!--ad-slot:(\{[^>]*?\})-->.*?<!--/ad-slot-->', re.DOTALL)
+_HOLE = re.compile(r'<!--ad-hole:(\{[^>]*?\})-->')
+
+
+def ad_html(ad):
+    return generate_ad_code(ad.ad_type, ad.get_content_for_api(), ad.link, ad.id)
+
+
+def _spec(placement, count, tag_ids, include_untargeted):
+    return {
+        'p': placement,
+        'n': count,
+        't': sorted(tag_ids) if tag_ids else None,
+        'u': include_untargeted,
+    }
+
+
+def _select(spec, visitor):
+    return ad_index.select(
+        spec['p'], spec['n'], tag_ids=spec['t'], include_untargeted=spec['u'], visitor=visitor
+    )
+
+
+def _wrap(spec, index, html):
+    marker = json.dumps({**spec, 'i': index}, separators=(',', ':'))
+    return f'<!--ad-slot:{marker}-->{html}<!--/ad-slot-->'
+
+
+def select_slots(placement, count=1, visitor=None, tag_ids=None, include_untargeted=True):
+    """
+    HTML إعلانات المكان لهذا الطلب، قائمة بطول count دائماً
+    الأماكن الفارغة حالياً تبقى فجوات قد تُملأ عند الخدمة من الكاش
+    """
+    spec = _spec(placement, count, tag_ids, include_untargeted)
+    ads = _select(spec, visitor)
+    return [_wrap(spec, index, ad_html(ads[index]) if index < len(ads) else '') for index in range(count)]
+
+
+def punch_holes(content):
+    """استبدال الإعلانات المعروضة بفجوات قبل التخزين"""
+    return _SLOT.sub(lambda match: f'<!--ad-hole:{match.group(1)}-->', content)
+
+
+def fill_holes(content, visitor=None):
+    """ملء الفجوات بإعلانات هذا الزائر (اختيار واحد لكل مكان مشترك بين فجواته)"""
+    selections = {}
+
+    def fill(match):
+        marker = json.loads(match.group(1))
+        index = marker.pop('i')
+        key = json.dumps(marker, sort_keys=True)
+        if key not in selections:
+            selections[key] = _select(marker, visitor)
+        ads = selections[key]
+        return ad_html(ads[index]) if index < len(ads) else ''
+
+    return _HOLE.sub(fill, content)
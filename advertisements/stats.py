@@ -0,0 +1,140 @@
+"""
+عدادات الظهور والنقر للإعلانات
+
+تُجمع الأحداث في مخازن مؤقتة (core.counters) ثم تُكتب على دفعات:
+- الإجماليات على Advertisement بجمل UPDATE ... SET impressions = impressions + n
+- الصفوف اليومية (إعلان × مكان × يوم) بـ bulk_create للصفوف الناقصة ثم زيادتها بـ F()
+  بجملة UPDATE واحدة لكل قيمة زيادة مشتركة
+تقارير الفترات تُجمع في قاعدة البيانات (GROUP BY) وليس في Python.
+"""
+from collections import defaultdict
+from datetime import date, datetime
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from core.counters import UPDATE_CHUNK_SIZE, CounterBuffer
+from .models import Advertisement, AdDailyStat
+
+IMPRESSION = 'i'
+CLICK = 'c'
+
+# الحقل الإجمالي وحقل آخر وقت لكل نوع حدث
+TOTAL_FIELDS = {
+    IMPRESSION: ('impressions', 'last_impression'),
+    CLICK: ('clicks', 'last_click'),
+}
+
+
+def apply_total_increments(batch):
+    """تطبيق زيادات (إعلان، نوع) على إجماليات Advertisement"""
+    # last_impression/last_click تأخذ وقت التفريغ وليس وقت الحدث بالضبط
+    now = timezone.now()
+    grouped = defaultdict(lambda: defaultdict(list))
+    for (ad_id, kind), n in batch.items():
+        grouped[kind][n].append(int(ad_id))
+
+    with transaction.atomic():
+        for kind, by_increment in grouped.items():
+            field, stamp_field = TOTAL_FIELDS[kind]
+            for n, ad_ids in by_increment.items():
+                Advertisement.objects.filter(pk__in=ad_ids).update(
+                    **{field: F(field) + n, stamp_field: now}
+                )
+
+
+def apply_daily_increments(batch):
+    """تطبيق زيادات (إعلان، مكان، يوم، نوع) على جدول AdDailyStat"""
+    rows = defaultdict(lambda: {IMPRESSION: 0, CLICK: 0})
+    for (ad_id, placement_id, day, kind), n in batch.items():
+        rows[(int(ad_id), int(placement_id), day)][kind] += n
+
+    rows = {
+        (ad_id, placement_id, date.fromisoformat(day)): counts
+        for (ad_id, placement_id, day), counts in rows.items()
+    }
+
+    with transaction.atomic():
+        AdDailyStat.objects.bulk_create(
+            [AdDailyStat(ad_id=ad_id, placement_id=placement_id, date=day) for ad_id, placement_id, day in rows],
+            ignore_conflicts=True,
+        )
+        # معرفات الصفوف باستعلام واحد، ثم UPDATE واحد لكل زوج زيادات متساوٍ
+        existing = AdDailyStat.objects.filter(
+            date__in={day for _, _, day in rows},
+            ad_id__in={ad_id for ad_id, _, _ in rows},
+        ).order_by().values_list('pk', 'ad_id', 'placement_id', 'date')
+        grouped = defaultdict(list)
+        for pk, ad_id, placement_id, day in existing:
+            counts = rows.get((ad_id, placement_id, day))
+            if counts is not None:
+                grouped[(counts[IMPRESSION], counts[CLICK])].append(pk)
+        for (impressions, clicks), pks in grouped.items():
+            for i in range(0, len(pks), UPDATE_CHUNK_SIZE):
+                AdDailyStat.objects.filter(pk__in=pks[i:i + UPDATE_CHUNK_SIZE]).update(
+                    impressions=F('impressions') + impressions,
+                    clicks=F('clicks') + clicks,
+                )
+
+
+ad_counter = CounterBuffer('ads', apply_total_increments, 'AD_COUNTER')
+daily_counter = CounterBuffer('ad_daily', apply_daily_increments, 'AD_STATS')
+
+
+def record_event(ad_id, placement_id, kind):
+    """تسجيل ظهور أو نقرة في العداد الإجمالي وعداد اليوم الحالي"""
+    ad_counter.incr((ad_id, kind))
+    daily_counter.incr((ad_id, placement_id, timezone.localdate().isoformat(), kind))
+
+
+def pending_totals(ad_id):
+    """الظهور والنقرات المسجلة التي لم تُكتب بعد في قاعدة البيانات"""
+    return {
+        TOTAL_FIELDS[kind][0]: ad_counter.pending((ad_id, kind))
+        for kind in (IMPRESSION, CLICK)
+    }
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+# مجموعات تقرير الفترة: الاسم ← حقول GROUP BY
+PERIOD_GROUPS = {
+    'by_day': ('date',),
+    'by_ad': ('ad_id',),
+    'by_placement': ('placement_id', 'placement__name'),
+    'by_type': ('ad__ad_type',),
+}
+
+
+def period_summary(start_date, end_date, groups=tuple(PERIOD_GROUPS)):
+    """
+    ملخص الفترة من AdDailyStat باستعلام مجمّع لكل مجموعة
+    كل مجموعة قاموس: المفتاح ← {'impressions', 'clicks', 'ads'} (ads عدد الإعلانات المختلفة)،
+    ومجموعة المكان تحمل name أيضاً
+    """
+    stats = AdDailyStat.objects.filter(date__gte=_as_date(start_date), date__lte=_as_date(end_date)).order_by()
+    sums = {'impressions': Sum('impressions'), 'clicks': Sum('clicks')}
+
+    totals = stats.aggregate(**sums)
+    summary = {
+        'total_impressions': totals['impressions'] or 0,
+        'total_clicks': totals['clicks'] or 0,
+    }
+    for name in groups:
+        fields = PERIOD_GROUPS[name]
+        summary[name] = group = {}
+        for row in stats.values(*fields).annotate(**sums, ads=Count('ad_id', distinct=True)):
+            bucket = {'impressions': row['impressions'], 'clicks': row['clicks'], 'ads': row['ads']}
+            if name == 'by_placement':
+                bucket['name'] = row['placement__name']
+            group[row[fields[0]]] = bucket
+    return summary
+
+
+def ctr(clicks, impressions):
+    return round(clicks / impressions * 100, 2) if impressions > 0 else 0
@@ -1,8 +1,8 @@
 from django import template
 from django.utils import timezone
-from django.core.cache import cache
-from advertisements.models import Advertisement
-import random
+from django.utils.translation import gettext_lazy as _
+from advertisements.serving import ad_index
+from advertisements.sampling import visitor_key
 
 register = template.Library()
 
@@ -12,23 +12,12 @@ def show_ad(context, placement_code, count=1):
     عرض إعلانات في مكان محدد
     الاستخدام في القالب: {% show_ad 'header' %}
     """
-    cache_key = f'ad_{placement_code}_{count}'
-    ads = cache.get(cache_key)
+    request = context.get('request')
     
-    if not ads:
-        ads = list(Advertisement.objects.filter(
-            placement__code=placement_code,
-            active=True,
-            start_date__lte=timezone.now(),
-            end_date__gte=timezone.now()
-        ).select_related('placement'))
-        
-        # ترتيب عشوائي للإعلانات
-        if ads:
-            ads = random.sample(ads, min(count, len(ads)))
-            cache.set(cache_key, ads, 60)  # كاش لمدة دقيقة
+    # اختيار عشوائي موزون بالأولوية من فهرس الإعلانات في الذاكرة
+    visitor = visitor_key(request) if request is not None else None
+    ads = ad_index.select(placement_code, count, visitor=visitor)
     
-    request = context.get('request')
     return {
         'ads': ads,
         'request': request,
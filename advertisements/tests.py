@@ -1,3 +1,297 @@
-from django.test import TestCase
+import datetime
+import random
+from collections import Counter
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from articles.models import Tag
+
+from .models import AdDailyStat, AdPlacement, Advertisement
+from .sampling import AliasTable, frequency_cap, ordered_sample
+from .serving import ad_index
+from .slots import fill_holes, punch_holes, select_slots
+from .stats import (
+    CLICK, IMPRESSION, ad_counter, apply_daily_increments, apply_total_increments, daily_counter,
+    pending_totals, period_summary,
+)
+from .utils import get_ad_analytics
+
+
+def create_ad(placement, title='Ad', ad_type='text', **fields):
+    now = timezone.now()
+    ad = Advertisement.objects.create(
+        title=title,
+        placement=placement,
+        ad_type=ad_type,
+        text_content=title,
+        link='https://example.com/',
+        start_date=now + datetime.timedelta(minutes=1),
+        end_date=now + datetime.timedelta(days=30),
+        **fields,
+    )
+    # clean() rejects past start dates, so move the start back after saving
+    Advertisement.objects.filter(pk=ad.pk).update(start_date=now - datetime.timedelta(days=1))
+    ad.refresh_from_db()
+    ad_index.invalidate()
+    return ad
+
+
+class AdDailyStatTests(TestCase):
+    def setUp(self):
+        self.sidebar = AdPlacement.objects.create(name='Sidebar', code='sidebar', placement_type='sidebar')
+        self.header = AdPlacement.objects.create(name='Header', code='header', placement_type='header')
+        self.ad = create_ad(self.sidebar, 'Text ad')
+        self.banner = create_ad(self.header, 'Banner ad', ad_type='banner')
+        self.today = timezone.localdate()
+
+    def test_apply_total_increments(self):
+        apply_total_increments({
+            (str(self.ad.pk), IMPRESSION): 5,
+            (str(self.ad.pk), CLICK): 2,
+            (str(self.banner.pk), IMPRESSION): 5,
+        })
+        self.ad.refresh_from_db()
+        self.banner.refresh_from_db()
+        self.assertEqual((self.ad.impressions, self.ad.clicks), (5, 2))
+        self.assertEqual((self.banner.impressions, self.banner.clicks), (5, 0))
+        self.assertIsNotNone(self.ad.last_click)
+
+    def test_apply_daily_increments_creates_and_updates_rows(self):
+        day = self.today.isoformat()
+        apply_daily_increments({
+            (self.ad.pk, self.sidebar.pk, day, IMPRESSION): 3,
+            (self.ad.pk, self.sidebar.pk, day, CLICK): 1,
+        })
+        apply_daily_increments({(self.ad.pk, self.sidebar.pk, day, IMPRESSION): 2})
+
+        stat = AdDailyStat.objects.get()
+        self.assertEqual((stat.date, stat.impressions, stat.clicks), (self.today, 5, 1))
+
+    def test_apply_daily_increments_batches_equal_deltas(self):
+        day = self.today.isoformat()
+        yesterday = (self.today - datetime.timedelta(days=1)).isoformat()
+        apply_daily_increments({(self.ad.pk, self.sidebar.pk, yesterday, IMPRESSION): 7})
+        batch = {
+            (self.ad.pk, self.sidebar.pk, day, IMPRESSION): 2,
+            (self.banner.pk, self.header.pk, day, IMPRESSION): 2,
+            (self.ad.pk, self.sidebar.pk, yesterday, IMPRESSION): 2,
+            (self.banner.pk, self.sidebar.pk, day, CLICK): 1,
+        }
+        # Savepoint, bulk_create, one SELECT for the ids, one UPDATE per distinct delta pair, release
+        with self.assertNumQueries(6):
+            apply_daily_increments(batch)
+
+        stats = {(stat.ad_id, stat.placement_id, stat.date.isoformat()): (stat.impressions, stat.clicks)
+                 for stat in AdDailyStat.objects.all()}
+        self.assertEqual(stats, {
+            (self.ad.pk, self.sidebar.pk, day): (2, 0),
+            (self.banner.pk, self.header.pk, day): (2, 0),
+            (self.ad.pk, self.sidebar.pk, yesterday): (9, 0),
+            (self.banner.pk, self.sidebar.pk, day): (0, 1),
+        })
+
+    def test_summarize_period(self):
+        yesterday = self.today - datetime.timedelta(days=1)
+        apply_daily_increments({
+            (self.ad.pk, self.sidebar.pk, yesterday.isoformat(), IMPRESSION): 10,
+            (self.ad.pk, self.sidebar.pk, self.today.isoformat(), IMPRESSION): 10,
+            (self.ad.pk, self.sidebar.pk, self.today.isoformat(), CLICK): 4,
+            (self.banner.pk, self.header.pk, self.today.isoformat(), IMPRESSION): 20,
+        })
+
+        with self.assertNumQueries(5):
+            summary = period_summary(self.today, self.today)
+        self.assertEqual((summary['total_impressions'], summary['total_clicks']), (30, 4))
+        self.assertEqual(summary['by_placement'][self.sidebar.pk]['name'], 'Sidebar')
+        self.assertEqual(summary['by_type']['banner']['ads'], 1)
+        self.assertEqual(summary['by_ad'][self.ad.pk], {'impressions': 10, 'clicks': 4, 'ads': 1})
+        self.assertEqual(list(period_summary(yesterday, self.today, groups=('by_day',))['by_day']),
+                         [yesterday, self.today])
+
+        analytics = get_ad_analytics(yesterday, self.today)
+        self.assertEqual(analytics['total_impressions'], 40)
+        self.assertEqual(analytics['ctr'], 10.0)
+        self.assertEqual(analytics['active_ads'], 2)
+        self.assertEqual(analytics['by_type']['text'], {'count': 1, 'impressions': 20, 'clicks': 4})
+
+
+@override_settings(AD_COUNTER_BACKEND='local', AD_COUNTER_MAX_PENDING=1000,
+                   AD_STATS_BACKEND='local', AD_STATS_MAX_PENDING=1000)
+class AdEventBufferTests(TestCase):
+    def setUp(self):
+        self.placement = AdPlacement.objects.create(name='Sidebar', code='sidebar', placement_type='sidebar')
+        self.ad = create_ad(self.placement)
+
+    def tearDown(self):
+        # Write leftovers inside the test transaction so they are rolled back
+        ad_counter.flush()
+        daily_counter.flush()
+
+    def test_events_are_buffered_until_flush(self):
+        self.ad.record_impression()
+        self.ad.record_impression()
+        self.ad.record_click()
+        self.assertEqual(pending_totals(self.ad.pk), {'impressions': 2, 'clicks': 1})
+        self.assertFalse(AdDailyStat.objects.exists())
+
+        ad_counter.flush()
+        daily_counter.flush()
+        self.ad.refresh_from_db()
+        self.assertEqual((self.ad.impressions, self.ad.clicks), (2, 1))
+        stat = AdDailyStat.objects.get()
+        self.assertEqual((stat.placement_id, stat.impressions, stat.clicks), (self.placement.pk, 2, 1))
+        self.assertEqual(pending_totals(self.ad.pk), {'impressions': 0, 'clicks': 0})
+
+    def test_click_endpoint_records_without_writing(self):
+        response = self.client.get(reverse('advertisements:record_click', args=[self.ad.pk]))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(pending_totals(self.ad.pk)['clicks'], 1)
+        self.ad.refresh_from_db()
+        self.assertEqual(self.ad.clicks, 0)
+
+
+class AdIndexTests(TestCase):
+    def setUp(self):
+        self.sidebar = AdPlacement.objects.create(name='Sidebar', code='sidebar', placement_type='sidebar')
+        self.header = AdPlacement.objects.create(name='Header', code='header', placement_type='header')
+        self.python = Tag.objects.create(name='Python', slug='python')
+        self.django = Tag.objects.create(name='Django', slug='django')
+        self.untargeted = create_ad(self.sidebar, 'Untargeted')
+        self.targeted = create_ad(self.sidebar, 'Python ad')
+        self.targeted.tags.add(self.python)
+        self.header_ad = create_ad(self.header, 'Header ad')
+
+    def ids(self, ads):
+        return {ad.id for ad in ads}
+
+    def test_candidates_by_placement_and_tag(self):
+        snapshot = ad_index.snapshot()
+        self.assertEqual(self.ids(snapshot.candidates('sidebar')), {self.untargeted.pk, self.targeted.pk})
+        self.assertEqual(self.ids(snapshot.candidates('sidebar', tag_ids=[self.python.pk])),
+                         {self.untargeted.pk, self.targeted.pk})
+        self.assertEqual(self.ids(snapshot.candidates('sidebar', tag_ids=[self.django.pk])),
+                         {self.untargeted.pk})
+        self.assertEqual(self.ids(snapshot.candidates(tag_ids=[self.python.pk], include_untargeted=False)),
+                         {self.targeted.pk})
+        self.assertEqual(set(ad_index.placements()), {'sidebar', 'header'})
+
+    def test_select_returns_distinct_ads(self):
+        ads = ad_index.select('sidebar', count=5)
+        self.assertEqual(len(ads), 2)
+        self.assertEqual(self.ids(ads), {self.untargeted.pk, self.targeted.pk})
+        self.assertEqual(ad_index.select('missing'), [])
+
+    def test_saving_an_ad_refreshes_the_index(self):
+        self.assertIsNotNone(ad_index.get(self.header_ad.pk))
+        Advertisement.objects.filter(pk=self.header_ad.pk).update(active=False)
+        # update() sends no signal; saving the placement bumps the shared version
+        self.header.save()
+        self.assertIsNone(ad_index.get(self.header_ad.pk))
+        self.assertEqual(ad_index.select('header'), [])
+
+    def test_scheduled_ads_are_not_live(self):
+        scheduled = create_ad(self.header, 'Scheduled')
+        Advertisement.objects.filter(pk=scheduled.pk).update(
+            start_date=timezone.now() + datetime.timedelta(hours=1)
+        )
+        ad_index.invalidate()
+        snapshot = ad_index.snapshot()
+        self.assertIn(scheduled.pk, snapshot.ads)
+        self.assertNotIn(scheduled.pk, self.ids(snapshot.live))
+        self.assertLessEqual(snapshot.valid_until, timezone.now() + datetime.timedelta(hours=1))
+
+
+def fake_ad(ad_id, priority):
+    return SimpleNamespace(id=ad_id, priority=priority)
+
+
+class AliasTableTests(TestCase):
+    def setUp(self):
+        self.ads = [fake_ad(1, 1), fake_ad(2, 3), fake_ad(3, 6)]
+        self.table = AliasTable(self.ads)
+
+    def test_draws_follow_priority_weights(self):
+        rng = random.Random(42)
+        draws = Counter(self.table.draw(rng).id for _ in range(20000))
+        for ad in self.ads:
+            self.assertAlmostEqual(draws[ad.id] / 20000, ad.priority / 10, delta=0.02)
+
+    def test_sample_is_distinct_and_honours_exclude(self):
+        rng = random.Random(1)
+        for count in range(1, 5):
+            ids = [ad.id for ad in self.table.sample(count, rng)]
+            self.assertEqual(len(ids), len(set(ids)))
+            self.assertEqual(len(ids), min(count, 3))
+        self.assertEqual([ad.id for ad in self.table.sample(3, rng, exclude=frozenset({1, 3}))], [2])
+        self.assertEqual(self.table.sample(1, rng, exclude=frozenset({1, 2, 3})), [])
+
+    def test_seeded_rng_is_repeatable(self):
+        big = AliasTable([fake_ad(i, i % 5) for i in range(1, 100)])
+        first = [ad.id for ad in big.sample(5, random.Random(7))]
+        second = [ad.id for ad in big.sample(5, random.Random(7))]
+        self.assertEqual(first, second)
+
+    def test_empty_table(self):
+        self.assertEqual(len(AliasTable([])), 0)
+        self.assertEqual(AliasTable([]).sample(3), [])
+
+    def test_ordered_sample_prefers_heavier_items(self):
+        rng = random.Random(3)
+        firsts = Counter(ordered_sample(self.ads, 1, rng)[0].id for _ in range(5000))
+        self.assertGreater(firsts[3], firsts[2])
+        self.assertGreater(firsts[2], firsts[1])
+
+
+@override_settings(AD_FREQUENCY_CAP=2, AD_FREQUENCY_WINDOW=3600)
+class FrequencyCapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.placement = AdPlacement.objects.create(name='Sidebar', code='sidebar', placement_type='sidebar')
+        self.first = create_ad(self.placement, 'First')
+        self.second = create_ad(self.placement, 'Second')
+
+    def test_ads_stop_after_the_cap(self):
+        shown = Counter()
+        for _ in range(4):
+            shown.update(ad.id for ad in ad_index.select('sidebar', visitor='visitor-a'))
+        self.assertEqual(shown, {self.first.pk: 2, self.second.pk: 2})
+        self.assertEqual(ad_index.select('sidebar', visitor='visitor-a'), [])
+        # Other visitors are not affected
+        self.assertEqual(len(ad_index.select('sidebar', visitor='visitor-b')), 1)
+
+    def test_exhausted(self):
+        self.assertEqual(frequency_cap.exhausted({1: 2, 2: 1}), frozenset({1}))
+
+
+@override_settings(AD_FREQUENCY_CAP=1, AD_FREQUENCY_WINDOW=3600)
+class AdSlotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.placement = AdPlacement.objects.create(name='Sidebar', code='sidebar', placement_type='sidebar')
+        self.first = create_ad(self.placement, 'First ad')
+        self.second = create_ad(self.placement, 'Second ad')
+
+    def shown(self, html):
+        return [title for title in ('First ad', 'Second ad') if title in html]
+
+    def test_holes_are_refilled_per_visitor(self):
+        page = ''.join(select_slots('sidebar', 2, visitor='visitor-a'))
+        self.assertEqual(sorted(self.shown(page)), ['First ad', 'Second ad'])
+
+        stored = punch_holes(page)
+        self.assertEqual(self.shown(stored), [])
+        self.assertEqual(stored.count('<!--ad-hole:'), 2)
+
+        # visitor-a reached the cap on both ads; a new visitor sees both
+        self.assertEqual(self.shown(fill_holes(stored, visitor='visitor-a')), [])
+        self.assertEqual(sorted(self.shown(fill_holes(stored, visitor='visitor-b'))), ['First ad', 'Second ad'])
+
+    def test_empty_slots_stay_as_holes(self):
+        slots = select_slots('sidebar', 3)
+        self.assertEqual(len(slots), 3)
+        self.assertEqual(self.shown(slots[2]), [])
+        self.assertEqual(punch_holes(slots[2]).count('<!--ad-hole:'), 1)
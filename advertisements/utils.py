@@ -1,52 +1,53 @@
 import logging
-from django.core.cache import cache
 from django.utils import timezone
-from django.db.models import Sum
 from .models import Advertisement
+from .stats import period_summary, ctr
+from .serving import ad_index
+from core.cache_versions import bump
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
-def get_ad_analytics(start_date=None, end_date=None):
+def get_ad_analytics(start_date=None, end_date=None, summary=None):
     """
     الحصول على تحليلات الإعلانات لفترة محددة
+    تُحسب من جدول AdDailyStat باستعلامات مجمّعة بدلاً من الأعمدة التراكمية،
+    ويمكن تمرير summary إذا كان ملخص الفترة (period_summary) محملاً مسبقاً
     """
     if not start_date:
         start_date = timezone.now() - timedelta(days=30)
     if not end_date:
         end_date = timezone.now()
     
-    ads = Advertisement.objects.filter(
-        start_date__gte=start_date,
-        end_date__lte=end_date
-    )
+    if summary is None:
+        summary = period_summary(start_date, end_date)
     
+    ad_ids = list(summary['by_ad'])
     analytics = {
-        'total_impressions': ads.aggregate(Sum('impressions'))['impressions__sum'] or 0,
-        'total_clicks': ads.aggregate(Sum('clicks'))['clicks__sum'] or 0,
-        'total_ads': ads.count(),
-        'active_ads': sum(1 for ad in ads if ad.is_active()),
+        'total_impressions': summary['total_impressions'],
+        'total_clicks': summary['total_clicks'],
+        'ctr': ctr(summary['total_clicks'], summary['total_impressions']),
+        'total_ads': len(ad_ids),
+        'active_ads': sum(1 for ad in Advertisement.objects.filter(id__in=ad_ids) if ad.is_active()),
         'by_type': {},
         'by_placement': {},
     }
     
     # تحليل حسب النوع
-    for ad_type, _ in Advertisement.AD_TYPE_CHOICES:
-        type_ads = ads.filter(ad_type=ad_type)
+    for ad_type, _label in Advertisement.AD_TYPE_CHOICES:
+        type_stats = summary['by_type'].get(ad_type, {'impressions': 0, 'clicks': 0, 'ads': 0})
         analytics['by_type'][ad_type] = {
-            'count': type_ads.count(),
-            'impressions': type_ads.aggregate(Sum('impressions'))['impressions__sum'] or 0,
-            'clicks': type_ads.aggregate(Sum('clicks'))['clicks__sum'] or 0,
+            'count': type_stats['ads'],
+            'impressions': type_stats['impressions'],
+            'clicks': type_stats['clicks'],
         }
     
     # تحليل حسب المكان
-    placements = set(ads.values_list('placement__name', flat=True))
-    for placement in placements:
-        placement_ads = ads.filter(placement__name=placement)
-        analytics['by_placement'][placement] = {
-            'count': placement_ads.count(),
-            'impressions': placement_ads.aggregate(Sum('impressions'))['impressions__sum'] or 0,
-            'clicks': placement_ads.aggregate(Sum('clicks'))['clicks__sum'] or 0,
+    for placement_stats in summary['by_placement'].values():
+        analytics['by_placement'][placement_stats['name']] = {
+            'count': placement_stats['ads'],
+            'impressions': placement_stats['impressions'],
+            'clicks': placement_stats['clicks'],
         }
     
     return analytics
@@ -55,14 +56,14 @@ def clear_ad_cache(placement_code=None):
     """
     مسح الكاش الخاص بالإعلانات
     """
+    # التحديثات الجماعية (queryset.update) لا ترسل إشارات الحفظ
+    ad_index.invalidate()
+    
     if placement_code:
-        cache.delete(f'ad_{placement_code}_*')
-    else:
-        # مسح كل كاش الإعلانات
-        cache.delete_many([key for key in cache.keys('ad_*')])
+        bump(f'placement:{placement_code}')
     
-    # مسح إحصائيات الكاش
-    cache.delete('active_ads_count')
+    # مسح كل كاش الإعلانات (المفاتيح المرتبطة بالمساحة 'ads') وإحصائياته
+    bump('ads')
     logger.info(f"Ad cache cleared for placement: {placement_code or 'all'}")
 
 def validate_ad_image(image):
@@ -7,68 +7,60 @@ from django.db.models import Sum, Count, Q
 from django.utils import timezone
 from django.core.cache import cache
 from datetime import datetime, timedelta
+import base64
 import json
 import csv
 from .models import Advertisement, AdPlacement
 from .forms import AdvertisementForm, AdPlacementForm
 from .utils import get_ad_analytics, clear_ad_cache, validate_ad_image, generate_ad_code
+from .stats import period_summary, ctr, record_event, IMPRESSION, CLICK
+from .serving import ad_index
+from .sampling import visitor_key
+from core.cache_versions import make_key
 from .models import Advertisement, AdPlacement, Tag
 
 # ==============================================
 # وظائف تتبع الإعلانات (غير محمية بالصلاحيات)
 # ==============================================
 
+TRANSPARENT_GIF = base64.b64decode('R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7')
+
 def record_impression(request, ad_id):
-    """تسجيل ظهور الإعلان"""
-    try:
-        ad = get_object_or_404(Advertisement, id=ad_id)
-        
-        # التحقق من أن الإعلان نشط وفعال
-        if ad.is_active():
-            ad.record_impression()
-            
-            # إرجاع صورة 1x1 شفافة لتعقب الظهور
-            response = HttpResponse(
-                b'R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7',
-                content_type='image/gif'
-            )
-            response['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-            response['Pragma'] = 'no-cache'
-            response['Expires'] = '0'
-            return response
-        
+    """تسجيل ظهور الإعلان بدون أي عمل متزامن على قاعدة البيانات"""
+    ad = ad_index.get(ad_id)
+    
+    # التحقق من أن الإعلان نشط وفعال من اللقطة المحفوظة في الذاكرة
+    if ad is None or not ad.is_active():
         return HttpResponse(status=404)
-    except Exception as e:
-        # تسجيل الخطأ وإرجاع استجابة فارغة
-        print(f"Error recording impression: {e}")
-        return HttpResponse(status=500)
+    
+    record_event(ad.id, ad.placement_id, IMPRESSION)
+    
+    # إرجاع صورة 1x1 شفافة لتعقب الظهور
+    response = HttpResponse(TRANSPARENT_GIF, content_type='image/gif')
+    response['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+    response['Pragma'] = 'no-cache'
+    response['Expires'] = '0'
+    return response
 
 def record_click(request, ad_id):
-    """تسجيل نقرة على الإعلان"""
-    try:
-        ad = get_object_or_404(Advertisement, id=ad_id)
-        
-        # التحقق من أن الإعلان نشط وفعال
-        if ad.is_active():
-            ad.record_click()
-            
-            # إعادة توجيه إلى رابط الإعلان مع إضافة معلمات التتبع
-            redirect_url = ad.link
-            if '?' in redirect_url:
-                redirect_url += f'&utm_source=ads&utm_medium=banner&utm_campaign={ad.id}'
-            else:
-                redirect_url += f'?utm_source=ads&utm_medium=banner&utm_campaign={ad.id}'
-            
-            return redirect(redirect_url)
-        
+    """تسجيل نقرة على الإعلان بدون أي عمل متزامن على قاعدة البيانات"""
+    ad = ad_index.get(ad_id)
+    
+    if ad is None or not ad.is_active():
         # إذا كان الإعلان غير نشط، إعادة توجيه إلى الصفحة الرئيسية
         messages.warning(request, _('This advertisement is no longer active'))
         return redirect('/')
-    except Exception as e:
-        # تسجيل الخطأ وإعادة التوجيه إلى الصفحة الرئيسية
-        print(f"Error recording click: {e}")
-        messages.error(request, _('An error occurred while processing your request'))
-        return redirect('/')
+    
+    record_event(ad.id, ad.placement_id, CLICK)
+    
+    # إعادة توجيه إلى رابط الإعلان مع إضافة معلمات التتبع
+    redirect_url = ad.link
+    if '?' in redirect_url:
+        redirect_url += f'&utm_source=ads&utm_medium=banner&utm_campaign={ad.id}'
+    else:
+        redirect_url += f'?utm_source=ads&utm_medium=banner&utm_campaign={ad.id}'
+    
+    return redirect(redirect_url)
 
 # ==============================================
 # وظائف لوحة التحكم والإدارة
@@ -123,7 +115,7 @@ def ad_dashboard(request):
     active_ads = sum(1 for ad in Advertisement.objects.all() if ad.is_active())
     
     # إحصائيات من الكاش لتحسين الأداء
-    stats_cache_key = f'ad_stats_{request.user.id}'
+    stats_cache_key = make_key('ads', 'dashboard_stats', request.user.id)
     stats = cache.get(stats_cache_key)
     
     if not stats:
@@ -229,74 +221,63 @@ def analytics_dashboard(request):
             start_date = timezone.now() - timedelta(days=30)
             end_date = timezone.now()
     
+    # ملخصات مجمّعة في قاعدة البيانات من جدول الإحصائيات اليومية: الفترة المختارة وآخر 30 يوماً
+    today = timezone.localdate()
+    chart_start = today - timedelta(days=29)
+    selected = period_summary(start_date, end_date)
+    summary = period_summary(chart_start, today, groups=('by_day',))
+    
     # الحصول على التحليلات
-    analytics = get_ad_analytics(start_date, end_date)
+    analytics = get_ad_analytics(start_date, end_date, summary=selected)
+    
+    # الإعلانات مع إحصائيات الفترة ونسبة النقر
+    ads_by_id = Advertisement.objects.select_related('placement').in_bulk(list(selected['by_ad']))
+    ranked_ads = []
+    for ad_id, ad_stats in selected['by_ad'].items():
+        ad = ads_by_id.get(ad_id)
+        if ad is None or ad_stats['impressions'] == 0:
+            continue
+        ad.period_impressions = ad_stats['impressions']
+        ad.period_clicks = ad_stats['clicks']
+        ad.ctr_calc = ctr(ad_stats['clicks'], ad_stats['impressions'])
+        ranked_ads.append(ad)
     
     # الإعلانات الأفضل أداءً (أعلى CTR)
-    top_ads = Advertisement.objects.filter(
-        start_date__gte=start_date,
-        end_date__lte=end_date,
-        impressions__gt=0
-    ).annotate(
-        ctr_calc=Sum('clicks') * 100.0 / Sum('impressions')
-    ).order_by('-ctr_calc')[:10]
-    
-    # الإعلانات الأسوأ أداءً
-    worst_ads = Advertisement.objects.filter(
-        start_date__gte=start_date,
-        end_date__lte=end_date,
-        impressions__gt=100  # على الأقل 100 ظهور لتكون ذات دلالة
-    ).annotate(
-        ctr_calc=Sum('clicks') * 100.0 / Sum('impressions')
-    ).order_by('ctr_calc')[:10]
+    top_ads = sorted(ranked_ads, key=lambda ad: ad.ctr_calc, reverse=True)[:10]
+    
+    # الإعلانات الأسوأ أداءً (على الأقل 100 ظهور لتكون ذات دلالة)
+    worst_ads = sorted(
+        [ad for ad in ranked_ads if ad.period_impressions > 100],
+        key=lambda ad: ad.ctr_calc
+    )[:10]
     
     # إحصائيات حسب المكان
+    placements_by_id = AdPlacement.objects.in_bulk(list(selected['by_placement']))
     placement_stats = []
-    for placement in AdPlacement.objects.filter(active=True):
-        placement_ads = Advertisement.objects.filter(
-            placement=placement,
-            start_date__gte=start_date,
-            end_date__lte=end_date
-        )
-        if placement_ads.exists():
-            total_impressions = placement_ads.aggregate(Sum('impressions'))['impressions__sum'] or 0
-            total_clicks = placement_ads.aggregate(Sum('clicks'))['clicks__sum'] or 0
-            ctr = (total_clicks / total_impressions * 100) if total_impressions > 0 else 0
-            
-            placement_stats.append({
-                'placement': placement,
-                'ads_count': placement_ads.count(),
-                'impressions': total_impressions,
-                'clicks': total_clicks,
-                'ctr': round(ctr, 2)
-            })
-    
-    # تحليل الأداء اليومي (آخر 30 يوم)
+    for placement_id, stats in selected['by_placement'].items():
+        placement = placements_by_id.get(placement_id)
+        if placement is None or not placement.active:
+            continue
+        placement_stats.append({
+            'placement': placement,
+            'ads_count': stats['ads'],
+            'impressions': stats['impressions'],
+            'clicks': stats['clicks'],
+            'ctr': ctr(stats['clicks'], stats['impressions']),
+        })
+    
+    # تحليل الأداء اليومي الحقيقي (آخر 30 يوم)
     daily_data = []
-    for i in range(30):
-        date = timezone.now() - timedelta(days=i)
-        day_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
-        day_end = date.replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        day_ads = Advertisement.objects.filter(
-            start_date__lte=day_end,
-            end_date__gte=day_start,
-            active=True
-        )
-        
-        day_impressions = day_ads.aggregate(Sum('impressions'))['impressions__sum'] or 0
-        day_clicks = day_ads.aggregate(Sum('clicks'))['clicks__sum'] or 0
-        day_ctr = (day_clicks / day_impressions * 100) if day_impressions > 0 else 0
-        
+    for i in range(29, -1, -1):
+        day = today - timedelta(days=i)
+        day_stats = summary['by_day'].get(day, {'impressions': 0, 'clicks': 0})
         daily_data.append({
-            'date': day_start.strftime('%Y-%m-%d'),
-            'impressions': day_impressions,
-            'clicks': day_clicks,
-            'ctr': round(day_ctr, 2)
+            'date': day.strftime('%Y-%m-%d'),
+            'impressions': day_stats['impressions'],
+            'clicks': day_stats['clicks'],
+            'ctr': ctr(day_stats['clicks'], day_stats['impressions']),
         })
     
-    daily_data.reverse()  # ترتيب من الأقدم إلى الأحدث
-    
     context = {
         'analytics': analytics,
         'top_ads': top_ads,
@@ -605,14 +586,14 @@ def export_analytics(request):
         _('CTR'), _('Status'), _('Created At')
     ])
     
-    # الحصول على الإعلانات في الفترة المحددة
+    # إحصائيات الفترة لكل إعلان من جدول AdDailyStat باستعلام مجمّع واحد
+    summary = period_summary(start_date, end_date, groups=('by_ad',))
     ads = Advertisement.objects.filter(
-        start_date__gte=start_date,
-        end_date__lte=end_date
-    ).select_related('placement')
+        id__in=list(summary['by_ad'])
+    ).select_related('placement').order_by('placement__name', 'title')
     
     for ad in ads:
-        ctr = ad.get_ctr()
+        ad_stats = summary['by_ad'][ad.id]
         status = _('Active') if ad.is_active() else _('Inactive')
         
         writer.writerow([
@@ -622,9 +603,9 @@ def export_analytics(request):
             ad.advertiser_name,
             ad.start_date.strftime('%Y-%m-%d %H:%M'),
             ad.end_date.strftime('%Y-%m-%d %H:%M'),
-            ad.impressions,
-            ad.clicks,
-            f'{ctr:.2f}%',
+            ad_stats['impressions'],
+            ad_stats['clicks'],
+            f"{ctr(ad_stats['clicks'], ad_stats['impressions']):.2f}%",
             status,
             ad.created_at.strftime('%Y-%m-%d %H:%M')
         ])
@@ -644,46 +625,8 @@ def ad_json_feed(request, placement_code=None):
     count = int(request.GET.get('count', 3))
     count = min(count, 10)  # حد أقصى 10 إعلانات
     
-    # إنشاء استعلام للإعلانات النشطة
-    ads_query = Advertisement.objects.filter(
-        active=True,
-        start_date__lte=timezone.now(),
-        end_date__gte=timezone.now()
-    ).select_related('placement')
-    
-    if placement_code:
-        ads_query = ads_query.filter(placement__code=placement_code)
-    
-    # تطبيق الأولوية ثم عشوائية
-    ads = list(ads_query.order_by('-priority'))
-    
-    # إذا كان هناك أكثر من العدد المطلوب، نختار عشوائياً مع مراعاة الأولوية
-    if len(ads) > count:
-        # فرز حسب الأولوية أولاً
-        ads.sort(key=lambda x: x.priority, reverse=True)
-        
-        # أخذ أعلى الأولويات
-        high_priority = [ad for ad in ads if ad.priority >= 3]
-        medium_priority = [ad for ad in ads if ad.priority == 2]
-        low_priority = [ad for ad in ads if ad.priority <= 1]
-        
-        selected_ads = []
-        
-        # توزيع الإعلانات حسب الأولوية
-        if high_priority:
-            selected_ads.extend(high_priority[:min(count, len(high_priority))])
-        
-        if len(selected_ads) < count and medium_priority:
-            import random
-            needed = count - len(selected_ads)
-            selected_ads.extend(random.sample(medium_priority, min(needed, len(medium_priority))))
-        
-        if len(selected_ads) < count and low_priority:
-            import random
-            needed = count - len(selected_ads)
-            selected_ads.extend(random.sample(low_priority, min(needed, len(low_priority))))
-        
-        ads = selected_ads
+    # اختيار عشوائي موزون بالأولوية من فهرس الإعلانات في الذاكرة
+    ads = ad_index.select(placement_code, count, visitor=visitor_key(request))
     
     # تحضير بيانات JSON
     ads_data = []
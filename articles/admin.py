@@ -1,7 +1,12 @@
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
+from django.utils import timezone
+from django.urls import reverse
 from .models import Article, Tag, Comment, Category, ArticleView, ArticleRating, Bookmark
+from core import counting
+from core.comment_tree import comment_trees
+from . import engagement
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -75,7 +80,7 @@ class ArticleAdmin(admin.ModelAdmin):
                   'is_premium', 'published_at', 'created_at')
     search_fields = ('title', 'content', 'excerpt', 'slug')
     prepopulated_fields = {'slug': ('title',)}
-    readonly_fields = ('views', 'created_at', 'updated_at', 'published_at', 
+    readonly_fields = ('views', 'reading_time', 'created_at', 'updated_at', 'published_at', 
                       'rating_display', 'comments_count_display')
     filter_horizontal = ('tags', 'related_articles')
     date_hierarchy = 'published_at'
@@ -107,23 +112,24 @@ class ArticleAdmin(admin.ModelAdmin):
     )
     
     def rating_display(self, obj):
-        avg = obj.ratings.aggregate(Avg('rating'))['rating__avg']
-        if avg:
-            return f'{avg:.1f} ⭐ ({obj.ratings.count()})'
+        if obj.rating_count:
+            return f'{obj.rating_avg:.1f} ⭐ ({obj.rating_count})'
         return _('No ratings')
     rating_display.short_description = _('Rating')
+    rating_display.admin_order_field = 'rating_avg'
     
     def comments_count_display(self, obj):
-        return obj.comments.filter(is_approved=True).count()
+        return obj.approved_comments_count
     comments_count_display.short_description = _('Comments')
+    comments_count_display.admin_order_field = 'approved_comments_count'
     
     def make_published(self, request, queryset):
-        updated = queryset.update(status='published', published_at=timezone.now())
+        updated = counting.bulk_update(queryset, status='published', published_at=timezone.now())
         self.message_user(request, _('{count} articles published successfully.').format(count=updated))
     make_published.short_description = _("Publish selected articles")
     
     def make_draft(self, request, queryset):
-        updated = queryset.update(status='draft')
+        updated = counting.bulk_update(queryset, status='draft')
         self.message_user(request, _('{count} articles marked as draft.').format(count=updated))
     make_draft.short_description = _("Mark selected articles as draft")
     
@@ -189,23 +195,30 @@ class CommentAdmin(admin.ModelAdmin):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
     content_preview.short_description = _('Content')
     
+    def _update_comments(self, queryset, **fields):
+        # update() لا يرسل إشارات، فتُعاد إحصائيات المقالات المتأثرة وتُبطل أشجار تعليقاتها صراحة
+        article_ids = set(queryset.values_list('article_id', flat=True))
+        queryset.update(**fields)
+        engagement.comments_updated(article_ids)
+        comment_trees.invalidate_objects('articles.article', article_ids)
+    
     def approve_comments(self, request, queryset):
-        queryset.update(is_approved=True)
+        self._update_comments(queryset, is_approved=True)
         self.message_user(request, _('Selected comments approved.'))
     approve_comments.short_description = _("Approve selected comments")
     
     def disapprove_comments(self, request, queryset):
-        queryset.update(is_approved=False)
+        self._update_comments(queryset, is_approved=False)
         self.message_user(request, _('Selected comments disapproved.'))
     disapprove_comments.short_description = _("Disapprove selected comments")
     
     def mark_as_spam(self, request, queryset):
-        queryset.update(is_spam=True, is_approved=False)
+        self._update_comments(queryset, is_spam=True, is_approved=False)
         self.message_user(request, _('Selected comments marked as spam.'))
     mark_as_spam.short_description = _("Mark as spam")
     
     def mark_as_not_spam(self, request, queryset):
-        queryset.update(is_spam=False)
+        self._update_comments(queryset, is_spam=False)
         self.message_user(request, _('Selected comments marked as not spam.'))
     mark_as_not_spam.short_description = _("Mark as not spam")
 
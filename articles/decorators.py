@@ -2,6 +2,7 @@ from django.shortcuts import redirect
 from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
 from functools import wraps
+from core.analytics import record_article_view
 
 def premium_required(view_func):
     """ديكور للتحقق من اشتراك مميز"""
@@ -19,16 +20,12 @@ def track_article_view(view_func):
     def wrapper(request, *args, **kwargs):
         response = view_func(request, *args, **kwargs)
         
-        if request.method == 'GET' and hasattr(response, 'context_data'):
+        if request.method == 'GET' and getattr(response, 'context_data', None):
+            from .models import Article
             article = response.context_data.get('article')
             if article and isinstance(article, Article):
-                from .models import ArticleView
-                ArticleView.objects.create(
-                    article=article,
-                    ip_address=request.META.get('REMOTE_ADDR'),
-                    user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                    session_key=request.session.session_key or 'anonymous'
-                )
+                # يُضاف الحدث لطابور التحليلات ويُكتب لاحقاً على دفعات
+                record_article_view(request, article)
         
         return response
     return wrapper
@@ -0,0 +1,170 @@
+"""
+إحصائيات التفاعل المخزنة على المقال
+
+مجموع التقييمات وعددها ومتوسطها وعدد التعليقات المعتمدة تُحفظ كأعمدة على
+Article وتُحدث بتحديثات F() ذرية داخل نفس معاملة كتابة التقييم أو التعليق،
+فيصبح الترتيب حسب التقييم أو التعليقات ORDER BY على عمود مفهرس بدلاً من
+GROUP BY على كل المقالات. أمر rebuild_engagement_stats يعيد حسابها من الجداول.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+
+from core.cache_versions import bump
+from core.page_cache import content_namespace
+
+from .models import Article, ArticleRating, Comment
+
+logger = logging.getLogger(__name__)
+
+STATE_ATTR = '_engagement_state'
+
+REBUILD_CHUNK_SIZE = 1000
+
+
+def _average():
+    """متوسط التقييم من المجموع والعدد في نفس الصف"""
+    return Case(
+        When(rating_count__gt=0, then=Cast(F('rating_sum'), FloatField()) / F('rating_count')),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def _invalidate(article_id):
+    # ترتيب القوائم حسب التقييم أو التعليقات يتغير، وصفحة المقال المخزنة تعرض الإحصائيات
+    transaction.on_commit(lambda: bump('article_list', content_namespace('articles.article', article_id)))
+
+
+def apply_rating(article_id, delta_sum=0, delta_count=0):
+    """إضافة فرق إلى مجموع التقييمات وعددها ثم إعادة حساب المتوسط"""
+    if not article_id or not (delta_sum or delta_count):
+        return
+    with transaction.atomic():
+        articles = Article.objects.filter(pk=article_id)
+        articles.update(
+            rating_sum=F('rating_sum') + delta_sum,
+            rating_count=F('rating_count') + delta_count,
+        )
+        articles.update(rating_avg=_average())
+    _invalidate(article_id)
+
+
+def apply_comments(article_id, delta):
+    """إضافة فرق إلى عدد التعليقات المعتمدة"""
+    if not article_id or not delta:
+        return
+    Article.objects.filter(pk=article_id).update(
+        approved_comments_count=F('approved_comments_count') + delta
+    )
+    _invalidate(article_id)
+
+
+def refresh(article):
+    """تحميل الأعمدة الحالية من قاعدة البيانات إلى الكائن"""
+    article.refresh_from_db(fields=['rating_sum', 'rating_count', 'rating_avg', 'approved_comments_count'])
+    return article
+
+
+def rebuild(queryset=None):
+    """
+    إعادة حساب الإحصائيات من جداول التقييمات والتعليقات
+    تعيد عدد المقالات التي كانت قيمها المخزنة مختلفة
+    """
+    queryset = Article.objects.all() if queryset is None else queryset
+    ratings = ArticleRating.objects.filter(article=OuterRef('pk')).order_by().values('article')
+    comments = Comment.objects.filter(article=OuterRef('pk'), is_approved=True).order_by().values('article')
+    exact = queryset.annotate(
+        exact_sum=Coalesce(Subquery(ratings.annotate(s=Sum('rating')).values('s')), 0),
+        exact_count=Coalesce(Subquery(ratings.annotate(n=Count('pk')).values('n')), 0),
+        exact_comments=Coalesce(Subquery(comments.annotate(n=Count('pk')).values('n')), 0),
+    )
+    stale = exact.exclude(
+        Q(rating_sum=F('exact_sum')) & Q(rating_count=F('exact_count'))
+        & Q(approved_comments_count=F('exact_comments'))
+    ).values_list('pk', 'exact_sum', 'exact_count', 'exact_comments').order_by('pk')
+
+    changed = 0
+    last_pk = 0
+    with transaction.atomic():
+        while True:
+            # دفعة كاملة في الذاكرة قبل التحديث: لا مؤشر مفتوح على الجدول أثناء الكتابة فيه
+            chunk = list(stale.filter(pk__gt=last_pk)[:REBUILD_CHUNK_SIZE])
+            if not chunk:
+                break
+            for pk, rating_sum, rating_count, comments_count in chunk:
+                Article.objects.filter(pk=pk).update(
+                    rating_sum=rating_sum,
+                    rating_count=rating_count,
+                    rating_avg=rating_sum / rating_count if rating_count else 0,
+                    approved_comments_count=comments_count,
+                )
+            changed += len(chunk)
+            last_pk = chunk[-1][0]
+        # المتوسط وحده قد يختلف (مثلاً بعد تعديل يدوي)
+        queryset.filter(rating_count=0).exclude(rating_avg=0).update(rating_avg=0)
+        queryset.filter(rating_count__gt=0).update(rating_avg=_average())
+    if changed:
+        bump('article_list')
+    return changed
+
+
+def comments_updated(article_ids):
+    """إعادة حساب إحصائيات مقالات عُدلت تعليقاتها بـ update() دون إشارات (إجراءات الإدارة)"""
+    article_ids = set(article_ids) - {None}
+    if not article_ids:
+        return
+    rebuild(Article.objects.filter(pk__in=article_ids))
+    for article_id in article_ids:
+        _invalidate(article_id)
+
+
+# ==============================================
+# تحديث الإحصائيات من الإشارات
+# ==============================================
+
+def remember_rating(instance):
+    """التقييم المخزن قبل التعديل أو الحذف: (المقال، القيمة)"""
+    state = None
+    if instance.pk:
+        state = ArticleRating.objects.filter(pk=instance.pk).values_list('article_id', 'rating').first()
+    setattr(instance, STATE_ATTR, state)
+
+
+def rating_saved(instance):
+    old = getattr(instance, STATE_ATTR, None)
+    new = (instance.article_id, instance.rating)
+    if old == new:
+        return
+    if old:
+        apply_rating(old[0], -old[1], -1)
+    apply_rating(new[0], new[1], 1)
+
+
+def rating_deleted(instance):
+    old = getattr(instance, STATE_ATTR, None)
+    if old:
+        apply_rating(old[0], -old[1], -1)
+
+
+def remember_comment(instance):
+    """المقال الذي يُحسب له التعليق قبل التعديل أو الحذف (أو None إن لم يكن معتمداً)"""
+    state = None
+    if instance.pk:
+        state = Comment.objects.filter(pk=instance.pk, is_approved=True).values_list('article_id', flat=True).first()
+    setattr(instance, STATE_ATTR, state)
+
+
+def comment_saved(instance):
+    old = getattr(instance, STATE_ATTR, None)
+    new = instance.article_id if instance.is_approved else None
+    if old == new:
+        return
+    apply_comments(old, -1)
+    apply_comments(new, 1)
+
+
+def comment_deleted(instance):
+    apply_comments(getattr(instance, STATE_ATTR, None), -1)
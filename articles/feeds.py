@@ -0,0 +1,170 @@
+"""
+تغذيات المقالات (RSS 2.0 و Atom)
+
+آخر المقالات المنشورة للموقع كله أو لتصنيف أو وسم. حالة التغذية تُحسب
+باستعلام تجميعي واحد (آخر نشر، آخر تعديل، العدد) ومنها ETag و Last-Modified،
+فتُجاب طلبات If-None-Match و If-Modified-Since بـ 304 بدون أي استعلام آخر.
+نص التغذية المولد (ومعه نسخة gzip اختيارياً) يُخزن في الكاش بمفتاح من هذه
+الحالة، فيتجدد وحده عند نشر مقال أو تعديله أو إلغاء نشره.
+"""
+import gzip
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.http import http_date
+from django.utils.translation import get_language
+from django.utils.translation import gettext as _
+
+from .models import Article, Category, Tag
+
+FEED_TYPES = {
+    'rss': Rss201rev2Feed,
+    'atom': Atom1Feed,
+}
+
+
+class FeedScope:
+    """
+    مجموعة المقالات في التغذية
+    filters: شروط المقالات بالـ slug (بدون جلب التصنيف أو الوسم)
+    describe: دالة تعيد (العنوان، الرابط، الوصف)، تُستدعى فقط عند توليد النص
+    """
+
+    def __init__(self, name, filters, describe):
+        self.name = name
+        self.filters = filters
+        self.describe = describe
+
+    def articles(self):
+        return Article.objects.filter(status='published', published_at__isnull=False, **self.filters)
+
+
+def site_scope():
+    return FeedScope('all', {}, lambda: (_('Latest Articles'), '/', _('Latest published articles')))
+
+
+def category_scope(slug):
+    def describe():
+        category = get_object_or_404(Category, slug=slug)
+        return (
+            _('Articles in %(name)s') % {'name': category.name},
+            category.get_absolute_url(),
+            category.description or category.name,
+        )
+    return FeedScope(f'category:{slug}', {'category__slug': slug}, describe)
+
+
+def tag_scope(slug):
+    def describe():
+        tag = get_object_or_404(Tag, slug=slug)
+        return (
+            _('Articles tagged %(name)s') % {'name': tag.name},
+            tag.get_absolute_url(),
+            tag.description or tag.name,
+        )
+    return FeedScope(f'tag:{slug}', {'tags__slug': slug}, describe)
+
+
+def feed_state(articles):
+    """(آخر نشر، آخر تعديل، العدد) باستعلام واحد"""
+    state = articles.order_by().aggregate(
+        latest=Max('published_at'), modified=Max('updated_at'), total=Count('pk', distinct=True)
+    )
+    return state['latest'], state['modified'], state['total']
+
+
+def build_feed(request, kind, scope):
+    """نص التغذية لآخر FEED_ITEMS مقالاً"""
+    title, link, description = scope.describe()
+    feed = FEED_TYPES[kind](
+        title=title,
+        link=request.build_absolute_uri(link),
+        description=description,
+        feed_url=request.build_absolute_uri(),
+        language=get_language(),
+    )
+    items = scope.articles().select_related('author').prefetch_related('tags').order_by(
+        '-published_at', '-pk'
+    )[:getattr(settings, 'FEED_ITEMS', 20)]
+    for article in items:
+        url = request.build_absolute_uri(article.get_absolute_url())
+        author = article.author
+        feed.add_item(
+            title=article.title,
+            link=url,
+            unique_id=url,
+            description=article.excerpt,
+            pubdate=article.published_at,
+            updateddate=article.updated_at,
+            author_name=(author.get_full_name() or author.get_username()) if author else None,
+            categories=[tag.name for tag in article.tags.all()],
+        )
+    return feed.writeString('utf-8').encode('utf-8')
+
+
+def accepts_gzip(request):
+    """هل يقبل العميل gzip حسب Accept-Encoding (مع احترام q=0)"""
+    qualities = {}
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, *params = [item.strip() for item in part.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    for coding in ('gzip', 'x-gzip'):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return qualities.get('*', 0) > 0
+
+
+def feed_response(request, kind, scope):
+    """استجابة التغذية مع ETag و Last-Modified وكاش النص المولد"""
+    latest, modified, total = feed_state(scope.articles())
+    if not total and scope.filters:
+        # تصنيف أو وسم بدون مقالات منشورة: 404 إذا لم يكن موجوداً
+        scope.describe()
+
+    state = f'{kind}:{scope.name}:{get_language()}:{request.get_host()}:{latest}:{modified}:{total}'
+    digest = hashlib.md5(state.encode('utf-8')).hexdigest()
+    compressed = getattr(settings, 'FEED_PRECOMPRESS', True) and accepts_gzip(request)
+    # النسخة المضغوطة تمثيل مختلف بايتاً ببايت، فلها ETag قوي خاص بها
+    etag = f'"{digest}-gzip"' if compressed else f'"{digest}"'
+    last_modified = int(modified.timestamp()) if modified else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        key = f'article_feed:{digest}'
+        body = cache.get(key)
+        if body is None or (compressed and 'gzip' not in body):
+            content = body['content'] if body else build_feed(request, kind, scope)
+            body = {'content': content}
+            if getattr(settings, 'FEED_PRECOMPRESS', True):
+                body['gzip'] = gzip.compress(content, mtime=0)
+            cache.set(key, body, getattr(settings, 'FEED_CACHE_TIMEOUT', 3600))
+
+        content_type = FEED_TYPES[kind].content_type
+        if compressed:
+            response = HttpResponse(body['gzip'], content_type=content_type)
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(body['content'], content_type=content_type)
+
+    patch_vary_headers(response, ('Accept-Encoding',))
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = f'public, max-age={getattr(settings, "FEED_MAX_AGE", 300)}'
+    return response
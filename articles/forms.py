@@ -10,7 +10,7 @@ class ArticleForm(forms.ModelForm):
         model = Article
         fields = [
             'title', 'slug', 'content', 'excerpt', 'featured_image',
-            'category', 'tags', 'reading_time', 'status',
+            'category', 'tags', 'status',
             'is_featured', 'is_pinned', 'is_premium', 'allow_comments',
             'meta_title', 'meta_description', 'scheduled_for'
         ]
@@ -35,11 +35,6 @@ class ArticleForm(forms.ModelForm):
             }),
             'category': forms.Select(attrs={'class': 'form-control'}),
             'tags': forms.SelectMultiple(attrs={'class': 'form-control', 'data-placeholder': _('Select tags')}),
-            'reading_time': forms.NumberInput(attrs={
-                'class': 'form-control',
-                'min': 1,
-                'max': 60
-            }),
             'status': forms.Select(attrs={'class': 'form-control'}),
             'is_featured': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
             'is_pinned': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
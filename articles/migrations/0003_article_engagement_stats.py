@@ -0,0 +1,61 @@
+# Generated by Django 5.2.10 on 2026-10-17 02:49
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_engagement_stats(apps, schema_editor):
+    Article = apps.get_model('articles', 'Article')
+    ArticleRating = apps.get_model('articles', 'ArticleRating')
+    Comment = apps.get_model('articles', 'Comment')
+
+    ratings = ArticleRating.objects.order_by().values('article').annotate(total=Sum('rating'), n=Count('pk'))
+    for row in ratings.iterator():
+        Article.objects.filter(pk=row['article']).update(
+            rating_sum=row['total'], rating_count=row['n'], rating_avg=row['total'] / row['n'],
+        )
+    comments = Comment.objects.filter(is_approved=True).order_by().values('article').annotate(n=Count('pk'))
+    for row in comments.iterator():
+        Article.objects.filter(pk=row['article']).update(approved_comments_count=row['n'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0002_alter_article_options_alter_comment_options_and_more'),
+        ('core', '0005_contentcount'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='approved_comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Approved Comments'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='rating_avg',
+            field=models.FloatField(default=0, editable=False, verbose_name='Average Rating'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Rating Count'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Rating Sum'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['status', '-rating_avg', '-rating_count'], name='article_status_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['status', '-approved_comments_count'], name='article_status_comments_idx'),
+        ),
+        migrations.RunPython(backfill_engagement_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.10 on 2026-10-17 02:56
+
+from django.db import migrations, models
+
+from core.content import block_offsets, make_excerpt, plain_text, reading_time, word_count
+
+
+def derive_content(apps, schema_editor):
+    Article = apps.get_model('articles', 'Article')
+    for article in Article.objects.only('pk', 'content', 'excerpt').iterator(chunk_size=500):
+        text = plain_text(article.content)
+        Article.objects.filter(pk=article.pk).update(
+            content_blocks=block_offsets(article.content),
+            reading_time=reading_time(word_count(text)),
+            excerpt=make_excerpt(article.excerpt or text),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0003_article_engagement_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='content_blocks',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Content Blocks'),
+        ),
+        migrations.AlterField(
+            model_name='article',
+            name='reading_time',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Reading Time (minutes)'),
+        ),
+        migrations.RunPython(derive_content, migrations.RunPython.noop),
+    ]
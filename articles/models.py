@@ -1,7 +1,11 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
+from django.utils import timezone
 from django.urls import reverse
 from core.models import BaseContent
+from core.counters import record_view
+from core.related import related_content
+from core.content import derive_content
 from django.conf import settings
 
 class Category(models.Model):
@@ -61,6 +65,8 @@ class Tag(models.Model):
         """عدد المقالات في هذا الوسم"""
         return self.article_set.filter(status='published').count()
 
+ENGAGEMENT_FIELDS = ('rating_sum', 'rating_count', 'rating_avg', 'approved_comments_count')
+
 class Article(BaseContent):
     """نموذج المقالات"""
     STATUS_CHOICES = (
@@ -71,12 +77,15 @@ class Article(BaseContent):
     )
     
     # معلومات إضافية
-    reading_time = models.PositiveIntegerField(_('Reading Time (minutes)'), default=5)
+    word_count = models.PositiveIntegerField(_('Word Count'), default=0, editable=False)
+    reading_time = models.PositiveIntegerField(_('Reading Time (minutes)'), default=1, editable=False)
     views = models.PositiveIntegerField(_('Views'), default=0)
     featured_image = models.ImageField(_('Featured Image'), upload_to='articles/featured/%Y/%m/', 
                                       null=True, blank=True)
     excerpt = models.TextField(_('Excerpt'), max_length=300, blank=True, 
                               help_text=_('Brief summary of the article (max 300 characters)'))
+    # مواضع نهايات كتل المحتوى (تُحسب عند الحفظ لإدراج الإعلانات بدون إعادة تحليل)
+    content_blocks = models.JSONField(_('Content Blocks'), default=list, blank=True, editable=False)
     
     # العلاقات
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, 
@@ -100,6 +109,12 @@ class Article(BaseContent):
     meta_description = models.CharField(_('Meta Description'), max_length=160, blank=True, 
                                        help_text=_('Description for SEO (max 160 characters)'))
     
+    # إحصائيات التفاعل (تُحدث من التقييمات والتعليقات، انظر articles.engagement)
+    rating_sum = models.PositiveIntegerField(_('Rating Sum'), default=0, editable=False)
+    rating_count = models.PositiveIntegerField(_('Rating Count'), default=0, editable=False)
+    rating_avg = models.FloatField(_('Average Rating'), default=0, editable=False)
+    approved_comments_count = models.PositiveIntegerField(_('Approved Comments'), default=0, editable=False)
+    
     # التواريخ
     published_at = models.DateTimeField(_('Published At'), null=True, blank=True)
     scheduled_for = models.DateTimeField(_('Scheduled For'), null=True, blank=True, 
@@ -114,12 +129,21 @@ class Article(BaseContent):
             models.Index(fields=['category', 'status']),
             models.Index(fields=['is_featured', 'status']),
             models.Index(fields=['slug']),
+            models.Index(fields=['status', '-rating_avg', '-rating_count'], name='article_status_rating_idx'),
+            models.Index(fields=['status', '-approved_comments_count'], name='article_status_comments_idx'),
         ]
     
     def __str__(self):
         return self.title
     
     def save(self, *args, **kwargs):
+        # إحصائيات التفاعل تُكتب فقط بتحديثات F() الذرية، فلا نعيد كتابتها بقيم قديمة من الذاكرة
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ENGAGEMENT_FIELDS
+            ]
+        
         # إذا تم نشر المقال لأول مرة، ضع تاريخ النشر
         if self.status == 'published' and not self.published_at:
             from django.utils import timezone
@@ -130,14 +154,13 @@ class Article(BaseContent):
             self.status = 'published'
             self.published_at = self.scheduled_for
         
+        # تحليل المحتوى مرة واحدة: حدود الكتل، عدد الكلمات، وقت القراءة، الملخص والوصف
+        derive_content(self)
+        
         # إذا كان عنوان الـ Meta فارغاً، استخدم العنوان العادي
         if not self.meta_title:
             self.meta_title = self.title[:70]
         
-        # إذا كان وصف الـ Meta فارغاً، استخدم الملخص
-        if not self.meta_description and self.excerpt:
-            self.meta_description = self.excerpt[:160]
-        
         super().save(*args, **kwargs)
     
     def get_absolute_url(self):
@@ -155,37 +178,23 @@ class Article(BaseContent):
     
     def increment_views(self):
         """زيادة عدد المشاهدات"""
+        # تُكتب الزيادة لاحقاً على دفعات، ونحدث النسخة الحالية للعرض فقط
+        record_view(self)
         self.views += 1
-        self.save(update_fields=['views'])
     
     def get_related_articles_with_fallback(self, count=3):
         """الحصول على مقالات ذات صلة مع خيار احتياطي"""
-        related = self.related_articles.filter(status='published')
-        
-        if related.count() >= count:
-            return related[:count]
-        
-        # إذا لم يكن هناك مقالات مرتبطة كافية، أضف مقالات من نفس التصنيف
-        same_category = Article.objects.filter(
+        # الجيران محسوبون مسبقاً (core.related)؛ المقالات الجديدة تأخذ مقالات من نفس التصنيف
+        fallback = Article.objects.filter(
             category=self.category,
             status='published'
-        ).exclude(id=self.id).distinct()
-        
-        result = list(related)
-        needed = count - len(result)
-        
-        if needed > 0 and same_category.exists():
-            # استبعاد المقالات المضافة بالفعل
-            existing_ids = [article.id for article in result]
-            additional = same_category.exclude(id__in=existing_ids)[:needed]
-            result.extend(additional)
-        
-        return result[:count]
+        ).exclude(id=self.id).select_related('author', 'category')
+        return related_content.related(self, count, fallback=fallback)
     
     @property
     def comments_count(self):
         """عدد التعليقات المعتمدة"""
-        return self.comments.filter(is_approved=True).count()
+        return self.approved_comments_count
 
 class Comment(models.Model):
     """نموذج التعليقات على المقالات"""
@@ -260,7 +269,8 @@ class ArticleView(models.Model):
     ip_address = models.GenericIPAddressField()
     user_agent = models.TextField(blank=True)
     session_key = models.CharField(max_length=40)
-    created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
+    # وقت الحدث نفسه (يُمرر من طابور التحليلات) وليس وقت الكتابة
+    created_at = models.DateTimeField(default=timezone.now, editable=False, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
         
     class Meta:
@@ -1,8 +1,12 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save, m2m_changed
 from django.dispatch import receiver
 from django.utils import timezone
-from .models import Article, Comment
-from django.core.cache import cache
+from django.db import transaction
+from .models import Article, ArticleRating, Category, Comment
+from . import engagement
+from django.utils.translation import gettext_lazy as _
+from core.cache_versions import bump
+from core.search import search_engine
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,27 +22,35 @@ def handle_article_scheduling(sender, instance, **kwargs):
 @receiver(post_save, sender=Article)
 def clear_article_cache(sender, instance, **kwargs):
     """مسح كاش المقالات عند التحديث"""
-    # مسح كاش الصفحات الرئيسية
-    cache_keys = [
-        'article_list_*',
-        'article_featured_*',
-        'article_popular_*',
-        'article_tag_*',
-        'article_category_*',
-    ]
+    # مسح كاش الصفحات الرئيسية وكاش الوسوم والتصنيف الخاصة بالمقال
+    namespaces = ['article_list', 'article_featured', 'article_popular']
+    if instance.category_id:
+        namespaces.append(f'category:{instance.category.slug}')
+    if instance.pk:
+        namespaces.extend(f'tag:{slug}' for slug in instance.tags.values_list('slug', flat=True))
     
-    for key_pattern in cache_keys:
-        cache.delete_pattern(key_pattern)
+    bump(*namespaces)
     
     logger.info(f"Article cache cleared for {instance.title}")
 
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def clear_category_cache(sender, instance, **kwargs):
+    """التصنيفات جزء من القوائم المخزنة في السياق العام"""
+    bump('categories')
+
+@receiver(m2m_changed, sender=Article.tags.through)
+def reindex_article_tags(sender, instance, action, reverse, **kwargs):
+    """إعادة فهرسة المقال عند تغيير وسومه"""
+    if action in ('post_add', 'post_remove', 'post_clear') and not reverse:
+        # وسوم المقال جزء من أجزاء صفحته المخزنة
+        bump(f'article:{instance.pk}')
+        transaction.on_commit(lambda: search_engine.index_instance(instance))
+
 @receiver(post_save, sender=Comment)
 def handle_new_comment(sender, instance, created, **kwargs):
     """معالجة التعليقات الجديدة"""
     if created and instance.is_approved:
-        # زيادة عداد التعليقات في المقال
-        instance.article.save()
-        
         # إرسال إشعار للمؤلف إذا كان مختلفاً عن صاحب التعليق
         if instance.user and instance.user != instance.article.author:
             from django.core.mail import send_mail
@@ -83,4 +95,34 @@ def check_comment_spam(sender, instance, **kwargs):
     if content_lower.count('http') > 3:
         instance.is_spam = True
         instance.is_approved = False
-        logger.warning(f"Comment marked as spam (too many links): {instance.content[:50]}...")
\ No newline at end of file
+        logger.warning(f"Comment marked as spam (too many links): {instance.content[:50]}...")
+
+@receiver(pre_save, sender=ArticleRating)
+@receiver(pre_delete, sender=ArticleRating)
+def remember_rating_state(sender, instance, **kwargs):
+    """حفظ التقييم السابق لحساب الفرق"""
+    engagement.remember_rating(instance)
+
+@receiver(post_save, sender=ArticleRating)
+def update_rating_stats(sender, instance, **kwargs):
+    """تحديث مجموع وعدد ومتوسط تقييمات المقال"""
+    engagement.rating_saved(instance)
+
+@receiver(post_delete, sender=ArticleRating)
+def remove_rating_stats(sender, instance, **kwargs):
+    engagement.rating_deleted(instance)
+
+@receiver(pre_save, sender=Comment)
+@receiver(pre_delete, sender=Comment)
+def remember_comment_state(sender, instance, **kwargs):
+    """حفظ حالة الاعتماد السابقة للتعليق"""
+    engagement.remember_comment(instance)
+
+@receiver(post_save, sender=Comment)
+def update_comment_stats(sender, instance, **kwargs):
+    """تحديث عدد التعليقات المعتمدة في المقال"""
+    engagement.comment_saved(instance)
+
+@receiver(post_delete, sender=Comment)
+def remove_comment_stats(sender, instance, **kwargs):
+    engagement.comment_deleted(instance)
@@ -1,3 +1,249 @@
-from django.test import TestCase
+import gzip
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core.analytics import EventPipeline, pipeline
+from core.cache_versions import get_version
+from core.comment_tree import comment_trees
+from core.counting import counts
+from core.counters import view_counter
+from core.page_cache import content_namespace
+
+from . import engagement
+from .feeds import accepts_gzip
+from .models import Article, ArticleRating, Bookmark, Comment, Tag
+from .views import article_fragments, user_article_state
+
+User = get_user_model()
+
+
+class EngagementMixin:
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('reader', 'reader@example.com', 'password')
+        # The reader owns the article, so new approved comments send no author email
+        self.article = Article.objects.create(title='Article', slug='article', content='text',
+                                              status='published', author=self.user)
+
+    def comment(self, **fields):
+        fields.setdefault('is_approved', True)
+        return Comment.objects.create(article=self.article, user=self.user, name='Reader',
+                                      email='reader@example.com', content='Nice', **fields)
+
+    def stats(self):
+        engagement.refresh(self.article)
+        return (self.article.rating_sum, self.article.rating_count,
+                self.article.rating_avg, self.article.approved_comments_count)
+
+
+class EngagementTests(EngagementMixin, TestCase):
+    def test_ratings_apply_deltas(self):
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+        rating = ArticleRating.objects.create(article=self.article, user=self.user, rating=4, ip_address='10.0.0.1')
+        ArticleRating.objects.create(article=self.article, user=other, rating=2, ip_address='10.0.0.2')
+        self.assertEqual(self.stats()[:3], (6, 2, 3.0))
+
+        rating.rating = 5
+        rating.save()
+        self.assertEqual(self.stats()[:3], (7, 2, 3.5))
+        rating.delete()
+        self.assertEqual(self.stats()[:3], (2, 1, 2.0))
+
+    def test_comment_approval_moves_the_count(self):
+        comment = self.comment(is_approved=False)
+        self.assertEqual(self.stats()[3], 0)
+        comment.approve()
+        self.assertEqual(self.stats()[3], 1)
+        comment.delete()
+        self.assertEqual(self.stats()[3], 0)
+
+    def test_saving_the_article_keeps_the_counters(self):
+        self.comment()
+        self.article.title = 'Renamed'
+        self.article.save()
+        self.assertEqual(self.stats()[3], 1)
+
+    def test_rebuild_repairs_drift(self):
+        self.comment()
+        Article.objects.filter(pk=self.article.pk).update(approved_comments_count=5, rating_avg=2)
+        self.assertEqual(engagement.rebuild(), 1)
+        self.assertEqual(self.stats(), (0, 0, 0.0, 1))
+        self.assertEqual(engagement.rebuild(), 0)
+
+    def test_rebuild_walks_every_chunk_once(self):
+        for i in range(5):
+            Article.objects.create(title=f'Drift {i}', slug=f'drift-{i}', content='text', author=self.user)
+        Article.objects.update(approved_comments_count=3)
+        with mock.patch.object(engagement, 'REBUILD_CHUNK_SIZE', 2):
+            self.assertEqual(engagement.rebuild(), 6)
+        self.assertFalse(Article.objects.exclude(approved_comments_count=0).exists())
+
+
+class CommentAdminActionTests(EngagementMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.admin)
+
+    def run_action(self, action, comments):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('admin:articles_comment_changelist'), {
+                'action': action,
+                '_selected_action': [comment.pk for comment in comments],
+            })
+        self.assertEqual(response.status_code, 302)
+
+    def test_bulk_actions_keep_the_comment_count(self):
+        pending = [self.comment(is_approved=False) for _ in range(3)]
+        version = get_version(content_namespace('articles.article', self.article.pk))
+
+        self.run_action('approve_comments', pending)
+        self.assertEqual(self.stats()[3], 3)
+        self.assertNotEqual(get_version(content_namespace('articles.article', self.article.pk)), version)
+
+        self.run_action('mark_as_spam', pending[:1])
+        self.assertEqual(self.stats()[3], 2)
+        self.run_action('disapprove_comments', pending[1:])
+        self.assertEqual(self.stats()[3], 0)
+
+    def test_bulk_actions_refresh_the_comment_tree(self):
+        spam = [self.comment(is_approved=False, is_spam=True) for _ in range(2)]
+        self.assertEqual(comment_trees.get(self.article).total, 0)
+        self.run_action('mark_as_not_spam', spam)
+        self.run_action('approve_comments', spam)
+        self.assertEqual(comment_trees.get(self.article).total, 2)
+        self.run_action('mark_as_spam', spam[:1])
+        self.assertEqual(comment_trees.get(self.article).total, 1)
+
+
+class ArticleAdminActionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.admin)
+        self.articles = [
+            Article.objects.create(title=f'Article {i}', slug=f'article-{i}', content='text', author=self.admin)
+            for i in range(3)
+        ]
+        counts.reconcile('articles.article')
+
+    def run_action(self, action, articles):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('admin:articles_article_changelist'), {
+                'action': action,
+                '_selected_action': [article.pk for article in articles],
+            })
+        self.assertEqual(response.status_code, 302)
+
+    def test_status_actions_keep_the_counts(self):
+        self.run_action('make_published', self.articles)
+        self.assertEqual(counts.get('articles.article'), 3)
+        self.run_action('make_draft', self.articles[:2])
+        self.assertEqual((counts.get('articles.article'), counts.get('articles.article', 'draft')), (1, 2))
+        self.assertEqual(counts.reconcile('articles.article'), 0)
+
+
+@override_settings(VIEW_COUNTER_BACKEND='local', VIEW_COUNTER_MAX_PENDING=1000)
+class ListingPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        view_counter.flush()
+        self.addCleanup(view_counter.flush)
+        self.tag = Tag.objects.create(name='Django', slug='django')
+
+    def test_tag_pages_are_cached_for_visitors_and_still_count_views(self):
+        url = reverse('articles:tag', args=[self.tag.slug])
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'hit')
+        self.assertEqual(view_counter.pending(('articles.tag', self.tag.pk)), 2)
+
+        self.tag.description = 'Web framework'
+        self.tag.save()
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+
+
+class ArticleFragmentTests(EngagementMixin, TestCase):
+    def test_fragments_are_cached_until_comments_change(self):
+        first = article_fragments(self.article)
+        self.assertEqual(first['comments_count'], 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(article_fragments(self.article), first)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.comment()
+        self.assertEqual(article_fragments(self.article)['comments_count'], 1)
+
+    def test_user_state_in_one_query(self):
+        ArticleRating.objects.create(article=self.article, user=self.user, rating=4, ip_address='10.0.0.1')
+        Bookmark.objects.create(article=self.article, user=self.user)
+        with self.assertNumQueries(1):
+            state = user_article_state(self.user, pk=self.article.pk)
+        self.assertEqual(state, {'rating': 4, 'is_bookmarked': True})
+        self.assertIsNone(user_article_state(self.user, pk=0))
+
+    @mock.patch.object(EventPipeline, '_run', lambda self: None)
+    def test_detail_renders_the_visitor_state(self):
+        # Write the recorded view inside the test transaction so it is rolled back
+        self.addCleanup(view_counter.flush)
+        self.addCleanup(pipeline.flush)
+        ArticleRating.objects.create(article=self.article, user=self.user, rating=3, ip_address='10.0.0.1')
+        self.client.force_login(self.user)
+        response = self.client.get(self.article.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['user_rating'], 3)
+        self.assertFalse(response.context['is_bookmarked'])
+
+
+class FeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.article = Article.objects.create(title='Feed article', slug='feed-article', content='text',
+                                              status='published')
+        self.url = reverse('articles:feed', args=['rss'])
+
+    def test_accepts_gzip_honours_q_values(self):
+        factory = RequestFactory()
+        for header, expected in [
+            ('gzip, deflate', True),
+            ('deflate, gzip;q=0.5', True),
+            ('gzip;q=0', False),
+            ('gzip; q=0.0, identity', False),
+            ('*', True),
+            ('*;q=0', False),
+            ('gzip;q=0, *', False),
+            ('', False),
+        ]:
+            self.assertEqual(accepts_gzip(factory.get('/', HTTP_ACCEPT_ENCODING=header)), expected, header)
+
+    def test_gzip_body_has_its_own_etag(self):
+        plain = self.client.get(self.url)
+        packed = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(packed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(packed.content), plain.content)
+        self.assertEqual(packed['ETag'], plain['ETag'][:-1] + '-gzip"')
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        refused = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', refused)
+        self.assertEqual(refused['ETag'], plain['ETag'])
+
+    def test_conditional_requests_match_their_representation(self):
+        packed = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=packed['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('Accept-Encoding', response['Vary'])
+        # A cached gzip validator does not validate the identity body
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=packed['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_new_article_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        Article.objects.create(title='Newer', slug='newer', content='text', status='published')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Newer', response.content)
@@ -1,6 +1,19 @@
-from django.urls import path
+from django.urls import path, register_converter
 from . import views
 
+
+class FeedKindConverter:
+    regex = 'rss|atom'
+
+    def to_python(self, value):
+        return value
+
+    def to_url(self, value):
+        return value
+
+
+register_converter(FeedKindConverter, 'feed')
+
 app_name = 'articles'
 
 urlpatterns = [
@@ -18,6 +31,12 @@ urlpatterns = [
     path('popular/', views.popular_articles, name='popular'),
     path('latest/', views.latest_articles, name='latest'),
     
+    # التغذيات (قبل المقالات المفردة حتى لا يُعامل rss كـ slug)
+    path('rss/', views.article_rss_feed, name='rss_feed'),
+    path('feed/<feed:kind>/', views.article_feed, name='feed'),
+    path('category/<slug:slug>/feed/<feed:kind>/', views.category_feed, name='category_feed'),
+    path('tag/<slug:slug>/feed/<feed:kind>/', views.tag_feed, name='tag_feed'),
+    
     # المقالات المفردة
     path('<slug:slug>/', views.article_detail, name='detail'),
     path('<slug:slug>/rate/', views.rate_article, name='rate'),
@@ -33,5 +52,4 @@ urlpatterns = [
     # التقارير والإحصائيات
     path('stats/', views.article_statistics, name='stats'),
     path('sitemap.xml', views.article_sitemap, name='sitemap'),
-    path('rss/', views.article_rss_feed, name='rss_feed'),
 ]
@@ -1,33 +1,53 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
+from django.conf import settings
 from django.utils.translation import gettext_lazy as _
-from django.http import JsonResponse, HttpResponse, HttpResponseForbidden
-from django.db.models import Sum, Count, Q, F, Avg, Max, Min
+from django.http import Http404, JsonResponse, HttpResponse, HttpResponseForbidden
+from django.db.models import Sum, Count, Q, F, Avg, Max, Min, Exists, OuterRef, Subquery
 from django.utils import timezone
 from django.core.cache import cache
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
+from django.template.response import TemplateResponse
 from django.views.decorators.http import require_POST, require_GET
-from django.views.decorators.cache import cache_page
 from django.contrib.syndication.views import Feed
 from django.contrib.sitemaps import Sitemap
 from django.urls import reverse
+from django.utils.translation import get_language
 from datetime import datetime, timedelta
 import json
 import csv
 from .models import *
-from advertisements.models import Advertisement, AdPlacement
+from advertisements.serving import ad_index
+from advertisements.sampling import visitor_key
+from advertisements.slots import select_slots
 from advertisements.utils import generate_ad_code
+from core.analytics import record_article_view
+from core.conditional import conditional_content
+from core.page_cache import cache_anonymous, depends
+from core.counters import record_view
+from core.cache_versions import make_key
+from core.pagination import paginate
+from core.counting import counts, namespace as counts_namespace
+from core.related import namespace as related_namespace
+from core.comment_tree import comment_trees, namespace as comment_tree_namespace
+from core.content import ad_offsets, split_at
+from core.rollups import daily_totals
+from core.search import search_engine
+from . import engagement, feeds
 from .forms import ArticleForm, CommentForm, ArticleFilterForm
 from .decorators import premium_required, track_article_view
 
+ARTICLE = 'articles.article'
+ARTICLE_COUNTS = counts_namespace(ARTICLE)
+
 # ==============================================
 # وظائف العرض الرئيسية
 # ==============================================
 
-@cache_page(60 * 15)  # كاش لمدة 15 دقيقة
+@cache_anonymous(60 * 15, namespaces=('article_list', ARTICLE_COUNTS))  # كاش لمدة 15 دقيقة للزوار
 def article_list(request):
     """قائمة جميع المقالات مع خيارات التصفية المتقدمة"""
     # الحصول على معاملات البحث والتصفية
@@ -65,14 +85,8 @@ def article_list(request):
             articles = articles.filter(published_at__lte=date_to)
         
         if search_query:
-            articles = articles.filter(
-                Q(title__icontains=search_query) |
-                Q(content__icontains=search_query) |
-                Q(excerpt__icontains=search_query) |
-                Q(tags__name__icontains=search_query) |
-                Q(category__name__icontains=search_query) |
-                Q(author__username__icontains=search_query)
-            ).distinct()
+            # المطابقات من فهرس البحث، مع بقاء الفلاتر والترتيب المختارين
+            articles = articles.filter(pk__in=search_engine.search(ARTICLE, search_query).ids)
         
         if not show_featured:
             articles = articles.filter(is_featured=False)
@@ -88,13 +102,9 @@ def article_list(request):
         elif sort_by == '-title':
             articles = articles.order_by('-title')
         elif sort_by == 'rating':
-            articles = articles.annotate(
-                avg_rating=Avg('ratings__rating')
-            ).order_by('-avg_rating')
+            articles = articles.order_by('-rating_avg', '-rating_count')
         elif sort_by == 'comments':
-            articles = articles.annotate(
-                comments_count=Count('comments', filter=Q(comments__is_approved=True))
-            ).order_by('-comments_count')
+            articles = articles.order_by('-approved_comments_count')
         else:  # الافتراضي: الأحدث أولاً
             articles = articles.order_by('-is_pinned', '-published_at')
     else:
@@ -103,40 +113,37 @@ def article_list(request):
         if not request.user.is_authenticated:
             articles = articles.filter(is_premium=False)
     
-    # الترقيم
-    paginator = Paginator(articles, 18)  # 18 مقالة في الصفحة
-    page_number = request.GET.get('page')
-    
-    try:
-        page_obj = paginator.get_page(page_number)
-    except PageNotAnInteger:
-        page_obj = paginator.page(1)
-    except EmptyPage:
-        page_obj = paginator.page(paginator.num_pages)
-    
-    # الحصول على الإعلانات الجانبية
-    sidebar_ads = Advertisement.objects.filter(
-        active=True,
-        start_date__lte=timezone.now(),
-        end_date__gte=timezone.now(),
-        placement__code='sidebar'
-    ).order_by('-priority', '?')[:2]
-    
-    # التحضير للإعلانات
-    sidebar_ads_display = []
-    for ad in sidebar_ads:
-        sidebar_ads_display.append({
-            'html': generate_ad_code(ad.ad_type, ad.get_content_for_api(), ad.link, ad.id),
-            'width': ad.placement.width if ad.placement else 300,
-        })
+    # الترقيم بالمؤشر (18 مقالة في الصفحة)، والعدد الكلي مخزن لكل مجموعة فلاتر
+    # (يُحسب فقط إذا عرضه القالب)
+    filters = request.GET.copy()
+    filters.pop('cursor', None)
+    filters.pop('page', None)
+    page_obj = paginate(request, articles, 18, count=lambda: counts.cached_count(
+        articles, ('article_list', ARTICLE_COUNTS), request.user.is_authenticated, filters.urlencode()
+    ))
+    
+    # الحصول على الإعلانات الجانبية (أماكن تُملأ لكل زائر عند الخدمة من الكاش)
+    placement = ad_index.placements().get('sidebar')
+    sidebar_ads_display = [
+        {'html': html, 'width': placement.width if placement else 300}
+        for html in select_slots('sidebar', 2, visitor=visitor_key(request))
+    ]
     
     # إحصائيات
+    published = Article.objects.filter(status='published')
     stats = {
-        'total_articles': Article.objects.filter(status='published').count(),
-        'total_categories': Category.objects.filter(is_active=True).count(),
-        'total_tags': Tag.objects.count(),
-        'total_views': Article.objects.filter(status='published').aggregate(Sum('views'))['views__sum'] or 0,
-        'featured_count': Article.objects.filter(status='published', is_featured=True).count(),
+        'total_articles': counts.count(ARTICLE, queryset=published),
+        'total_categories': counts.cached_count(
+            Category.objects.filter(is_active=True), ARTICLE_COUNTS, 'active_categories'
+        ),
+        'total_tags': counts.cached_count(Tag.objects.all(), ARTICLE_COUNTS, 'tags'),
+        'total_views': counts.cached_value(
+            ARTICLE_COUNTS, 'total_views',
+            lambda: published.aggregate(Sum('views'))['views__sum'] or 0,
+        ),
+        'featured_count': counts.count(
+            ARTICLE, dimension='featured', queryset=published.filter(is_featured=True)
+        ),
     }
     
     # الحصول على التصنيفات والوسوم الشائعة
@@ -164,15 +171,19 @@ def article_list(request):
     
     return render(request, 'articles/list.html', context)
 
-@cache_page(60 * 5)  # كاش لمدة 5 دقائق
+def _track_tag_view(request, tag):
+    """تسجيل مشاهدة الوسم عند خدمة صفحته من الكاش"""
+    record_view(tag)
+
+@cache_anonymous(60 * 5, namespaces=('article_list', 'tag:{slug}', ARTICLE_COUNTS), track=_track_tag_view)  # كاش لمدة 5 دقائق للزوار
 def article_by_tag(request, slug):
     """عرض المقالات حسب الوسم مع عرض الإعلانات المناسبة"""
     # الحصول على الوسم
     tag = get_object_or_404(Tag, slug=slug)
+    depends(request, tag)
     
     # زيادة عدد المشاهدات للوسم
-    tag.views += 1
-    tag.save(update_fields=['views'])
+    record_view(tag)
     
     # الحصول على المقالات المنشورة بهذا الوسم
     articles = Article.objects.filter(
@@ -180,38 +191,18 @@ def article_by_tag(request, slug):
         status='published'
     ).select_related('author', 'category').prefetch_related('tags').order_by('-published_at')
     
-    # الترقيم
-    paginator = Paginator(articles, 12)
-    page_number = request.GET.get('page')
-    
-    try:
-        page_obj = paginator.get_page(page_number)
-    except PageNotAnInteger:
-        page_obj = paginator.page(1)
-    except EmptyPage:
-        page_obj = paginator.page(paginator.num_pages)
+    # الترقيم بالمؤشر
+    page_obj = paginate(request, articles, 12)
     
-    # الحصول على الإعلانات المناسبة لهذا الوسم
-    relevant_ads = Advertisement.objects.filter(
-        active=True,
-        start_date__lte=timezone.now(),
-        end_date__gte=timezone.now(),
-    ).filter(
-        Q(tags__slug=slug) | Q(tags__isnull=True)
-    ).distinct().order_by('-priority', '?')[:3]
-    
-    # إذا لم يكن هناك إعلانات خاصة بهذا الوسم، نأخذ إعلانات عامة
-    if not relevant_ads.exists():
-        relevant_ads = Advertisement.objects.filter(
-            active=True,
-            start_date__lte=timezone.now(),
-            end_date__gte=timezone.now(),
-            tags__isnull=True
-        ).order_by('-priority', '?')[:3]
+    # الإعلانات المستهدفة لهذا الوسم أو العامة (تُعاد لكل زائر عند الخدمة من الكاش)
+    ads_display = [
+        {'html': html}
+        for html in select_slots(None, 3, visitor=visitor_key(request), tag_ids=[tag.id])
+    ]
     
     # إحصائيات الوسم
     tag_stats = {
-        'total_articles': articles.count(),
+        'total_articles': counts.count(ARTICLE, dimension=f'tag:{tag.id}', queryset=articles),
         'latest_article': articles.first(),
         'most_viewed': articles.order_by('-views').first() if articles.exists() else None,
         'avg_reading_time': articles.aggregate(Avg('reading_time'))['reading_time__avg'] or 0,
@@ -225,22 +216,6 @@ def article_by_tag(request, slug):
         article_count=Count('article')
     ).order_by('-article_count')[:10]
     
-    # تحضير بيانات الإعلانات للعرض
-    ads_display = []
-    for ad in relevant_ads:
-        ad_data = {
-            'id': ad.id,
-            'title': ad.title,
-            'type': ad.ad_type,
-            'content': ad.get_content_for_api(),
-            'link': ad.link,
-            'placement': ad.placement.code if ad.placement else 'general',
-            'html': generate_ad_code(ad.ad_type, ad.get_content_for_api(), ad.link, ad.id),
-            'width': ad.placement.width if ad.placement else 300,
-            'height': ad.placement.height if ad.placement else 250,
-        }
-        ads_display.append(ad_data)
-    
     # المقالات المميزة في هذا الوسم
     featured_in_tag = articles.filter(is_featured=True)[:3]
     
@@ -263,7 +238,7 @@ def article_by_tag(request, slug):
     
     return render(request, 'articles/tag.html', context)
 
-@cache_page(60 * 5)
+@cache_anonymous(60 * 5, namespaces=('article_list', 'category:{slug}', 'categories', ARTICLE_COUNTS))
 def article_by_category(request, slug):
     """عرض المقالات حسب التصنيف"""
     category = get_object_or_404(Category, slug=slug, is_active=True)
@@ -274,24 +249,11 @@ def article_by_category(request, slug):
         status='published'
     ).order_by('-is_pinned', '-published_at')
     
-    # الترقيم
-    paginator = Paginator(articles, 12)
-    page_number = request.GET.get('page')
-    
-    try:
-        page_obj = paginator.get_page(page_number)
-    except PageNotAnInteger:
-        page_obj = paginator.page(1)
-    except EmptyPage:
-        page_obj = paginator.page(paginator.num_pages)
+    # الترقيم بالمؤشر
+    page_obj = paginate(request, articles, 12)
     
     # الإعلانات
-    category_ads = Advertisement.objects.filter(
-        active=True,
-        start_date__lte=timezone.now(),
-        end_date__gte=timezone.now(),
-        placement__code='sidebar'
-    ).order_by('-priority', '?')[:2]
+    category_ads = select_slots('sidebar', 2, visitor=visitor_key(request))
     
     # الأقسام الفرعية
     subcategories = category.children.filter(is_active=True)
@@ -300,7 +262,7 @@ def article_by_category(request, slug):
         'category': category,
         'articles': page_obj,
         'subcategories': subcategories,
-        'ads': [generate_ad_code(ad.ad_type, ad.get_content_for_api(), ad.link, ad.id) for ad in category_ads],
+        'ads': category_ads,
         'page_title': _('Articles in {category}').format(category=category.name),
         'meta_description': category.description[:160] if category.description else 
                            _('Browse articles in the {category} category').format(category=category.name),
@@ -308,12 +270,24 @@ def article_by_category(request, slug):
     
     return render(request, 'articles/category.html', context)
 
+def _track_article_view(request, article):
+    """تسجيل المشاهدة عند الرد بـ 304 (نفس مسار track_article_view)"""
+    article.increment_views()
+    record_article_view(request, article)
+
+@cache_anonymous(60 * 15, track=_track_article_view)
+@conditional_content(
+    ARTICLE,
+    filters={'status': 'published'},
+    state=('rating_sum', 'rating_count', 'approved_comments_count'),
+    namespaces=('article:{pk}', comment_tree_namespace(ARTICLE, '{pk}'), related_namespace(ARTICLE)),
+    track=_track_article_view,
+)
 @track_article_view
 def article_detail(request, slug):
     """عرض مقال مفصل"""
     article = get_object_or_404(
-        Article.objects.select_related('author', 'category')
-        .prefetch_related('tags'),
+        Article.objects.select_related('author', 'category'),
         slug=slug
     )
     
@@ -330,51 +304,36 @@ def article_detail(request, slug):
     # زيادة المشاهدات
     article.increment_views()
     
-    # الحصول على المقالات ذات الصلة
-    related_articles = article.get_related_articles_with_fallback(3)
-    
-    # التعليقات المعتمدة
-    comments = article.comments.filter(
-        is_approved=True,
-        is_spam=False,
-        parent__isnull=True
-    ).select_related('user').prefetch_related('replies')
-    
-    # الحصول على الإعلانات
-    ads = get_article_ads(article)
+    # الصفحة المخزنة للزوار تُبطل بتغيير المقال أو تعليقاته أو المقالات ذات الصلة
+    depends(request, article, f'article:{article.pk}', comment_tree_namespace(ARTICLE, article.pk),
+            related_namespace(ARTICLE))
     
-    # تقسيم المحتوى للإعلانات
-    content_with_ads = insert_ads_in_content(article.content, ads.get('in_content', []))
+    # الأجزاء المتطابقة لكل الزوار (المحتوى، الوسوم، المقالات ذات الصلة، صفحة من نقاشات التعليقات)
+    try:
+        comments_page = max(int(request.GET.get('comments_page', 1)), 1)
+    except ValueError:
+        comments_page = 1
+    fragments = article_fragments(article, comments_page)
     
-    # تقييم المستخدم إذا كان مسجلاً
-    user_rating = None
-    if request.user.is_authenticated:
-        user_rating = ArticleRating.objects.filter(
-            article=article,
-            user=request.user
-        ).first()
+    # الحصول على الإعلانات وإدراجها في أماكنها داخل المحتوى
+    ads = get_article_ads(article, visitor=visitor_key(request), tag_ids=fragments['tag_ids'])
+    content_with_ads = fill_ad_slots(fragments['body'], ads.get('in_content', []))
     
-    # التحقق من الإشارات المرجعية
-    is_bookmarked = False
-    if request.user.is_authenticated:
-        is_bookmarked = Bookmark.objects.filter(
-            user=request.user,
-            article=article
-        ).exists()
+    # تقييم المستخدم والإشارة المرجعية باستعلام واحد
+    state = user_article_state(request.user, pk=article.pk) or {}
     
     context = {
         'article': article,
         'content_with_ads': content_with_ads,
-        'related_articles': related_articles,
-        'comments': comments,
+        'fragments': fragments,
         'comment_form': CommentForm(),
         'ads': ads,
-        'user_rating': user_rating.rating if user_rating else None,
-        'is_bookmarked': is_bookmarked,
+        'user_rating': state.get('rating'),
+        'is_bookmarked': state.get('is_bookmarked', False),
         'share_url': request.build_absolute_uri(article.get_absolute_url()),
         'page_title': article.meta_title or article.title,
         'meta_description': article.meta_description or article.excerpt[:160],
-        'meta_keywords': ', '.join([tag.name for tag in article.tags.all()]),
+        'meta_keywords': ', '.join(fragments['tag_names']),
         'breadcrumbs': [
             {'name': _('Home'), 'url': '/'},
             {'name': _('Articles'), 'url': reverse('articles:list')},
@@ -384,7 +343,8 @@ def article_detail(request, slug):
         ],
     }
     
-    return render(request, 'articles/detail.html', context)
+    # TemplateResponse يتيح لديكور track_article_view قراءة المقال من السياق
+    return TemplateResponse(request, 'articles/detail.html', context)
 
 # ==============================================
 # وظائف البحث والتصفية
@@ -397,19 +357,11 @@ def article_search(request):
     if not query:
         return redirect('articles:list')
     
-    # البحث في مختلف الحقول
-    articles = Article.objects.filter(
-        Q(title__icontains=query) |
-        Q(content__icontains=query) |
-        Q(excerpt__icontains=query) |
-        Q(tags__name__icontains=query) |
-        Q(category__name__icontains=query) |
-        Q(author__username__icontains=query),
-        status='published'
-    ).distinct().order_by('-published_at')
+    # النتائج مرتبة بـ BM25 من فهرس البحث
+    result = search_engine.search(ARTICLE, query)
     
-    # الترقيم
-    paginator = Paginator(articles, 12)
+    # الترقيم على المعرفات، ثم تحميل مقالات الصفحة الحالية فقط
+    paginator = Paginator(result.ids, 12)
     page_number = request.GET.get('page')
     
     try:
@@ -419,18 +371,20 @@ def article_search(request):
     except EmptyPage:
         page_obj = paginator.page(paginator.num_pages)
     
+    found = Article.objects.filter(status='published').select_related(
+        'author', 'category'
+    ).in_bulk(page_obj.object_list)
+    page_obj.object_list = [found[pk] for pk in page_obj.object_list if pk in found]
+    
     # الإعلانات
-    search_ads = Advertisement.objects.filter(
-        active=True,
-        start_date__lte=timezone.now(),
-        end_date__gte=timezone.now(),
-        placement__code='sidebar'
-    ).order_by('-priority', '?')[:2]
+    search_ads = ad_index.select('sidebar', 2, visitor=visitor_key(request))
     
     context = {
         'articles': page_obj,
         'query': query,
-        'results_count': articles.count(),
+        # الفهرس يعيد أفضل SEARCH_MAX_RESULTS نتيجة فقط، فالعدد المعروض هو ما يمكن تصفحه
+        'results_count': len(result.ids),
+        'results_capped': result.total > len(result.ids),
         'ads': [generate_ad_code(ad.ad_type, ad.get_content_for_api(), ad.link, ad.id) for ad in search_ads],
         'page_title': _('Search results for "{query}"').format(query=query),
         'meta_description': _('Search results for {query}').format(query=query),
@@ -457,16 +411,8 @@ def article_archive(request):
     if selected_month:
         articles = articles.filter(published_at__month=selected_month)
     
-    # الترقيم
-    paginator = Paginator(articles, 24)
-    page_number = request.GET.get('page')
-    
-    try:
-        page_obj = paginator.get_page(page_number)
-    except PageNotAnInteger:
-        page_obj = paginator.page(1)
-    except EmptyPage:
-        page_obj = paginator.page(paginator.num_pages)
+    # الترقيم بالمؤشر
+    page_obj = paginate(request, articles, 24)
     
     # تنظيم الأرشيف حسب الشهور
     archive_data = {}
@@ -521,15 +467,7 @@ def featured_articles(request):
         is_featured=True
     ).order_by('-published_at')
     
-    paginator = Paginator(articles, 12)
-    page_number = request.GET.get('page')
-    
-    try:
-        page_obj = paginator.get_page(page_number)
-    except PageNotAnInteger:
-        page_obj = paginator.page(1)
-    except EmptyPage:
-        page_obj = paginator.page(paginator.num_pages)
+    page_obj = paginate(request, articles, 12)
     
     context = {
         'articles': page_obj,
@@ -610,14 +548,14 @@ def rate_article(request, slug):
         )
         message = _('Rating submitted')
     
-    # حساب المعدل الجديد
-    avg_rating = article.ratings.aggregate(Avg('rating'))['rating__avg'] or 0
+    # المعدل الجديد من الأعمدة المحدثة بإشارات التقييم
+    engagement.refresh(article)
     
     return JsonResponse({
         'success': True,
         'message': message,
-        'avg_rating': round(avg_rating, 1),
-        'rating_count': article.ratings.count()
+        'avg_rating': round(article.rating_avg, 1),
+        'rating_count': article.rating_count
     })
 
 @require_POST
@@ -746,8 +684,8 @@ def vote_comment(request, pk):
 # وظائف خدمية
 # ==============================================
 
-def get_article_ads(article):
-    """الحصول على الإعلانات المناسبة للمقال"""
+def get_article_ads(article, visitor=None, tag_ids=None):
+    """الحصول على الإعلانات المناسبة للمقال (visitor لتطبيق حد مرات الظهور)"""
     ads = {
         'top': None,
         'sidebar': [],
@@ -755,84 +693,85 @@ def get_article_ads(article):
         'bottom': None
     }
     
-    # إعلان في الأعلى
-    top_ad = Advertisement.objects.filter(
-        active=True,
-        start_date__lte=timezone.now(),
-        end_date__gte=timezone.now(),
-        placement__code='header',
-        tags__in=article.tags.all()
-    ).order_by('-priority', '?').first()
-    
-    if top_ad:
-        ads['top'] = generate_ad_code(top_ad.ad_type, top_ad.get_content_for_api(), top_ad.link, top_ad.id)
+    # إعلان في الأعلى مستهدف لوسوم المقال
+    if tag_ids is None:
+        tag_ids = [tag.id for tag in article.tags.all()]
+    # كل إعلان داخل علامات مكانه، فيُعاد اختياره لكل زائر عند خدمة الصفحة من الكاش
+    ads['top'] = select_slots('header', 1, visitor=visitor, tag_ids=tag_ids, include_untargeted=False)[0]
     
     # إعلانات في الجانب
-    sidebar_ads = Advertisement.objects.filter(
-        active=True,
-        start_date__lte=timezone.now(),
-        end_date__gte=timezone.now(),
-        placement__code='sidebar'
-    ).order_by('-priority', '?')[:2]
-    
-    for ad in sidebar_ads:
-        ads['sidebar'].append(generate_ad_code(ad.ad_type, ad.get_content_for_api(), ad.link, ad.id))
+    ads['sidebar'] = select_slots('sidebar', 2, visitor=visitor)
     
     # إعلانات داخل المحتوى
-    in_content_ads = Advertisement.objects.filter(
-        active=True,
-        start_date__lte=timezone.now(),
-        end_date__gte=timezone.now(),
-        placement__code='in_content'
-    ).order_by('-priority', '?')[:2]
-    
-    for ad in in_content_ads:
+    for html in select_slots('in_content', 2, visitor=visitor):
         ads['in_content'].append({
-            'html': generate_ad_code(ad.ad_type, ad.get_content_for_api(), ad.link, ad.id),
+            'html': html,
             'position': None  # سيتم تحديده تلقائياً
         })
     
     return ads
 
-def insert_ads_in_content(content, ads):
-    """إدراج الإعلانات داخل المحتوى"""
-    if not ads:
-        return content
-    
-    paragraphs = content.split('\n\n')
-    total_paragraphs = len(paragraphs)
-    
-    # لا ندرج إعلانات إذا كان المحتوى قصيراً
-    if total_paragraphs < 5:
-        return content
-    
-    # تحديد أماكن الإعلانات
-    ad_positions = []
-    
-    # أول إعلان بعد الفقرة الثانية
-    if total_paragraphs > 3:
-        ad_positions.append(2)
-    
-    # إعلان ثاني قبل الفقرة قبل الأخيرة
-    if total_paragraphs > 7:
-        ad_positions.append(total_paragraphs - 2)
-    
-    # إدراج الإعلانات
-    result_paragraphs = []
-    ad_index = 0
-    
-    for i, paragraph in enumerate(paragraphs):
-        result_paragraphs.append(paragraph)
-        
-        if i in ad_positions and ad_index < len(ads):
-            result_paragraphs.append(
-                f'<div class="in-content-ad ad-position-{ad_index + 1}">'
-                f'{ads[ad_index]["html"]}'
+def split_for_ads(content, blocks):
+    """تقسيم المحتوى عند أماكن إعلانات المحتوى من حدود الكتل المحسوبة عند الحفظ"""
+    return split_at(content, ad_offsets(blocks))
+
+def fill_ad_slots(pieces, ads):
+    """وصل أجزاء المحتوى مع إعلانات الطلب الحالي بينها"""
+    result = [pieces[0]]
+    for index, piece in enumerate(pieces[1:]):
+        if index < len(ads):
+            result.append(
+                f'<div class="in-content-ad ad-position-{index + 1}">'
+                f'{ads[index]["html"]}'
                 f'</div>'
             )
-            ad_index += 1
-    
-    return '\n\n'.join(result_paragraphs)
+        result.append(piece)
+    return ''.join(result)
+
+def article_fragments(article, comments_page=1):
+    """
+    أجزاء صفحة المقال المتطابقة لكل الزوار، مخزنة في الكاش
+    المفتاح يتغير مع updated_at وإصدار التعليقات ووسوم المقال والمقالات ذات الصلة
+    """
+    key = make_key(
+        [f'article:{article.pk}', comment_tree_namespace(ARTICLE, article.pk), related_namespace(ARTICLE)],
+        'fragments', article.updated_at.timestamp() if article.updated_at else 0, get_language(), comments_page,
+    )
+    fragments = cache.get(key)
+    if fragments is None:
+        tags = list(article.tags.all())
+        tree = comment_trees.get(article)
+        threads = tree.page(comments_page)
+        fragments = {
+            'body': split_for_ads(article.content, article.content_blocks),
+            'tag_ids': [tag.id for tag in tags],
+            'tag_names': [tag.name for tag in tags],
+            'tags': render_to_string('articles/partials/tags.html', {'article': article}),
+            'related': render_to_string('articles/partials/related.html', {
+                'related_articles': article.get_related_articles_with_fallback(3),
+            }),
+            'comments': render_to_string('articles/partials/comments.html', {
+                'comments': threads.object_list,
+                'threads': threads,
+            }),
+            'comments_count': tree.total,
+        }
+        cache.set(key, fragments, getattr(settings, 'ARTICLE_FRAGMENT_TIMEOUT', 600))
+    return fragments
+
+def user_article_state(user, **lookup):
+    """تقييم المستخدم للمقال وحالة الإشارة المرجعية باستعلام واحد (None إذا لم يوجد المقال)"""
+    if not user.is_authenticated:
+        return {'rating': None, 'is_bookmarked': False}
+    state = Article.objects.filter(**lookup).annotate(
+        user_rating=Subquery(
+            ArticleRating.objects.filter(article=OuterRef('pk'), user=user).values('rating')[:1]
+        ),
+        bookmarked=Exists(Bookmark.objects.filter(article=OuterRef('pk'), user=user)),
+    ).values('user_rating', 'bookmarked').first()
+    if state is None:
+        return None
+    return {'rating': state['user_rating'], 'is_bookmarked': state['bookmarked']}
 
 def send_article_by_email(article, recipient_email, sender_user):
     """إرسال المقال عبر البريد الإلكتروني"""
@@ -926,21 +865,23 @@ def article_statistics(request):
     """إحصائيات المقالات"""
     # إحصائيات عامة
     stats = {
-        'total_articles': Article.objects.count(),
-        'published_articles': Article.objects.filter(status='published').count(),
-        'draft_articles': Article.objects.filter(status='draft').count(),
+        'total_articles': counts.cached_count(Article.objects.all(), ARTICLE_COUNTS, 'all'),
+        'published_articles': counts.count(ARTICLE, queryset=Article.objects.filter(status='published')),
+        'draft_articles': counts.count(ARTICLE, 'draft', queryset=Article.objects.filter(status='draft')),
         'total_views': Article.objects.aggregate(Sum('views'))['views__sum'] or 0,
-        'total_comments': Comment.objects.filter(is_approved=True).count(),
+        'total_comments': Article.objects.aggregate(Sum('approved_comments_count'))['approved_comments_count__sum'] or 0,
         'avg_reading_time': Article.objects.filter(status='published').aggregate(Avg('reading_time'))['reading_time__avg'] or 0,
     }
     
+    # المشاهدات اليومية من جدول الملخصات بدلاً من مسح جدول ArticleView
+    views_by_day = daily_totals('articles.article', days=30)
+    stats['views_last_30_days'] = sum(day['views'] for day in views_by_day)
+    
     # المقالات الأكثر مشاهدة
     most_viewed = Article.objects.filter(status='published').order_by('-views')[:10]
     
     # المقالات الأكثر تعليقاً
-    most_commented = Article.objects.filter(status='published').annotate(
-        comments_count=Count('comments', filter=Q(comments__is_approved=True))
-    ).order_by('-comments_count')[:10]
+    most_commented = Article.objects.filter(status='published').order_by('-approved_comments_count')[:10]
     
     # التوزيع حسب التصنيف
     by_category = Category.objects.annotate(
@@ -966,45 +907,35 @@ def article_statistics(request):
         'most_commented': most_commented,
         'by_category': by_category,
         'by_month': by_month,
+        'views_by_day': views_by_day,
         'page_title': _('Article Statistics'),
     }
     
     return render(request, 'articles/statistics.html', context)
 
 def article_sitemap(request):
-    """خريطة الموقع للمقالات"""
-    articles = Article.objects.filter(
-        status='published',
-        published_at__isnull=False
-    ).order_by('-published_at')
-    
-    context = {
-        'articles': articles,
-        'base_url': request.build_absolute_uri('/')[:-1]
-    }
-    
-    response = render(request, 'articles/sitemap.xml', context)
-    response['Content-Type'] = 'application/xml'
-    
-    return response
+    """خريطة الموقع للمقالات (ضمن فهرس خريطة الموقع الثابت)"""
+    return redirect('sitemap_index', permanent=True)
 
+@require_GET
 def article_rss_feed(request):
     """تغذية RSS للمقالات"""
-    articles = Article.objects.filter(
-        status='published',
-        published_at__isnull=False
-    ).order_by('-published_at')[:20]
-    
-    context = {
-        'articles': articles,
-        'site_url': request.build_absolute_uri('/')[:-1],
-        'feed_url': request.build_absolute_uri(),
-    }
-    
-    response = render(request, 'articles/rss_feed.xml', context)
-    response['Content-Type'] = 'application/rss+xml'
-    
-    return response
+    return feeds.feed_response(request, 'rss', feeds.site_scope())
+
+@require_GET
+def article_feed(request, kind):
+    """تغذية المقالات (rss أو atom)"""
+    return feeds.feed_response(request, kind, feeds.site_scope())
+
+@require_GET
+def category_feed(request, slug, kind):
+    """تغذية مقالات التصنيف"""
+    return feeds.feed_response(request, kind, feeds.category_scope(slug))
+
+@require_GET
+def tag_feed(request, slug, kind):
+    """تغذية مقالات الوسم"""
+    return feeds.feed_response(request, kind, feeds.tag_scope(slug))
 
 # ==============================================
 # الديكورات المساعدة
@@ -1019,22 +950,3 @@ def premium_required(view_func):
             messages.info(request, _('This content requires a premium subscription.'))
             return redirect('subscription:plans')
     return wrapper
-
-def track_article_view(view_func):
-    """تتبع مشاهدات المقال"""
-    def wrapper(request, *args, **kwargs):
-        response = view_func(request, *args, **kwargs)
-        
-        if request.method == 'GET' and hasattr(response, 'context_data'):
-            article = response.context_data.get('article')
-            if article and isinstance(article, Article):
-                # تسجيل المشاهدة
-                ArticleView.objects.create(
-                    article=article,
-                    ip_address=request.META.get('REMOTE_ADDR'),
-                    user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                    session_key=request.session.session_key or 'anonymous'
-                )
-        
-        return response
-    return wrapper
@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
+from core import counting
 from .models import Category, Post
 
 @admin.register(Category)
@@ -62,12 +63,12 @@ class PostAdmin(admin.ModelAdmin):
     
     @admin.action(description=_('نشر المقالات المحددة'))
     def make_published(self, request, queryset):
-        queryset.update(status=Post.Status.PUBLISHED)
+        counting.bulk_update(queryset, status=Post.Status.PUBLISHED)
     
     @admin.action(description=_('تحويل إلى مسودة'))
     def make_draft(self, request, queryset):
-        queryset.update(status=Post.Status.DRAFT)
+        counting.bulk_update(queryset, status=Post.Status.DRAFT)
     
     @admin.action(description=_('تحديد كمميز'))
     def make_featured(self, request, queryset):
-        queryset.update(is_featured=True)
\ No newline at end of file
+        counting.bulk_update(queryset, is_featured=True)
\ No newline at end of file
@@ -1,11 +1,8 @@
-from blog.models import Category
+from core.global_context import global_context
 
 
 def categories_processor(request):
     """
     Makes all categories available in all templates.
     """
-    categories = Category.objects.filter(is_active=True).order_by('order', 'name_ar')
-    return {
-        'all_categories': categories
-    }
+    return global_context.items(request, 'all_categories')
@@ -4,6 +4,9 @@ from django.utils.text import slugify
 from django.urls import reverse
 from django.conf import settings
 from ckeditor.fields import RichTextField
+from core.counters import record_view
+from core.related import related_content
+from core.content import derive_content
 from PIL import Image
 import os
 
@@ -47,6 +50,8 @@ class Post(models.Model):
     slug = models.SlugField(_('الرابط'), unique=True, max_length=200)
     content = RichTextField(_('المحتوى'))
     excerpt = models.TextField(_('المقتطف'), max_length=300, blank=True)
+    word_count = models.PositiveIntegerField(_('عدد الكلمات'), default=0, editable=False)
+    reading_time = models.PositiveIntegerField(_('وقت القراءة (دقائق)'), default=1, editable=False)
     
     featured_image = models.ImageField(_('الصورة الرئيسية'), upload_to='blog/featured/%Y/%m/')
     thumbnail = models.ImageField(_('الصورة المصغرة'), upload_to='blog/thumbnails/%Y/%m/', blank=True)
@@ -84,6 +89,9 @@ class Post(models.Model):
             from django.utils import timezone
             self.publish_date = timezone.now()
         
+        # الملخص والوصف ووقت القراءة من المحتوى مرة واحدة عند الحفظ
+        derive_content(self)
+        
         super().save(*args, **kwargs)
         
         # Create thumbnail if featured_image exists
@@ -119,14 +127,15 @@ class Post(models.Model):
         return reverse('blog:post_detail', kwargs={'slug': self.slug})
 
     def increase_views(self):
+        record_view(self)
         self.views += 1
-        self.save(update_fields=['views'])
 
     def get_related_posts(self, limit=3):
-        return Post.objects.filter(
+        fallback = Post.objects.filter(
             category=self.category,
             status=Post.Status.PUBLISHED
-        ).exclude(id=self.id)[:limit]
+        ).exclude(id=self.id)
+        return related_content.related(self, limit, fallback=fallback)
 
     @property
     def display_title(self):
@@ -134,4 +143,4 @@ class Post(models.Model):
 
     @property
     def display_description(self):
-        return self.seo_description or self.excerpt or self.content[:160]
\ No newline at end of file
+        return self.seo_description or self.excerpt
\ No newline at end of file
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from core.cache_versions import bump
+from .models import Category
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def clear_category_cache(sender, instance, **kwargs):
+    """قائمة التصنيفات في كل الصفحات مخزنة في السياق العام"""
+    bump('categories')
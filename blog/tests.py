@@ -1,3 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from core.related import related_content
+
+from .models import Category, Post
+
+User = get_user_model()
+
+
+class PostTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('writer', 'writer@example.com', 'password')
+        self.category = Category.objects.create(name_ar='برمجة', name_en='Programming', slug='programming')
+
+    def create_post(self, title, content='<p>Body</p>', **fields):
+        fields.setdefault('status', Post.Status.PUBLISHED)
+        return Post.objects.create(title=title, content=content, category=self.category,
+                                   author=self.author, **fields)
+
+    def test_save_derives_the_summary_fields(self):
+        post = self.create_post('Derived', '<p>' + 'word ' * 450 + '</p>', seo_description='<b>Custom</b>')
+        post.refresh_from_db()
+        self.assertEqual((post.word_count, post.reading_time), (450, 3))
+        self.assertTrue(post.excerpt.startswith('word word'))
+        self.assertEqual(post.seo_description, 'Custom')
+        self.assertEqual(post.slug, 'derived')
+        self.assertIsNotNone(post.publish_date)
+
+    def test_related_posts_fall_back_to_the_category(self):
+        post = self.create_post('First')
+        other = self.create_post('Second')
+        self.create_post('Draft', status=Post.Status.DRAFT)
+        self.assertEqual(post.get_related_posts(), [other])
+
+        related_content.rebuild('blog.post')
+        self.assertEqual(post.get_related_posts(), [other])
@@ -1,5 +1,8 @@
 from django.shortcuts import render, get_object_or_404
-from django.core.paginator import Paginator
+from core.pagination import paginate
+from core.conditional import conditional_content
+from core.page_cache import content_type_namespace
+from core.related import namespace as related_namespace
 from django.db.models import Q
 from .models import Post, Category
 
@@ -7,9 +10,7 @@ def post_list(request):
     posts = Post.objects.filter(status=Post.Status.PUBLISHED).order_by('-publish_date')
     
     # Pagination
-    paginator = Paginator(posts, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, posts, 12)
     
     context = {
         'posts': page_obj,
@@ -18,6 +19,13 @@ def post_list(request):
     
     return render(request, 'blog/post_list.html', context)
 
+@conditional_content(
+    'blog.post',
+    filters={'status': Post.Status.PUBLISHED},
+    # المقالات ذات الصلة البديلة تتغير بحفظ أي مقال آخر
+    namespaces=(related_namespace('blog.post'), content_type_namespace('blog.post')),
+    track=lambda request, post: post.increase_views(),
+)
 def post_detail(request, slug):
     post = get_object_or_404(Post, slug=slug, status=Post.Status.PUBLISHED)
     
@@ -42,9 +50,7 @@ def category_detail(request, slug):
     ).order_by('-publish_date')
     
     # Pagination
-    paginator = Paginator(posts, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, posts, 12)
     
     context = {
         'category': category,
@@ -71,9 +77,7 @@ def search(request):
         posts = posts.filter(category__slug=category)
     
     # Pagination
-    paginator = Paginator(posts, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, posts, 12)
     
     # Get categories for filter
     categories = Category.objects.filter(is_active=True)
@@ -4,4 +4,8 @@ from django.utils.translation import gettext_lazy as _
 class BooksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'books'
-    verbose_name = _('Books')
\ No newline at end of file
+    verbose_name = _('Books')
+    
+    def ready(self):
+        # استيراد الإشارات
+        import books.signals
@@ -1,5 +1,6 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
+from django.utils import timezone
 from core.models import BaseContent
 
 class Book(BaseContent):
@@ -49,7 +50,8 @@ class DownloadHistory(models.Model):
     book = models.ForeignKey(Book, on_delete=models.CASCADE)
     user = models.ForeignKey('accounts.CustomUser', on_delete=models.SET_NULL, null=True, blank=True)
     ip_address = models.GenericIPAddressField()
-    downloaded_at = models.DateTimeField(auto_now_add=True)
+    # وقت الحدث نفسه (يُمرر من طابور التحليلات) وليس وقت الكتابة
+    downloaded_at = models.DateTimeField(default=timezone.now, editable=False)
     user_agent = models.TextField(blank=True)
     
     class Meta:
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from core.cache_versions import bump
+from core.page_cache import content_namespace
+from .models import BookReview
+
+@receiver(post_save, sender=BookReview)
+@receiver(post_delete, sender=BookReview)
+def clear_cache_on_review(sender, instance, raw=False, **kwargs):
+    """التقييمات المعتمدة ونصوصها جزء من صفحة الكتاب"""
+    if not raw:
+        bump(content_namespace('books.book', instance.book_id))
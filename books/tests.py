@@ -1,3 +1,61 @@
-from django.test import TestCase
+import datetime
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.cache_versions import get_versions
+from core.page_cache import content_namespace, content_type_namespace
+
+from .models import Book, BookReview, DownloadHistory
+
+
+@override_settings(ANALYTICS_ASYNC=False)
+class DownloadBookTests(TestCase):
+    def setUp(self):
+        self.book = Book.objects.create(
+            title='Book', slug='book', content='Content', status='published', author='Author',
+            download_link='https://example.com/book.pdf',
+        )
+
+    def test_download_records_the_event_time(self):
+        downloaded_at = timezone.make_aware(datetime.datetime(2026, 1, 1, 23, 59, 59))
+        with mock.patch('core.analytics.timezone.now', return_value=downloaded_at):
+            response = self.client.get(reverse('books:download', args=[self.book.slug]),
+                                       HTTP_USER_AGENT='reader', REMOTE_ADDR='10.0.0.1')
+        self.assertRedirects(response, self.book.download_link, fetch_redirect_response=False)
+        history = DownloadHistory.objects.get()
+        self.assertEqual((history.book, history.user, history.ip_address, history.user_agent),
+                         (self.book, None, '10.0.0.1', 'reader'))
+        self.assertEqual(history.downloaded_at, downloaded_at)
+
+    def test_unpublished_books_are_not_downloadable(self):
+        Book.objects.filter(pk=self.book.pk).update(status='draft')
+        response = self.client.get(reverse('books:download', args=[self.book.slug]))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(DownloadHistory.objects.exists())
+
+
+class BookCacheTests(TestCase):
+    def setUp(self):
+        self.book = Book.objects.create(
+            title='Book', slug='book', content='Content', status='published', author='Author',
+        )
+        self.namespaces = (content_namespace('books.book', self.book.pk), content_type_namespace('books.book'))
+
+    def test_reviews_invalidate_only_their_book(self):
+        before = get_versions(*self.namespaces)
+        review = BookReview.objects.create(book=self.book, name='Reader', email='reader@example.com',
+                                           comment='Great', is_approved=True)
+        after = get_versions(*self.namespaces)
+        self.assertNotEqual(after[self.namespaces[0]], before[self.namespaces[0]])
+        self.assertEqual(after[self.namespaces[1]], before[self.namespaces[1]])
+
+        review.delete()
+        self.assertNotEqual(get_versions(*self.namespaces)[self.namespaces[0]], after[self.namespaces[0]])
+
+    def test_saving_any_book_invalidates_the_fallback_lists(self):
+        before = get_versions(self.namespaces[1])[self.namespaces[1]]
+        Book.objects.create(title='Other', slug='other', content='Content', status='published', author='Author')
+        self.assertNotEqual(get_versions(self.namespaces[1])[self.namespaces[1]], before)
@@ -1,12 +1,24 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.core.paginator import Paginator
+from core.pagination import paginate
+from core.counting import counts
+from core.related import related_content, namespace as related_namespace
+from core.conditional import conditional_content
+from core.page_cache import content_namespace, content_type_namespace
 from django.db.models import Q, Count
 from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
 from django.http import HttpResponse
-from .models import Book, BookReview, DownloadHistory
+from core.analytics import record_book_download
+from .models import Book, BookReview
 # from .forms import BookReviewForm
 
+def _type_count(book_type):
+    """عدد الكتب المنشورة من نوع معين (من عدادات المحتوى)"""
+    return counts.count(
+        'books.book', dimension=f'type:{book_type}',
+        queryset=Book.objects.filter(status='published', book_type=book_type),
+    )
+
 def book_list(request):
     """عرض قائمة الكتب"""
     books = Book.objects.filter(status='published').order_by('-created_at')
@@ -34,15 +46,13 @@ def book_list(request):
     
     # الإحصائيات
     stats = {
-        'total_books': Book.objects.filter(status='published', book_type='book').count(),
-        'total_summaries': Book.objects.filter(status='published', book_type='summary').count(),
-        'total_notes': Book.objects.filter(status='published', book_type='notes').count(),
+        'total_books': _type_count('book'),
+        'total_summaries': _type_count('summary'),
+        'total_notes': _type_count('notes'),
     }
     
-    # الترقيم
-    paginator = Paginator(books, 16)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # الترقيم بالمؤشر
+    page_obj = paginate(request, books, 16)
     
     context = {
         'books': page_obj,
@@ -55,6 +65,18 @@ def book_list(request):
     
     return render(request, 'books/list.html', context)
 
+@conditional_content(
+    'books.book',
+    filters={'status': 'published'},
+    annotations={'approved_reviews': Count('reviews', filter=Q(reviews__is_approved=True))},
+    # التقييمات المعتمدة تبطل مساحة الكتاب، والكتب المشابهة البديلة مساحة النوع
+    namespaces=(
+        related_namespace('books.book'),
+        content_namespace('books.book', '{pk}'),
+        content_type_namespace('books.book'),
+    ),
+    track=lambda request, book: book.increment_views(),
+)
 def book_detail(request, slug):
     """عرض تفاصيل الكتاب"""
     book = get_object_or_404(Book, slug=slug, status='published')
@@ -63,10 +85,10 @@ def book_detail(request, slug):
     book.increment_views()
     
     # الكتب المشابهة
-    related_books = Book.objects.filter(
+    related_books = related_content.related(book, 4, fallback=Book.objects.filter(
         categories__in=book.categories.all(),
         status='published'
-    ).exclude(id=book.id).distinct()[:4]
+    ).exclude(id=book.id).distinct())
     
     # التقييمات
     reviews = book.reviews.filter(is_approved=True).order_by('-created_at')
@@ -97,13 +119,8 @@ def download_book(request, slug):
     """تحميل الكتاب"""
     book = get_object_or_404(Book, slug=slug, status='published')
     
-    # تسجيل عملية التحميل
-    DownloadHistory.objects.create(
-        book=book,
-        user=request.user if request.user.is_authenticated else None,
-        ip_address=request.META.get('REMOTE_ADDR'),
-        user_agent=request.META.get('HTTP_USER_AGENT', '')
-    )
+    # تسجيل عملية التحميل في طابور التحليلات
+    record_book_download(request, book)
     
     # إذا كان الملف موجودًا
     if book.file:
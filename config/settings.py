@@ -67,6 +67,9 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 
     'allauth.account.middleware.AccountMiddleware',
+
+    # كاش الصفحات الكاملة للزوار (بعد المصادقة واللغة والرسائل)
+    'core.page_cache.AnonymousPageCacheMiddleware',
 ]
 
 
@@ -87,14 +90,8 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
 
-                # Custom
-                'core.context_processors.site_settings',
-                'core.context_processors.language_processor',
-                'core.context_processors.dark_mode_processor',
-                'core.context_processors.theme_settings',
-                'core.context_processors.categories_processor',
-
-                'blog.context_processors.categories_processor',
+                # Custom: كل العناصر العامة ككائنات كسولة من core.global_context
+                'core.context_processors.global_context_processor',
             ],
         },
     },
@@ -182,6 +179,9 @@ CRISPY_TEMPLATE_PACK = "tailwind"
 # ===========================
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 
+# إشعار كاتب الصفحة بالتعليقات الجديدة المعتمدة (pages.signals)
+PAGE_COMMENT_NOTIFICATIONS = False
+
 
 # ===========================
 # CKEDITOR
@@ -196,6 +196,174 @@ CKEDITOR_CONFIGS = {
 }
 
 
+# ===========================
+# VIEW COUNTERS
+# ===========================
+# 'local': تجميع الزيادات في ذاكرة كل عملية
+# 'cache': زيادات ذرية في الكاش المشترك يفرغها flush_view_counters
+# (يتطلب كاشاً مشتركاً بين العمليات، انظر فحص core.W001)
+VIEW_COUNTER_BACKEND = 'local'
+VIEW_COUNTER_FLUSH_INTERVAL = 30  # ثوان
+VIEW_COUNTER_MAX_PENDING = 500
+
+
+# ===========================
+# ANALYTICS EVENTS
+# ===========================
+# أحداث المشاهدة والتحميل تُكتب على دفعات من خيط خلفي
+ANALYTICS_ASYNC = True
+ANALYTICS_QUEUE_SIZE = 10000
+ANALYTICS_BATCH_SIZE = 500
+ANALYTICS_FLUSH_INTERVAL = 5  # ثوان
+
+# مدة الاحتفاظ بصفوف المشاهدات الخام بعد تجميعها (rollup_content_views)
+ANALYTICS_RAW_RETENTION_DAYS = 90
+
+
+# ===========================
+# AD STATS
+# ===========================
+# إجماليات الظهور والنقر ('local' أو 'cache' كما في VIEW COUNTERS)
+# 'cache' يتطلب كاشاً مشتركاً (Redis أو Memcached) ليفرغه flush_ad_counters،
+# فكاش الذاكرة الافتراضي لا تراه العمليات الأخرى (فحص core.W001)
+AD_COUNTER_BACKEND = 'local'
+AD_COUNTER_FLUSH_INTERVAL = 30  # ثوان
+AD_COUNTER_MAX_PENDING = 500
+
+# عدادات الظهور والنقر اليومية (AdDailyStat)
+AD_STATS_BACKEND = 'local'
+AD_STATS_FLUSH_INTERVAL = 30  # ثوان
+AD_STATS_MAX_PENDING = 500
+
+# لقطة الإعلانات النشطة في ذاكرة كل عملية
+AD_INDEX_TTL = 300  # ثوان
+AD_INDEX_CHECK_INTERVAL = 5  # فحص رقم الإصدار المشترك
+
+# أقصى عدد مرات ظهور الإعلان الواحد للزائر في النافذة (None للتعطيل)
+AD_FREQUENCY_CAP = None
+AD_FREQUENCY_WINDOW = 3600  # ثوان
+# بذرة ثابتة لاختيار الإعلانات (للاختبارات فقط)
+AD_SAMPLER_SEED = None
+
+
+# ===========================
+# SITE SETTINGS CACHE
+# ===========================
+# نسخة محلية قصيرة في كل عملية ثم الكاش المشترك
+SITE_SETTINGS_LOCAL_TTL = 5  # ثوان
+SITE_SETTINGS_FRESH_FOR = 300  # بعدها يعيد طلب واحد فقط التحميل
+SITE_SETTINGS_CACHE_TIMEOUT = 3600  # أقصى عمر للقيمة القديمة
+SITE_SETTINGS_STALE_WHILE_REVALIDATE = True
+
+
+# ===========================
+# SEARCH
+# ===========================
+# 'auto' يستخدم FTS5 على SQLite و tsvector على PostgreSQL إذا توفرا
+SEARCH_BACKEND = 'auto'
+SEARCH_MAX_RESULTS = 1000
+SEARCH_CACHE_TIMEOUT = 300
+# البحث الموحد (core.views.search): خيوط التوازي، نتائج كل نوع، وحجم ذاكرة LRU
+SEARCH_FEDERATED_WORKERS = 4
+SEARCH_PER_TYPE = 5
+SEARCH_LRU_SIZE = 256
+# اقتراحات البحث أثناء الكتابة (شجرة بادئات داخل كل عملية)
+AUTOCOMPLETE_MAX_ENTRIES = 50000
+AUTOCOMPLETE_MAX_DEPTH = 24  # أقصى طول بادئة مفهرس
+AUTOCOMPLETE_TOP_K = 10
+AUTOCOMPLETE_CHECK_INTERVAL = 5  # ثوان بين فحوص الإصدار المشترك
+AUTOCOMPLETE_MAX_REPLAY = 500  # أقصى تغييرات تُطبق تدريجياً قبل إعادة البناء
+AUTOCOMPLETE_CHANGE_TTL = 3600  # مدة بقاء سجل التغييرات في الكاش
+AUTOCOMPLETE_MAX_AGE = 300  # مدة كاش HTTP للاستجابات
+
+
+# ===========================
+# CONTENT COUNTS
+# ===========================
+# مدة تخزين جداول العدادات والأعداد الدقيقة الاحتياطية في الكاش
+COUNTS_CACHE_TIMEOUT = 300
+
+
+# ===========================
+# RELATED CONTENT
+# ===========================
+# عدد الجيران المخزنين لكل عنصر
+RELATED_CONTENT_TOP_K = 10
+# نافذة جلسات المشاهدة المشتركة (بالأيام)
+RELATED_CONTENT_COVIEW_DAYS = 90
+# المجموعات (تصنيف، وسم) الأكبر من هذا تزيد النتيجة فقط ولا تضيف مرشحين
+RELATED_CONTENT_MAX_GROUP = 500
+# تعليم جيران العنصر عند حفظه لإعادة حسابها بـ build_related_content --pending (cron)
+RELATED_CONTENT_INCREMENTAL = True
+RELATED_CONTENT_CACHE_TIMEOUT = 3600
+
+
+# ===========================
+# ARTICLE PAGES
+# ===========================
+# مدة تخزين أجزاء صفحة المقال المشتركة (المحتوى، الوسوم، ذات الصلة، التعليقات)
+ARTICLE_FRAGMENT_TIMEOUT = 600
+
+
+# ===========================
+# COMMENTS
+# ===========================
+# الردود الأعمق من هذا تُعرض مسطحة تحت آخر مستوى
+COMMENT_TREE_MAX_DEPTH = 4
+COMMENT_THREADS_PER_PAGE = 20
+COMMENT_TREE_CACHE_TIMEOUT = 3600
+
+
+# ===========================
+# CONTENT
+# ===========================
+# سرعة القراءة المستخدمة لحساب وقت القراءة عند الحفظ
+CONTENT_WORDS_PER_MINUTE = 200
+
+
+# ===========================
+# SITEMAPS
+# ===========================
+# مجلد ملفات خريطة الموقع المولدة (يخدمه خادم الويب على SITEMAP_URL)
+SITEMAP_ROOT = MEDIA_ROOT / 'sitemaps'
+SITEMAP_URL = '/sitemaps/'
+SITEMAP_PROTOCOL = 'https'
+# عدد المعرفات في كل ملف (50000 كحد أقصى)
+SITEMAP_CHUNK_SIZE = 10000
+# إعادة توليد القسم في خيط خلفي عند حفظ محتواه (في كل عملية تحفظ، بما فيها
+# أوامر الإدارة)؛ معطل افتراضياً والمعتمد تشغيل build_sitemaps دورياً (cron)
+SITEMAP_AUTO_BUILD = False
+
+
+# ===========================
+# FEEDS
+# ===========================
+FEED_ITEMS = 20
+# مدة تخزين نص التغذية المولد (المفتاح يتغير مع أي نشر أو تعديل)
+FEED_CACHE_TIMEOUT = 3600
+# تخزين نسخة gzip من النص مع الأصلية
+FEED_PRECOMPRESS = True
+# مدة كاش HTTP لقارئات التغذية
+FEED_MAX_AGE = 300
+
+
+# ===========================
+# CONDITIONAL GET
+# ===========================
+# ETag وردود 304 لصفحات تفاصيل المحتوى للزوار المجهولين
+CONDITIONAL_CONTENT = True
+
+
+# ===========================
+# PAGE CACHE
+# ===========================
+# كاش الصفحات الكاملة للزوار المجهولين (views المعلمة بـ cache_anonymous)
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_TIMEOUT = 600
+# معاملات الاستعلام التي لا تغير الصفحة (إضافة إلى utm_*)
+PAGE_CACHE_IGNORED_PARAMS = ('fbclid', 'gclid')
+
+
 # ===========================
 # DEFAULT PK
 # ===========================
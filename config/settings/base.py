@@ -82,12 +82,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
-                'core.context_processors.site_settings',
-                'core.context_processors.language_processor',
-                'core.context_processors.dark_mode_processor',
-                'core.context_processors.menu_categories',
-                'core.context_processors.main_menu_pages',
-                'core.context_processors.active_advertisements',
+                'core.context_processors.global_context_processor',
             ],
         },
     },
@@ -9,8 +9,13 @@ from django.views.generic import TemplateView
 from rest_framework import permissions
 
 
+from core import views as core_views
+
 urlpatterns = [
     path('i18n/', include('django.conf.urls.i18n')),
+    # Sitemaps (static files generated by build_sitemaps)
+    path('sitemap.xml', core_views.sitemap_index, name='sitemap_index'),
+    path('sitemaps/<str:filename>', core_views.sitemap_file, name='sitemap_file'),
 ]
 
 # Internationalized URLs
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
-from .models import SiteSetting, Category
+from .models import SiteSetting, Category, ContentDailyStat
 
 @admin.register(SiteSetting)
 class SiteSettingAdmin(admin.ModelAdmin):
@@ -29,4 +29,19 @@ class CategoryAdmin(admin.ModelAdmin):
     list_display = ('name', 'slug', 'order', 'icon')
     list_editable = ('order', 'icon')
     search_fields = ('name', 'slug')
-    prepopulated_fields = {'slug': ('name',)}
\ No newline at end of file
+    prepopulated_fields = {'slug': ('name',)}
+
+@admin.register(ContentDailyStat)
+class ContentDailyStatAdmin(admin.ModelAdmin):
+    list_display = ('content_label', 'object_id', 'date', 'views', 'unique_ips', 'unique_sessions')
+    list_filter = ('content_label', 'date')
+    search_fields = ('object_id',)
+    date_hierarchy = 'date'
+    readonly_fields = ('content_label', 'object_id', 'date', 'views', 'unique_ips',
+                       'unique_sessions', 'referrer_domains')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
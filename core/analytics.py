@@ -0,0 +1,226 @@
+"""
+خط إدخال مجمّع لأحداث التحليلات (مشاهدات المقالات والصفحات وتحميلات الكتب)
+
+تضيف الطلبات أحداثاً مضغوطة (tuples) مع وقت وقوعها إلى طابور محدود الحجم،
+ويقوم خيط خلفي بكتابتها عبر bulk_create على دفعات. عند امتلاء الطابور يتم إسقاط
+الحدث وزيادة عداد الإسقاط بدلاً من إبطاء الطلب.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT_MAX_LENGTH = 255
+REFERRER_MAX_LENGTH = 200
+
+
+class EventPipeline:
+    """طابور أحداث محدود مع خيط تفريغ خلفي"""
+
+    def __init__(self):
+        self._sinks = {}
+        self._queue = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def _setting(self, name, default):
+        return getattr(settings, f'ANALYTICS_{name}', default)
+
+    def register(self, name, model_label, fields, timestamp_field='created_at'):
+        """
+        تسجيل نوع حدث: الاسم، النموذج، وترتيب الحقول داخل الـ tuple
+        timestamp_field: الحقل الذي يُكتب فيه وقت الحدث (وليس وقت التفريغ)
+        """
+        self._sinks[name] = (model_label, tuple(fields), timestamp_field)
+
+    def _ensure_started(self):
+        # إعادة إنشاء الطابور والخيط بعد fork في خوادم متعددة العمليات
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self._setting('QUEUE_SIZE', 10000))
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name='analytics-flusher', daemon=True
+            )
+            self._thread.start()
+
+    def record(self, name, *values):
+        """إضافة حدث إلى الطابور، ويعيد False إذا تم إسقاطه"""
+        if name not in self._sinks:
+            raise KeyError(f'Unknown analytics event: {name}')
+
+        # وقت الحدث عند وقوعه، فالأحداث قبل منتصف الليل لا تُحسب في اليوم التالي
+        event = (timezone.now(), values)
+        if not self._setting('ASYNC', True):
+            self._write({name: [event]})
+            return True
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((name, event))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                dropped = self.dropped
+            if dropped % 1000 == 1:
+                logger.warning(f'Analytics queue full, {dropped} events dropped so far')
+            self._wakeup.set()
+            return False
+
+        with self._lock:
+            self.recorded += 1
+        # ضغط عكسي: إيقاظ الخيط مبكراً عند تجاوز حجم الدفعة
+        if self._queue.qsize() >= self._setting('BATCH_SIZE', 500):
+            self._wakeup.set()
+        return True
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self._setting('FLUSH_INTERVAL', 5))
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Analytics flush failed')
+            finally:
+                connections.close_all()
+
+    def _drain(self, limit):
+        batch = defaultdict(list)
+        count = 0
+        while count < limit:
+            try:
+                name, event = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch[name].append(event)
+            count += 1
+        return batch, count
+
+    def flush(self):
+        """كتابة كل الأحداث الموجودة في الطابور، ويعيد عدد الصفوف المكتوبة"""
+        if self._queue is None:
+            return 0
+
+        batch_size = self._setting('BATCH_SIZE', 500)
+        total = 0
+        while True:
+            batch, count = self._drain(batch_size)
+            if not count:
+                break
+            total += self._write(batch)
+        return total
+
+    def _write(self, batch):
+        written = 0
+        for name, events in batch.items():
+            model_label, fields, timestamp_field = self._sinks[name]
+            model = apps.get_model(model_label)
+            objs = [
+                model(**dict(zip(fields, values)), **{timestamp_field: timestamp})
+                for timestamp, values in events
+            ]
+            try:
+                model.objects.bulk_create(objs, batch_size=self._setting('BATCH_SIZE', 500))
+            except Exception:
+                with self._lock:
+                    self.failed += len(objs)
+                logger.exception(f'Failed to write {len(objs)} {name} events')
+                continue
+            written += len(objs)
+        with self._lock:
+            self.written += written
+        return written
+
+    def stats(self):
+        """عدادات الطابور للمراقبة"""
+        return {
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'recorded': self.recorded,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+        }
+
+
+pipeline = EventPipeline()
+
+pipeline.register('article_view', 'articles.ArticleView',
+                  ('article_id', 'ip_address', 'user_agent', 'session_key'))
+pipeline.register('page_view', 'pages.PageView',
+                  ('page_id', 'ip_address', 'user_agent', 'referrer'))
+pipeline.register('book_download', 'books.DownloadHistory',
+                  ('book_id', 'user_id', 'ip_address', 'user_agent'), timestamp_field='downloaded_at')
+
+
+def _client_ip(request):
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        return x_forwarded_for.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR') or '0.0.0.0'
+
+
+def _user_agent(request):
+    return request.META.get('HTTP_USER_AGENT', '')[:USER_AGENT_MAX_LENGTH]
+
+
+def record_article_view(request, article):
+    """تسجيل مشاهدة مقال"""
+    return pipeline.record(
+        'article_view',
+        article.pk,
+        _client_ip(request),
+        _user_agent(request),
+        request.session.session_key or 'anonymous',
+    )
+
+
+def record_page_view(request, page):
+    """تسجيل مشاهدة صفحة"""
+    return pipeline.record(
+        'page_view',
+        page.pk,
+        _client_ip(request),
+        _user_agent(request),
+        request.META.get('HTTP_REFERER', '')[:REFERRER_MAX_LENGTH],
+    )
+
+
+def record_book_download(request, book):
+    """تسجيل تحميل كتاب"""
+    return pipeline.record(
+        'book_download',
+        book.pk,
+        request.user.pk if request.user.is_authenticated else None,
+        _client_ip(request),
+        _user_agent(request),
+    )
+
+
+def _flush_at_exit():
+    try:
+        pipeline.flush()
+    except Exception:
+        logger.exception('Failed to flush analytics events at exit')
+
+
+atexit.register(_flush_at_exit)
@@ -8,4 +8,5 @@ class CoreConfig(AppConfig):
     verbose_name = _('Core')
     
     def ready(self):
+        import core.checks
         import core.signals
@@ -0,0 +1,75 @@
+"""
+إصدارات مساحات الكاش (namespaces)
+
+لكل مساحة (مكان إعلاني، قائمة المقالات، وسم، تصنيف، صفحة...) عداد جيل
+محفوظ في الكاش ويدخل في المفاتيح. زيادة العداد تُبطل كل مفاتيح المساحة
+في O(1) على أي واجهة كاش، بدون delete_pattern أو سرد المفاتيح، وتنتهي
+المفاتيح القديمة وحدها بانتهاء مدتها.
+
+العداد المفقود (أول استخدام أو حذفه من الكاش) يبدأ من الوقت بالنانوثانية وليس
+من 1، فلا يعود إلى رقم استُخدم من قبل وتعود معه المفاتيح القديمة صالحة.
+"""
+import time
+
+from django.core.cache import cache
+
+VERSION_PREFIX = 'nsv'
+
+
+def _version_key(namespace):
+    return f'{VERSION_PREFIX}:{namespace}'
+
+
+def _seed():
+    # أكبر من أي جيل سابق للمساحة ما لم تُزد أكثر من مرة كل نانوثانية
+    return time.time_ns()
+
+
+def get_versions(*namespaces):
+    """أرقام الأجيال الحالية لعدة مساحات برحلة واحدة إلى الكاش"""
+    keys = {_version_key(namespace): namespace for namespace in namespaces}
+    found = cache.get_many(list(keys))
+    versions = {}
+    for key, namespace in keys.items():
+        version = found.get(key)
+        if version is None:
+            # أول استخدام للمساحة أو حذف عدادها: إنشاء العداد بدون انتهاء صلاحية
+            seed = _seed()
+            cache.add(key, seed, None)
+            version = cache.get(key) or seed
+        versions[namespace] = version
+    return versions
+
+
+def get_version(namespace):
+    """رقم الجيل الحالي للمساحة"""
+    return get_versions(namespace)[namespace]
+
+
+def bump(*namespaces):
+    """إبطال كل مفاتيح المساحات المحددة بزيادة عداد الجيل"""
+    for namespace in namespaces:
+        key = _version_key(namespace)
+        if cache.add(key, _seed(), None):
+            continue
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _seed(), None)
+
+
+def version_prefix(*namespaces):
+    """جزء المفتاح الذي يحمل أجيال المساحات، مثل article_list.3:page:about.1"""
+    versions = get_versions(*namespaces)
+    return ':'.join(f'{namespace}.{versions[namespace]}' for namespace in namespaces)
+
+
+def make_key(namespaces, *parts):
+    """
+    بناء مفتاح كاش مرتبط بمساحة أو أكثر
+    namespaces: اسم مساحة أو tuple من الأسماء (إبطال أي منها يُبطل المفتاح)
+    """
+    if isinstance(namespaces, str):
+        namespaces = (namespaces,)
+    return ':'.join([version_prefix(*namespaces), *(str(part) for part in parts)])
+
@@ -0,0 +1,39 @@
+"""
+فحوص إعدادات النظام (manage.py check)
+"""
+from django.conf import settings
+from django.core.checks import Warning, register
+from django.core.cache import caches
+
+# بادئات إعدادات المخازن المؤقتة في core.counters
+COUNTER_SETTINGS = ('VIEW_COUNTER', 'AD_COUNTER', 'AD_STATS')
+
+# كاش داخل العملية: لا تراه العمليات الأخرى ولا أوامر التفريغ
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def shared_cache():
+    """هل الكاش الافتراضي مشترك بين العمليات"""
+    return caches.settings['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+@register()
+def check_counter_backends(app_configs, **kwargs):
+    if shared_cache():
+        return []
+    return [
+        Warning(
+            f'{prefix}_BACKEND is "cache" but the default cache is local to each process.',
+            hint=(
+                'Buffered increments are only flushed by the process that recorded them, '
+                'so flush commands cannot drain them. Configure a shared cache '
+                f'(Redis, Memcached, database) or set {prefix}_BACKEND = "local".'
+            ),
+            id='core.W001',
+        )
+        for prefix in COUNTER_SETTINGS
+        if getattr(settings, f'{prefix}_BACKEND', 'local') == 'cache'
+    ]
@@ -0,0 +1,185 @@
+"""
+شجرة التعليقات
+
+كل التعليقات المعتمدة لكائن (مقال، صفحة) تُجلب باستعلام واحد مرتب زمنياً،
+وتُبنى الشجرة في الذاكرة من عقد خفيفة (__slots__) ثم تُخزن في الكاش حتى يتغير
+أي تعليق للكائن. الردود الأعمق من COMMENT_TREE_MAX_DEPTH تُعرض مسطحة تحت آخر
+مستوى مسموح، والنقاشات الرئيسية (الأحدث أولاً) تُقسم صفحات.
+"""
+import logging
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+
+from .cache_versions import bump, make_key
+
+logger = logging.getLogger(__name__)
+
+
+class CommentNode:
+    """تعليق واحد في الشجرة مع ردوده"""
+
+    __slots__ = ('id', 'parent_id', 'author', 'content', 'created_at', 'score', 'depth', 'replies')
+
+    def __init__(self, id, parent_id, author, content, created_at, score=0):
+        self.id = id
+        self.parent_id = parent_id
+        self.author = author
+        self.content = content
+        self.created_at = created_at
+        self.score = score
+        self.depth = 0
+        self.replies = []
+
+    def __repr__(self):
+        return f'<CommentNode {self.id} depth={self.depth} replies={len(self.replies)}>'
+
+    def is_reply(self):
+        return self.parent_id is not None
+
+
+class CommentTree:
+    """النقاشات الرئيسية للكائن وعدد كل التعليقات الظاهرة"""
+
+    def __init__(self, roots, total):
+        self.roots = roots
+        self.total = total
+
+    def __len__(self):
+        return self.total
+
+    def page(self, number, per_page=None):
+        """صفحة من النقاشات الرئيسية (رقم غير صالح يعطي الصفحة الأولى أو الأخيرة)"""
+        per_page = per_page or getattr(settings, 'COMMENT_THREADS_PER_PAGE', 20)
+        return Paginator(self.roots, per_page).get_page(number)
+
+
+class CommentTreeSource:
+    """
+    تعريف تعليقات نوع محتوى
+    owner_field: حقل الكائن صاحب التعليقات في نموذج التعليق
+    author_fields: الحقول التي يُبنى منها اسم الكاتب
+    """
+
+    def __init__(self, comment_label, owner_field, filters, author_fields, score_fields=None):
+        self.comment_label = comment_label
+        self.owner_field = owner_field
+        self.filters = filters
+        self.author_fields = author_fields
+        self.score_fields = score_fields
+
+    @property
+    def model(self):
+        return apps.get_model(self.comment_label)
+
+    def rows(self, object_id):
+        fields = ['id', 'parent_id', 'content', 'created_at', *self.author_fields]
+        if self.score_fields:
+            fields.extend(self.score_fields)
+        return self.model.objects.filter(
+            **{f'{self.owner_field}_id': object_id}, **self.filters
+        ).order_by('created_at', 'id').values(*fields)
+
+    def node(self, row):
+        author = ' '.join(str(row[field]) for field in self.author_fields[:-1] if row[field]).strip()
+        score = row[self.score_fields[0]] - row[self.score_fields[1]] if self.score_fields else 0
+        return CommentNode(
+            row['id'], row['parent_id'], author or row[self.author_fields[-1]],
+            row['content'], row['created_at'], score,
+        )
+
+
+COMMENT_TREES = {
+    'articles.article': CommentTreeSource(
+        'articles.comment', 'article',
+        filters={'is_approved': True, 'is_spam': False},
+        author_fields=('name',),
+        score_fields=('likes', 'dislikes'),
+    ),
+    'pages.page': CommentTreeSource(
+        'pages.pagecomment', 'page',
+        filters={'is_approved': True},
+        # الاسم الكامل، أو اسم المستخدم إذا كان فارغاً
+        author_fields=('user__first_name', 'user__last_name', 'user__username'),
+    ),
+}
+
+
+def namespace(owner_label, object_id):
+    return f'comment_tree:{owner_label}:{object_id}'
+
+
+class CommentTreeService:
+    """بناء أشجار التعليقات وتخزينها في الكاش"""
+
+    def _max_depth(self):
+        return max(getattr(settings, 'COMMENT_TREE_MAX_DEPTH', 4), 1)
+
+    def build(self, source, object_id):
+        nodes = {}
+        for row in source.rows(object_id).iterator(chunk_size=2000):
+            nodes[row['id']] = source.node(row)
+
+        roots = []
+        for node in nodes.values():
+            if node.parent_id is None:
+                roots.append(node)
+                continue
+            parent = nodes.get(node.parent_id)
+            # رد على تعليق مخفي (غير معتمد أو سبام) يُخفى مع فرعه
+            if parent is not None:
+                parent.replies.append(node)
+        roots.reverse()
+
+        max_depth = self._max_depth()
+        total = 0
+        stack = list(reversed(roots))
+        while stack:
+            node = stack.pop()
+            total += 1
+            if node.depth == max_depth - 1 and node.replies:
+                # كل الفرع الأعمق يصبح ردوداً مسطحة مرتبة زمنياً على آخر مستوى
+                flat = []
+                pending = list(node.replies)
+                while pending:
+                    reply = pending.pop()
+                    flat.append(reply)
+                    pending.extend(reply.replies)
+                flat.sort(key=lambda reply: (reply.created_at, reply.id))
+                for reply in flat:
+                    reply.depth = max_depth
+                    reply.replies = []
+                node.replies = flat
+                total += len(flat)
+                continue
+            for reply in reversed(node.replies):
+                reply.depth = node.depth + 1
+                stack.append(reply)
+        return CommentTree(roots, total)
+
+    def get(self, instance):
+        """شجرة تعليقات الكائن من الكاش أو من قاعدة البيانات"""
+        label = instance._meta.label_lower
+        source = COMMENT_TREES[label]
+        key = make_key(namespace(label, instance.pk), 'tree')
+        tree = cache.get(key)
+        if tree is None:
+            tree = self.build(source, instance.pk)
+            cache.set(key, tree, getattr(settings, 'COMMENT_TREE_CACHE_TIMEOUT', 3600))
+        return tree
+
+    def invalidate(self, comment):
+        """إبطال شجرة الكائن صاحب التعليق (بعد إضافته أو اعتماده أو حذفه)"""
+        label = comment._meta.label_lower
+        for owner_label, source in COMMENT_TREES.items():
+            if source.comment_label == label:
+                bump(namespace(owner_label, getattr(comment, f'{source.owner_field}_id')))
+
+    def invalidate_objects(self, owner_label, object_ids):
+        """إبطال أشجار عدة كائنات (بعد تحديث تعليقاتها بـ update() دون إشارات)"""
+        bump(*(namespace(owner_label, object_id) for object_id in set(object_ids)))
+
+
+comment_trees = CommentTreeService()
@@ -0,0 +1,96 @@
+"""
+طلبات GET الشرطية لصفحات تفاصيل المحتوى
+
+قبل تشغيل الـ view يُجلب صف خفيف واحد للكائن (المعرف، updated_at وأعمدة حالة
+مثل عدد التقييمات) وتُقرأ أجيال مساحات الكاش المرتبطة به (التعليقات، المحتوى
+ذو الصلة، إعدادات الموقع، لقطة الإعلانات) من الكاش، ومنها ETag قوي. إذا طابق
+If-None-Match يُعاد 304 مباشرة بدون الاستعلامات الثقيلة، مع تسجيل المشاهدة
+عبر نفس المسار غير المتزامن (عدادات المشاهدات وطابور التحليلات).
+يُطبق على الزوار المجهولين فقط: صفحات المستخدمين المسجلين تحتوي حالتهم.
+"""
+import hashlib
+from functools import wraps
+
+from django.apps import apps
+from django.conf import settings
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.utils.translation import get_language
+
+from .cache_versions import get_versions
+
+# مساحات تدخل في كل ETag (تغيّرها يغير كل الصفحات): الإعدادات والقوائم في السياق العام
+GLOBAL_NAMESPACES = ('site_settings', 'categories', 'page_list')
+
+
+def _ads_version():
+    from advertisements.serving import ad_index
+    return ad_index.version
+
+
+def content_etag(request, label, row, namespaces):
+    """ETag من صف الكائن وأجيال المساحات والرابط الكامل (مع صفحة التعليقات) واللغة"""
+    versions = get_versions(*GLOBAL_NAMESPACES, *namespaces)
+    parts = [
+        label, request.build_absolute_uri(), get_language(), *(str(value) for value in row),
+        *(f'{namespace}={versions[namespace]}' for namespace in sorted(versions)),
+        f'ads={_ads_version()}',
+        # رمز CSRF في النماذج مرتبط بالكوكي
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+    ]
+    return '"{}"'.format(hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest())
+
+
+def _applies(request):
+    if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+        return False
+    # رسائل معلقة (بعد إرسال تعليق مثلاً) يجب أن تُعرض في استجابة كاملة
+    return not request.COOKIES.get(getattr(settings, 'MESSAGE_COOKIE_NAME', 'messages'))
+
+
+def conditional_content(label, lookup='slug', filters=None, state=(), annotations=None,
+                        namespaces=(), track=None):
+    """
+    ديكور ETag و Last-Modified لـ view تفاصيل كائن
+    state: أعمدة تؤثر على الصفحة ولا تغير updated_at (مثل عدد التقييمات)
+    annotations: تعبيرات حالة محسوبة في نفس الاستعلام
+    namespaces: مساحات كاش بمعاملات الكائن، مثل 'article:{pk}' أو 'page:{slug}'
+    track: دالة (request، كائن فيه pk فقط) لتسجيل المشاهدة عند الرد بـ 304
+    """
+    filters = filters or {}
+    annotations = annotations or {}
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapped(request, *args, **kwargs):
+            if not getattr(settings, 'CONDITIONAL_CONTENT', True) or not _applies(request):
+                return view_func(request, *args, **kwargs)
+
+            model = apps.get_model(label)
+            queryset = model.objects.filter(**{lookup: kwargs[lookup]}, **filters)
+            if annotations:
+                queryset = queryset.annotate(**annotations)
+            row = queryset.order_by().values_list('pk', 'updated_at', *state, *annotations).first()
+            if row is None:
+                # غير موجود أو غير منشور: الـ view يقرر (404، إعادة توجيه...)
+                return view_func(request, *args, **kwargs)
+
+            pk, updated_at = row[0], row[1]
+            params = {**kwargs, 'pk': pk}
+            etag = content_etag(request, label, row, [namespace.format(**params) for namespace in namespaces])
+            # updated_at لا يغطي التعليقات والإعلانات، فالقرار بالـ ETag وحده
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                if track is not None:
+                    track(request, model(pk=pk))
+                response['ETag'] = etag
+                return response
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200 and not response.has_header('ETag'):
+                response['ETag'] = etag
+                if updated_at:
+                    response['Last-Modified'] = http_date(updated_at.timestamp())
+            return response
+        return wrapped
+    return decorator
@@ -0,0 +1,241 @@
+"""
+معالجة محتوى HTML عند الحفظ
+
+يُحلل المحتوى مرة واحدة عند الحفظ: حدود الكتل الرئيسية (فقرات، عناوين،
+قوائم...) كمواضع داخل النص تُخزن مع الكائن، النص الصافي، عدد الكلمات، وقت
+القراءة، الملخص والوصف (meta). عند العرض تُدرج الإعلانات بتقسيم النص على
+المواضع المخزنة بدون إعادة تحليل، ولا تعمل القوالب على HTML المحتوى الكامل.
+الحقول المشتقة لكل نموذج معرفة في DERIVED_CONTENT، وأمر derive_content يعيد
+حسابها لكل المحتوى على دفعات في عمليات متوازية.
+"""
+import html
+import math
+import re
+from html.parser import HTMLParser
+
+from django.apps import apps
+from django.conf import settings
+from django.utils.html import strip_tags
+
+# عناصر بدون وسم إغلاق
+VOID_ELEMENTS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr',
+})
+# عناصر الكتل التي يمكن وضع إعلان بعدها إذا كانت في المستوى الأعلى
+BLOCK_ELEMENTS = frozenset({
+    'address', 'article', 'aside', 'blockquote', 'details', 'div', 'dl', 'figure', 'footer', 'form',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'ol', 'p', 'pre', 'section', 'table', 'ul',
+})
+
+_WHITESPACE = re.compile(r'\s+')
+# وسوم تفصل بين الكلمات (حتى لا تلتصق كلمات الكتل المتجاورة بعد حذف الوسوم)
+_SEPARATING_TAG = re.compile(
+    r'</?(?:address|article|aside|blockquote|br|dd|div|dl|dt|figcaption|figure|footer|h[1-6]|header|hr|'
+    r'li|ol|p|pre|section|table|td|th|tr|ul)\b[^>]*>',
+    re.IGNORECASE,
+)
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+class _BlockParser(HTMLParser):
+    """يجمع موضع نهاية كل كتلة في المستوى الأعلى من المستند"""
+
+    def __init__(self, text):
+        super().__init__(convert_charrefs=True)
+        self.text = text
+        self.depth = 0
+        self.offsets = []
+        # موضع بداية كل سطر لتحويل (السطر، العمود) إلى موضع في النص
+        self._lines = [0] + [match.end() for match in re.finditer('\n', text)]
+
+    def _offset(self):
+        line, column = self.getpos()
+        return self._lines[line - 1] + column
+
+    def _tag_end(self):
+        end = self.text.find('>', self._offset())
+        return len(self.text) if end == -1 else end + 1
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_ELEMENTS:
+            if self.depth == 0 and tag in BLOCK_ELEMENTS:
+                self.offsets.append(self._tag_end())
+            return
+        self.depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        if self.depth == 0 and tag in BLOCK_ELEMENTS:
+            self.offsets.append(self._tag_end())
+
+    def handle_endtag(self, tag):
+        if tag in VOID_ELEMENTS:
+            return
+        # وسوم إغلاق زائدة في HTML غير سليم
+        self.depth = max(self.depth - 1, 0)
+        if self.depth == 0 and tag in BLOCK_ELEMENTS:
+            self.offsets.append(self._tag_end())
+
+
+def block_offsets(content):
+    """مواضع نهايات كتل المستوى الأعلى (بدون نهاية النص نفسه)"""
+    if not content:
+        return []
+    parser = _BlockParser(content)
+    parser.feed(content)
+    parser.close()
+    offsets = sorted(set(offset for offset in parser.offsets if 0 < offset < len(content.rstrip())))
+    if not offsets and '\n\n' in content:
+        # نص بدون وسوم: الفقرات مفصولة بسطر فارغ
+        offset = 0
+        for paragraph in content.split('\n\n')[:-1]:
+            offset += len(paragraph)
+            offsets.append(offset)
+            offset += 2
+    return offsets
+
+
+def split_at(content, offsets):
+    """تقسيم النص على المواضع المعطاة"""
+    pieces = []
+    start = 0
+    for offset in sorted(offsets):
+        pieces.append(content[start:offset])
+        start = offset
+    pieces.append(content[start:])
+    return pieces
+
+
+def ad_offsets(blocks, slots=2):
+    """
+    مواضع إعلانات المحتوى من حدود الكتل
+    بعد الكتلة الثالثة، وقبل الكتلة قبل الأخيرة في المحتوى الطويل
+    """
+    total = len(blocks) + 1
+    if total < 5:
+        return []
+    positions = [2]
+    if total > 7:
+        positions.append(total - 2)
+    return [blocks[position] for position in positions[:slots] if position < len(blocks)]
+
+
+def plain_text(content):
+    """نص المحتوى بدون وسوم HTML ومسافات زائدة"""
+    if not content:
+        return ''
+    text = html.unescape(strip_tags(_SEPARATING_TAG.sub(' ', content)))
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def word_count(text):
+    return len(_WORD.findall(text))
+
+
+def reading_time(words, per_minute=None):
+    """وقت القراءة بالدقائق (دقيقة على الأقل)"""
+    per_minute = per_minute or getattr(settings, 'CONTENT_WORDS_PER_MINUTE', 200)
+    return max(1, math.ceil(words / per_minute))
+
+
+def make_excerpt(text, length=300):
+    """أول length حرفاً من النص مقطوعة عند نهاية كلمة"""
+    text = plain_text(text)
+    if len(text) <= length:
+        return text
+    cut = text[:length - 1]
+    space = cut.rfind(' ')
+    if space > length // 2:
+        cut = cut[:space]
+    return cut.rstrip(' .,،؛:') + '…'
+
+
+def derive(content, excerpt='', meta_description='', excerpt_length=300, meta_length=160,
+           per_minute=200, blocks=False):
+    """
+    الحقول المشتقة من محتوى HTML
+    دالة صافية لا تلمس الإعدادات أو قاعدة البيانات لتعمل في عمليات منفصلة
+    الملخص والوصف المكتوبان يدوياً يُحفظان (بدون وسوم)، والفارغ يُولّد من النص
+    """
+    text = plain_text(content)
+    words = word_count(text)
+    excerpt = make_excerpt(excerpt or text, excerpt_length)
+    derived = {
+        'word_count': words,
+        'reading_time': reading_time(words, per_minute),
+        'excerpt': excerpt,
+        'meta_description': make_excerpt(meta_description or excerpt, meta_length),
+    }
+    if blocks:
+        derived['content_blocks'] = block_offsets(content)
+    return derived
+
+
+def derive_rows(rows, options):
+    """derive لدفعة من الصفوف (pk، المحتوى، الملخص، الوصف) للعمليات المتوازية"""
+    return [
+        (pk, derive(content or '', excerpt or '', meta or '', **options))
+        for pk, content, excerpt, meta in rows
+    ]
+
+
+class DerivedContent:
+    """
+    الحقول المشتقة لنموذج محتوى
+    meta_field: حقل الوصف (meta) في النموذج؛ blocks: تخزين حدود الكتل في content_blocks
+    """
+
+    def __init__(self, label, meta_field='meta_description', excerpt_length=300, meta_length=160, blocks=False):
+        self.label = label
+        self.meta_field = meta_field
+        self.excerpt_length = excerpt_length
+        self.meta_length = meta_length
+        self.blocks = blocks
+
+    @property
+    def model(self):
+        return apps.get_model(self.label)
+
+    @property
+    def source_fields(self):
+        return ['content', 'excerpt', self.meta_field]
+
+    @property
+    def fields(self):
+        fields = ['word_count', 'reading_time', 'excerpt', self.meta_field]
+        if self.blocks:
+            fields.append('content_blocks')
+        return fields
+
+    def options(self):
+        return {
+            'excerpt_length': self.excerpt_length,
+            'meta_length': self.meta_length,
+            'per_minute': getattr(settings, 'CONTENT_WORDS_PER_MINUTE', 200),
+            'blocks': self.blocks,
+        }
+
+    def values(self, derived):
+        """قيم الحقول المشتقة بأسماء حقول النموذج"""
+        values = dict(derived)
+        values[self.meta_field] = values.pop('meta_description')
+        return values
+
+    def apply(self, instance):
+        derived = derive(
+            instance.content or '', instance.excerpt or '', getattr(instance, self.meta_field) or '',
+            **self.options()
+        )
+        for field, value in self.values(derived).items():
+            setattr(instance, field, value)
+
+
+DERIVED_CONTENT = {
+    'articles.article': DerivedContent('articles.article', blocks=True),
+    'blog.post': DerivedContent('blog.post', meta_field='seo_description'),
+    'pages.page': DerivedContent('pages.page', meta_field='seo_description', excerpt_length=500),
+}
+
+
+def derive_content(instance):
+    """حساب الحقول المشتقة للكائن قبل حفظه"""
+    DERIVED_CONTENT[instance._meta.label_lower].apply(instance)
@@ -1,125 +1,114 @@
-from django.core.cache import cache
-from django.utils.translation import gettext_lazy as _
-from .models import SiteSetting, Category
-from advertisements.models import Advertisement, AdPlacement
+from .global_context import global_context
+from .site_settings import get_site_settings
+from advertisements.serving import ad_index
+from advertisements.sampling import visitor_key
 from pages.models import Page
 from blog.models import Category
+import pages.context_processors  # noqa: تسجيل menu_pages و page_stats
+
+# ==============================================
+# عناصر السياق العام (تُحمل فقط عند استخدامها في القالب)
+# ==============================================
+
+def _dark_mode(request):
+    if request.user.is_authenticated:
+        return getattr(request.user, 'dark_mode', False)
+    return request.COOKIES.get('dark_mode') == 'true'
+
+
+def _is_dark_mode(request):
+    # 1. المستخدم المسجل 2. الجلسة 3. الكوكيز
+    if request.user.is_authenticated:
+        return getattr(request.user, 'dark_mode', False)
+    if 'dark_mode' in request.session:
+        return request.session.get('dark_mode', False)
+    return request.COOKIES.get('dark_mode') == 'true'
+
+
+def _menu_categories(request):
+    return list(Category.objects.filter(order__gte=0).order_by('order'))
+
+
+def _active_categories(request):
+    return list(Category.objects.filter(is_active=True).order_by('order', 'name_ar'))
+
+
+def _main_menu_pages(request):
+    return list(Page.objects.filter(
+        status='published',
+        show_in_menu=True,
+        parent__isnull=True
+    ).order_by('order'))
+
+
+def _active_ads(request):
+    if request.path.startswith('/admin/'):
+        return {}
+    
+    # اختيار إعلان لكل مكان نشط من فهرس الإعلانات في الذاكرة
+    ads = {}
+    visitor = visitor_key(request)
+    for code, placement in ad_index.placements().items():
+        if not placement.active:
+            continue
+        selected = ad_index.select(code, visitor=visitor)
+        if selected:
+            ads[code] = selected[0]
+    return ads
+
+
+global_context.register('site_settings', lambda request: get_site_settings())
+global_context.register('current_language', lambda request: request.LANGUAGE_CODE)
+global_context.register('is_rtl', lambda request: request.LANGUAGE_CODE == 'ar')
+global_context.register('dark_mode', _dark_mode)
+global_context.register('is_dark_mode', _is_dark_mode)
+global_context.register('menu_categories', _menu_categories, namespace='categories')
+global_context.register('categories', _active_categories, namespace='categories',
+                        aliases=('all_categories',))
+global_context.register('main_menu_pages', _main_menu_pages, namespace='page_list')
+global_context.register('active_ads', _active_ads)
+
+
+def global_context_processor(request):
+    """معالج السياق الوحيد: كل العناصر العامة ككائنات كسولة"""
+    return global_context.items(request)
+
+
+# ==============================================
+# المعالجات القديمة (تعيد نفس العناصر الكسولة)
+# ==============================================
 
 def site_settings(request):
     """إرجاع إعدادات الموقع المخزنة في الكاش"""
-    settings = cache.get('site_settings')
-    
-    if not settings:
-        settings = SiteSetting.objects.first()
-        if not settings:
-            # إعدادات افتراضية إذا لم يتم إعدادها
-            settings = SiteSetting(
-                site_name="منصة التعليم",
-                site_description="منصة تعليمية متكاملة",
-                default_language="ar"
-            )
-        # تخزين في الكاش لمدة ساعة
-        cache.set('site_settings', settings, 3600)
-    
-    return {'site_settings': settings}
+    return global_context.items(request, 'site_settings')
 
 def language_processor(request):
     """معالج إعدادات اللغة"""
-    return {
-        'current_language': request.LANGUAGE_CODE,
-        'is_rtl': request.LANGUAGE_CODE == 'ar',
-    }
+    return global_context.items(request, 'current_language', 'is_rtl')
 
 def dark_mode_processor(request):
     """معالج الوضع المظلم"""
-    dark_mode = False
-    
-    if request.user.is_authenticated:
-        dark_mode = request.user.dark_mode
-    elif 'dark_mode' in request.COOKIES:
-        dark_mode = request.COOKIES.get('dark_mode') == 'true'
-    
-    return {'dark_mode': dark_mode}
+    return global_context.items(request, 'dark_mode')
 
 def menu_categories(request):
     """إرجاع التصنيفات للقائمة"""
-    categories = cache.get('menu_categories')
-    
-    if not categories:
-        categories = Category.objects.filter(order__gte=0).order_by('order')
-        cache.set('menu_categories', categories, 300)
-    
-    return {'menu_categories': categories}
+    return global_context.items(request, 'menu_categories')
 
 def main_menu_pages(request):
     """الصفحات الرئيسية للقائمة"""
-    pages = cache.get('main_menu_pages')
-    
-    if not pages:
-        pages = Page.objects.filter(
-            status='published',
-            show_in_menu=True,
-            parent__isnull=True
-        ).order_by('order')
-        cache.set('main_menu_pages', pages, 300)
-    
-    return {'main_menu_pages': pages}
+    return global_context.items(request, 'main_menu_pages')
 
 def active_advertisements(request):
     """الإعلانات النشطة للمواقع المختلفة"""
-    if request.path.startswith('/admin/'):
-        return {'active_ads': {}}
-    
-    ads_cache_key = f'active_ads_{request.LANGUAGE_CODE}'
-    ads = cache.get(ads_cache_key)
-    
-    if not ads:
-        placements = AdPlacement.objects.filter(active=True)
-        ads_dict = {}
-        
-        for placement in placements:
-            active_ad = Advertisement.objects.filter(
-                placement=placement,
-                active=True
-            ).first()
-            
-            if active_ad and active_ad.is_active():
-                ads_dict[placement.code] = active_ad
-        
-        cache.set(ads_cache_key, ads_dict, 60)  # تخزين لمدة دقيقة
-    
-    return {'active_ads': ads or {}}
-
-
+    return global_context.items(request, 'active_ads')
 
 def theme_settings(request):
     """إعدادات السمة للقالب"""
-    # التحقق من وضع الظلام
-    dark_mode = False
-    
-    # 1. التحقق من المستخدم المسجل
-    if request.user.is_authenticated:
-        dark_mode = getattr(request.user, 'dark_mode', False)
-    # 2. التحقق من الجلسة
-    elif 'dark_mode' in request.session:
-        dark_mode = request.session.get('dark_mode', False)
-    # 3. التحقق من الكوكيز
-    elif 'dark_mode' in request.COOKIES:
-        dark_mode = request.COOKIES.get('dark_mode') == 'true'
-    
-    return {
-        'is_dark_mode': dark_mode,
-        'site_settings': request.site_settings if hasattr(request, 'site_settings') else None
-    }
-
-
+    return global_context.items(request, 'is_dark_mode', 'site_settings')
 
 
 def categories_processor(request):
     """
     Makes all categories available in all templates.
     """
-    categories = Category.objects.filter(is_active=True).order_by('order', 'name_ar')
-    return {
-        'categories': categories
-    }
+    return global_context.items(request, 'categories')
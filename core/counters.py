@@ -0,0 +1,235 @@
+"""
+عدادات مؤجلة الكتابة (write-behind) للمشاهدات والإحصائيات
+
+تتجمع الزيادات إما في ذاكرة العملية ('local') أو في الكاش المشترك عبر
+incr الذري ('cache')، ثم تُطبق على قاعدة البيانات دفعة واحدة بجمل
+UPDATE ... SET views = views + n بدلاً من UPDATE لكل طلب.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+# النماذج التي تملك حقل views ويتم عدّها عبر المخزن المؤقت
+COUNTED_MODELS = (
+    'articles.article',
+    'articles.tag',
+    'pages.page',
+    'blog.post',
+    'books.book',
+)
+
+UPDATE_CHUNK_SIZE = 500
+
+_buffers = []
+
+
+class CounterBuffer:
+    """مخزن مؤقت لزيادات العدادات يتم تفريغه على دفعات"""
+
+    def __init__(self, name, apply, settings_prefix):
+        self.name = name
+        self.apply = apply
+        self.settings_prefix = settings_prefix
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = defaultdict(int)
+        self._touched = set()
+        self._last_flush = time.monotonic()
+        _buffers.append(self)
+
+    def _setting(self, name, default):
+        return getattr(settings, f'{self.settings_prefix}_{name}', default)
+
+    @property
+    def backend(self):
+        return self._setting('BACKEND', 'local')
+
+    def _cache_key(self, key):
+        return f'counter:{self.name}:' + ':'.join(str(part) for part in key)
+
+    def incr(self, key, n=1):
+        """إضافة n إلى العداد المرتبط بالمفتاح"""
+        if self.backend == 'cache':
+            self._cache_incr(key, n)
+            with self._lock:
+                self._touched.add(key)
+                size = len(self._touched)
+        else:
+            with self._lock:
+                self._pending[key] += n
+                size = len(self._pending)
+
+        self._maybe_flush(size)
+
+    def _cache_incr(self, key, n):
+        self._incr_cache_key(self._cache_key(key), n)
+
+    @staticmethod
+    def _incr_cache_key(cache_key, n):
+        # add ينشئ المفتاح بدون انتهاء صلاحية، و incr ذري على الخادم
+        if not cache.add(cache_key, n, None):
+            try:
+                cache.incr(cache_key, n)
+            except ValueError:
+                cache.add(cache_key, n, None)
+
+    def pending(self, key):
+        """عدد الزيادات التي لم تُكتب بعد في قاعدة البيانات"""
+        if self.backend == 'cache':
+            return cache.get(self._cache_key(key)) or 0
+        with self._lock:
+            return self._pending.get(key, 0)
+
+    def _maybe_flush(self, size):
+        interval = self._setting('FLUSH_INTERVAL', 30)
+        max_pending = self._setting('MAX_PENDING', 500)
+        if size < max_pending and time.monotonic() - self._last_flush < interval:
+            return
+        # تفريغ واحد فقط في نفس الوقت داخل العملية
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self.flush()
+        finally:
+            self._flush_lock.release()
+
+    def flush(self, keys=None):
+        """
+        كتابة الزيادات المتراكمة في قاعدة البيانات
+        keys: مفاتيح إضافية يتم فحصها في الكاش (تستخدمها أوامر الإدارة)
+        """
+        if self.backend == 'cache':
+            return self._flush_cache(keys)
+        return self._flush_local()
+
+    def _flush_local(self):
+        with self._lock:
+            batch = dict(self._pending)
+            self._pending = defaultdict(int)
+            self._last_flush = time.monotonic()
+
+        if not batch:
+            return 0
+
+        try:
+            self.apply(batch)
+        except Exception:
+            # إعادة الزيادات للمخزن حتى لا تضيع
+            with self._lock:
+                for key, n in batch.items():
+                    self._pending[key] += n
+            logger.exception(f'Failed to flush counter buffer {self.name}')
+            return 0
+
+        return sum(batch.values())
+
+    def _claim(self, cache_key, value):
+        """
+        حجز value من العداد قبل الكتابة في قاعدة البيانات
+        decr ذري، لذا الزيادات التي تصل أثناء التفريغ تبقى في الكاش. إذا قرأت
+        عملية أخرى نفس القيمة وحجزتها أولاً تصبح النتيجة سالبة: يُعاد الفائض
+        ولا يُكتب إلا ما تم حجزه فعلاً، فلا تُحسب المشاهدات مرتين.
+        """
+        try:
+            remaining = cache.decr(cache_key, value)
+        except ValueError:
+            # المفتاح حُذف بعد قراءته (تفريغ آخر أو انتهاء صلاحية)
+            return 0
+        if remaining >= 0:
+            return value
+        self._incr_cache_key(cache_key, -remaining)
+        return max(value + remaining, 0)
+
+    def _flush_cache(self, keys=None):
+        with self._lock:
+            candidates = self._touched
+            self._touched = set()
+            self._last_flush = time.monotonic()
+
+        if keys:
+            candidates = candidates | set(keys)
+        if not candidates:
+            return 0
+
+        cache_keys = {self._cache_key(key): key for key in candidates}
+        values = cache.get_many(list(cache_keys))
+
+        batch = {}
+        for cache_key, value in values.items():
+            if not value or value < 0:
+                continue
+            claimed = self._claim(cache_key, value)
+            if claimed:
+                batch[cache_keys[cache_key]] = claimed
+
+        if not batch:
+            return 0
+
+        try:
+            self.apply(batch)
+        except Exception:
+            for key, n in batch.items():
+                self._cache_incr(key, n)
+            with self._lock:
+                self._touched.update(batch)
+            logger.exception(f'Failed to flush counter buffer {self.name}')
+            return 0
+
+        return sum(batch.values())
+
+
+def apply_view_increments(batch):
+    """تطبيق زيادات المشاهدات بجمل UPDATE مجمعة حسب النموذج وقيمة الزيادة"""
+    grouped = defaultdict(lambda: defaultdict(list))
+    for (label, pk), n in batch.items():
+        grouped[label][n].append(pk)
+
+    with transaction.atomic():
+        for label, by_increment in grouped.items():
+            model = apps.get_model(label)
+            for n, pks in by_increment.items():
+                for i in range(0, len(pks), UPDATE_CHUNK_SIZE):
+                    model.objects.filter(
+                        pk__in=pks[i:i + UPDATE_CHUNK_SIZE]
+                    ).update(views=F('views') + n)
+
+
+view_counter = CounterBuffer('views', apply_view_increments, 'VIEW_COUNTER')
+
+
+def record_view(instance, n=1):
+    """تسجيل مشاهدة لكائن محتوى"""
+    view_counter.incr((instance._meta.label_lower, instance.pk), n)
+
+
+def pending_views(instance):
+    """المشاهدات المسجلة التي لم تُكتب بعد في قاعدة البيانات"""
+    return view_counter.pending((instance._meta.label_lower, instance.pk))
+
+
+def flush_all():
+    """تفريغ جميع المخازن المؤقتة في هذه العملية"""
+    total = 0
+    for buffer in _buffers:
+        total += buffer.flush()
+    return total
+
+
+def _flush_at_exit():
+    try:
+        flush_all()
+    except Exception:
+        logger.exception('Failed to flush counter buffers at exit')
+
+
+atexit.register(_flush_at_exit)
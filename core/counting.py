@@ -0,0 +1,331 @@
+"""
+خدمة العد
+
+عدادات مخزنة (ContentCount) لكل (نوع المحتوى، الحالة، بُعد) تُحدث من إشارات
+الحفظ والحذف وتغيير الوسوم، فتصبح أعداد القوائم ولوحات الإحصائيات قراءة واحدة
+من الكاش بدلاً من COUNT(*). تُعتمد العدادات لنوع المحتوى فقط بعد أول مطابقة
+(أمر reconcile_counts)، وقبلها أو للاستعلامات المركبة يُستخدم عدد دقيق مخزن
+في الكاش لمدة محدودة (cached_count).
+"""
+import logging
+from collections import Counter
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+
+from .cache_versions import bump, make_key
+
+logger = logging.getLogger(__name__)
+
+# صف يدل على أن عدادات النوع مطابقة لقاعدة البيانات
+MARKER = '*'
+
+
+class CountedModel:
+    """
+    تعريف نموذج معدود
+    dimensions: بادئة البُعد ← اسم الحقل (القيم المنطقية تعطي البادئة وحدها)
+    m2m: (بادئة البُعد، اسم علاقة ManyToMany) مثل ('tag', 'tags')
+    """
+
+    def __init__(self, label, status_field='status', dimensions=None, m2m=None):
+        self.label = label
+        self.status_field = status_field
+        self.dimensions = dimensions or {}
+        self.m2m = m2m
+
+    @property
+    def model(self):
+        return apps.get_model(self.label)
+
+    @property
+    def fields(self):
+        return [self.status_field, *self.dimensions.values()]
+
+    def dimension(self, prefix, value):
+        if value is None or value is False or value == '':
+            return None
+        return prefix if value is True else f'{prefix}:{value}'
+
+    def keys(self, row):
+        """(الحالة، البُعد) لكل عداد يدخل فيه الصف (dict بالحقول)"""
+        status = row[self.status_field]
+        keys = [(status, '')]
+        for prefix, field in self.dimensions.items():
+            dimension = self.dimension(prefix, row[field])
+            if dimension:
+                keys.append((status, dimension))
+        return keys
+
+    def state(self, instance):
+        return {field: getattr(instance, field) for field in self.fields}
+
+
+COUNTED_MODELS = {
+    'articles.article': CountedModel(
+        'articles.article',
+        dimensions={'category': 'category_id', 'featured': 'is_featured'},
+        m2m=('tag', 'tags'),
+    ),
+    'books.book': CountedModel(
+        'books.book',
+        dimensions={'type': 'book_type', 'featured': 'is_featured'},
+    ),
+    'blog.post': CountedModel(
+        'blog.post',
+        dimensions={'category': 'category_id', 'featured': 'is_featured'},
+    ),
+    'pages.page': CountedModel('pages.page'),
+}
+
+
+def namespace(label):
+    return f'counts:{label}'
+
+
+class CountingService:
+    """قراءة العدادات المخزنة وتحديثها"""
+
+    def _timeout(self):
+        return getattr(settings, 'COUNTS_CACHE_TIMEOUT', 300)
+
+    def _table(self, label):
+        """كل عدادات النوع: {(الحالة، البُعد): العدد} أو None قبل أول مطابقة"""
+        from .models import ContentCount
+        key = make_key(namespace(label), 'table')
+        table = cache.get(key)
+        if table is None:
+            rows = ContentCount.objects.filter(content_label=label).values_list(
+                'status', 'dimension', 'count'
+            )
+            table = {(status, dimension): count for status, dimension, count in rows}
+            cache.set(key, table, self._timeout())
+        if (MARKER, MARKER) not in table:
+            return None
+        return table
+
+    def get(self, label, status='published', dimension=''):
+        """العدد المخزن، أو None إذا لم تتم مطابقة عدادات هذا النوع بعد"""
+        table = self._table(label)
+        if table is None:
+            return None
+        return max(table.get((status, dimension), 0), 0)
+
+    def count(self, label, status='published', dimension='', queryset=None):
+        """العدد المخزن، مع الرجوع لعدد دقيق مخزن في الكاش للاستعلام queryset"""
+        value = self.get(label, status, dimension)
+        if value is None and queryset is not None:
+            value = self.cached_count(queryset, namespace(label), status, dimension)
+        return value
+
+    def cached_count(self, queryset, namespaces, *parts, timeout=None):
+        """
+        COUNT(*) دقيق مخزن في الكاش
+        namespaces: مساحات core.cache_versions التي يبطل تغييرها العدد
+        """
+        key = make_key(namespaces, 'count', *parts)
+        value = cache.get(key)
+        if value is None:
+            value = queryset.order_by().count()
+            cache.set(key, value, timeout or self._timeout())
+        return value
+
+    def cached_value(self, namespaces, name, loader, timeout=None):
+        """قيمة إحصائية (مثل مجموع المشاهدات) مخزنة في الكاش"""
+        key = make_key(namespaces, 'value', name)
+        value = cache.get(key)
+        if value is None:
+            value = loader()
+            cache.set(key, value, timeout or self._timeout())
+        return value
+
+    def apply(self, label, deltas):
+        """إضافة الفروق {(الحالة، البُعد): فرق} إلى العدادات"""
+        from .models import ContentCount
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        with transaction.atomic():
+            for (status, dimension), delta in deltas.items():
+                updated = ContentCount.objects.filter(
+                    content_label=label, status=status, dimension=dimension
+                ).update(count=F('count') + delta)
+                if not updated:
+                    row, created = ContentCount.objects.get_or_create(
+                        content_label=label, status=status, dimension=dimension,
+                        defaults={'count': delta},
+                    )
+                    if not created:
+                        ContentCount.objects.filter(pk=row.pk).update(count=F('count') + delta)
+        transaction.on_commit(lambda: bump(namespace(label)))
+
+    def reconcile(self, label):
+        """
+        إعادة حساب عدادات النوع من قاعدة البيانات
+        تعيد عدد العدادات التي كانت قيمتها المخزنة مختلفة
+        """
+        from .models import ContentCount
+        counted = COUNTED_MODELS[label]
+        model = counted.model
+
+        exact = _totals(counted, model.objects.all())
+        exact[(MARKER, MARKER)] = 1
+
+        with transaction.atomic():
+            stored = {
+                (row.status, row.dimension): row
+                for row in ContentCount.objects.select_for_update().filter(content_label=label)
+            }
+            changed = 0
+            for key, row in stored.items():
+                if key not in exact:
+                    changed += row.count != 0
+                    row.delete()
+                elif row.count != exact[key]:
+                    changed += 1
+                    row.count = exact[key]
+                    row.save(update_fields=['count', 'updated_at'])
+            missing = [
+                ContentCount(content_label=label, status=status, dimension=dimension, count=count)
+                for (status, dimension), count in exact.items() if (status, dimension) not in stored
+            ]
+            ContentCount.objects.bulk_create(missing)
+            changed += sum(1 for row in missing if row.status != MARKER)
+        bump(namespace(label))
+        return changed
+
+
+def _totals(counted, queryset):
+    """أعداد صفوف queryset لكل (الحالة، البُعد) باستعلامات مجمعة"""
+    totals = Counter()
+    rows = queryset.order_by().values(*counted.fields).annotate(n=Count('pk'))
+    for row in rows:
+        for key in counted.keys(row):
+            totals[key] += row['n']
+    if counted.m2m:
+        prefix, relation = counted.m2m
+        rows = queryset.order_by().filter(**{f'{relation}__isnull': False}).values(
+            counted.status_field, relation
+        ).annotate(n=Count('pk'))
+        for row in rows:
+            totals[(row[counted.status_field], f'{prefix}:{row[relation]}')] += row['n']
+    return totals
+
+
+counts = CountingService()
+
+
+def bulk_update(queryset, **fields):
+    """
+    queryset.update() مع تحديث العدادات (update لا يرسل إشارات الحفظ)
+    تعيد عدد الصفوف المحدثة
+    """
+    counted = COUNTED_MODELS.get(queryset.model._meta.label_lower)
+    if counted is None:
+        return queryset.update(**fields)
+    with transaction.atomic():
+        # نفس الصفوف قبل التحديث وبعده حتى لو غيّر التحديث شروط queryset
+        rows = counted.model.objects.filter(pk__in=list(queryset.values_list('pk', flat=True)))
+        before = _totals(counted, rows)
+        updated = rows.update(**fields)
+        deltas = _totals(counted, rows)
+        deltas.subtract(before)
+        counts.apply(counted.label, deltas)
+    return updated
+
+
+# ==============================================
+# تحديث العدادات من الإشارات
+# ==============================================
+
+STATE_ATTR = '_counted_state'
+
+
+def _tag_ids(instance, counted):
+    if not counted.m2m or not instance.pk:
+        return []
+    return list(getattr(instance, counted.m2m[1]).values_list('pk', flat=True))
+
+
+def remember_state(instance):
+    """حفظ الحالة المخزنة قبل الحفظ أو الحذف (pre_save / pre_delete)"""
+    counted = COUNTED_MODELS.get(instance._meta.label_lower)
+    if counted is None:
+        return
+    state = None
+    if instance.pk:
+        state = counted.model.objects.filter(pk=instance.pk).values(*counted.fields).first()
+    tags = _tag_ids(instance, counted) if state else []
+    setattr(instance, STATE_ATTR, (state, tags))
+
+
+def _deltas(counted, old, new, old_tags, new_tags):
+    deltas = Counter()
+    if old:
+        for key in counted.keys(old):
+            deltas[key] -= 1
+        for tag_id in old_tags:
+            deltas[(old[counted.status_field], f'{counted.m2m[0]}:{tag_id}')] -= 1
+    if new:
+        for key in counted.keys(new):
+            deltas[key] += 1
+        for tag_id in new_tags:
+            deltas[(new[counted.status_field], f'{counted.m2m[0]}:{tag_id}')] += 1
+    return deltas
+
+
+def instance_saved(instance):
+    counted = COUNTED_MODELS.get(instance._meta.label_lower)
+    if counted is None:
+        return
+    old, tags = getattr(instance, STATE_ATTR, (None, []))
+    new = counted.state(instance)
+    if old == new:
+        return
+    # الوسوم لم تتغير أثناء الحفظ: تنتقل فقط إذا تغيرت الحالة
+    counts.apply(counted.label, _deltas(counted, old, new, tags, tags))
+
+
+def instance_deleted(instance):
+    counted = COUNTED_MODELS.get(instance._meta.label_lower)
+    if counted is None:
+        return
+    old, tags = getattr(instance, STATE_ATTR, (None, []))
+    counts.apply(counted.label, _deltas(counted, old, None, tags, []))
+
+
+def relation_changed(counted, instance, action, reverse, pk_set):
+    """تحديث عدادات الوسوم عند تغيير علاقة ManyToMany"""
+    prefix = counted.m2m[0]
+    if action == 'pre_clear':
+        if reverse:
+            accessor = counted.model._meta.get_field(counted.m2m[1]).remote_field.get_accessor_name()
+            pk_set = set(getattr(instance, accessor).values_list('pk', flat=True))
+        else:
+            pk_set = set(_tag_ids(instance, counted))
+        setattr(instance, '_counted_cleared', pk_set)
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_counted_cleared', set())
+        sign = -1
+    elif action in ('post_add', 'post_remove'):
+        sign = 1 if action == 'post_add' else -1
+    else:
+        return
+    if not pk_set:
+        return
+
+    deltas = Counter()
+    if reverse:
+        # instance هو الوسم، و pk_set معرفات المحتوى
+        statuses = counted.model.objects.filter(pk__in=pk_set).values_list(counted.status_field, flat=True)
+        for status in statuses:
+            deltas[(status, f'{prefix}:{instance.pk}')] += sign
+    else:
+        status = getattr(instance, counted.status_field)
+        for related_id in pk_set:
+            deltas[(status, f'{prefix}:{related_id}')] += sign
+    counts.apply(counted.label, deltas)
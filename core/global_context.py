@@ -0,0 +1,99 @@
+"""
+خدمة السياق العام للقوالب
+
+كل عنصر عام (إعدادات الموقع، القوائم، الإعلانات...) يُسجل مع دالة تحميل،
+ويُمرر للقالب ككائن كسول لا يلمس الكاش أو قاعدة البيانات إلا إذا استخدمه
+القالب فعلاً، ثم يُحفظ داخل الطلب. القيم المخزنة في الكاش دائماً قوائم أو
+tuples جاهزة وليست QuerySets. العناصر المستخدمة تُعد في request.global_context_used.
+"""
+import threading
+from collections import Counter
+
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from .cache_versions import make_key
+
+USAGE_ATTR = 'global_context_used'
+
+
+class GlobalItem:
+    """عنصر سياق عام: دالة تحميل مع كاش مشترك اختياري"""
+
+    def __init__(self, name, loader, namespace=None, timeout=300, vary=None):
+        self.name = name
+        self.loader = loader
+        self.namespace = namespace
+        self.timeout = timeout
+        self.vary = vary
+
+    def load(self, request):
+        if self.namespace is None:
+            return self.loader(request)
+
+        parts = [self.name]
+        if self.vary is not None:
+            parts.append(self.vary(request))
+        key = make_key(self.namespace, *parts)
+
+        value = cache.get(key)
+        if value is None:
+            value = self.loader(request)
+            cache.set(key, value, self.timeout)
+        return value
+
+
+class GlobalContext:
+    """سجل العناصر العامة وإنشاء القيم الكسولة لكل طلب"""
+
+    def __init__(self):
+        self._items = {}
+        self._lock = threading.Lock()
+        self._totals = Counter()
+
+    def register(self, name, loader, namespace=None, timeout=300, vary=None, aliases=()):
+        """
+        تسجيل عنصر عام
+        namespace: مساحة كاش (core.cache_versions) لتخزين القيمة، أو None بدون كاش مشترك
+        vary: دالة تعيد جزءاً من المفتاح حسب الطلب (مثل حالة تسجيل الدخول)
+        aliases: أسماء إضافية لنفس القيمة في القالب
+        """
+        item = GlobalItem(name, loader, namespace, timeout, vary)
+        for key in (name, *aliases):
+            self._items[key] = item
+
+    def _resolve(self, request, item):
+        # قيمة واحدة لكل عنصر داخل الطلب حتى لو استُخدم بأكثر من اسم
+        resolved = request.__dict__.setdefault('_global_context_values', {})
+        if item.name not in resolved:
+            resolved[item.name] = item.load(request)
+            self.usage(request)[item.name] += 1
+            with self._lock:
+                self._totals[item.name] += 1
+        return resolved[item.name]
+
+    def items(self, request, *names):
+        """قاموس بالقيم الكسولة للأسماء المطلوبة (أو كل العناصر)"""
+        names = names or tuple(self._items)
+        return {
+            name: SimpleLazyObject(
+                lambda item=self._items[name]: self._resolve(request, item)
+            )
+            for name in names
+        }
+
+    def usage(self, request):
+        """عداد العناصر العامة التي استخدمها هذا الطلب فعلاً"""
+        usage = getattr(request, USAGE_ATTR, None)
+        if usage is None:
+            usage = Counter()
+            setattr(request, USAGE_ATTR, usage)
+        return usage
+
+    def stats(self):
+        """عدد الطلبات التي استخدمت كل عنصر منذ بدء العملية"""
+        with self._lock:
+            return dict(self._totals)
+
+
+global_context = GlobalContext()
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from core.related import RELATED_SOURCES, related_content
+import time
+
+class Command(BaseCommand):
+    help = 'Recompute the precomputed related-content neighbours for published content'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--content',
+            action='append',
+            choices=sorted(RELATED_SOURCES),
+            help='Content type to rebuild (repeatable, default: all)'
+        )
+        parser.add_argument(
+            '--pending',
+            action='store_true',
+            help='Only recompute items saved since their neighbours were computed (for frequent cron runs)'
+        )
+    
+    def handle(self, *args, **options):
+        labels = options['content'] or sorted(RELATED_SOURCES)
+        
+        for label in labels:
+            started = time.monotonic()
+            if options['pending']:
+                total = related_content.refresh_pending(label)
+            else:
+                total = related_content.rebuild(label)
+            self.stdout.write(
+                self.style.SUCCESS(f'{label}: {total} items in {time.monotonic() - started:.1f}s')
+            )
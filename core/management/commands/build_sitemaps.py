@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from core.sitemaps import SITEMAP_SECTIONS, sitemaps
+import time
+
+class Command(BaseCommand):
+    help = 'Write the gzip sitemap files whose content changed and the sitemap index'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--section',
+            action='append',
+            choices=sorted(SITEMAP_SECTIONS),
+            help='Section to build (repeatable, default: all)'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rewrite every chunk, not only the changed ones'
+        )
+    
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        written = sitemaps.build(options['section'], force=options['force'])
+        
+        for name, total in written.items():
+            self.stdout.write(f'{name}: {total} files written')
+        self.stdout.write(
+            self.style.SUCCESS(f'Sitemap index written to {sitemaps.index_path()} in {time.monotonic() - started:.1f}s')
+        )
@@ -98,7 +98,6 @@ class Command(BaseCommand):
                 slug=f'sample-article-{i}',
                 content=fake.text(1500),
                 excerpt=fake.text(150),
-                reading_time=random.randint(3, 15),
                 author=random.choice(users),
                 status=random.choice(['draft', 'published']),
                 is_featured=random.choice([True, False]),
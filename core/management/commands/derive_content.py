@@ -0,0 +1,122 @@
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from core.cache_versions import bump
+from core.content import DERIVED_CONTENT, derive_rows
+from core.page_cache import content_namespace, content_type_namespace
+from core.search import search_engine
+from core.search.sources import SEARCH_SOURCES
+import os
+import time
+
+# Cache namespaces of a single item that embed its derived fields (fragments, ETags, cached pages)
+ITEM_NAMESPACES = {
+    'articles.article': ('article:{pk}',),
+    'pages.page': ('page:{slug}',),
+}
+# Listings that show excerpts or reading times
+LIST_NAMESPACES = {
+    'articles.article': ('article_list',),
+    'pages.page': ('page_list',),
+}
+
+class Command(BaseCommand):
+    help = 'Recompute word count, reading time, excerpt and meta description for stored content'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--content',
+            action='append',
+            choices=sorted(DERIVED_CONTENT),
+            help='Content type to process (repeatable, default: all)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Rows per chunk sent to a worker (default: 500)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Worker processes (default: CPU count, 1 runs in this process)'
+        )
+    
+    def handle(self, *args, **options):
+        labels = options['content'] or sorted(DERIVED_CONTENT)
+        chunk_size = max(options['chunk_size'], 1)
+        workers = max(options['workers'], 1)
+        
+        for label in labels:
+            started = time.monotonic()
+            total = self.process(DERIVED_CONTENT[label], chunk_size, workers)
+            self.stdout.write(
+                self.style.SUCCESS(f'{label}: {total} items in {time.monotonic() - started:.1f}s')
+            )
+    
+    def chunks(self, derived, chunk_size):
+        """Read rows in primary-key order, one keyset chunk at a time"""
+        queryset = derived.model.objects.order_by('pk').values_list('pk', *derived.source_fields)
+        last = None
+        while True:
+            rows = list((queryset if last is None else queryset.filter(pk__gt=last))[:chunk_size])
+            if not rows:
+                return
+            last = rows[-1][0]
+            yield rows
+    
+    def write(self, derived, results):
+        """Store the rows whose derived fields changed, and return the number of rows processed"""
+        model = derived.model
+        results = dict(results)
+        stored = model.objects.filter(pk__in=results).values_list('pk', 'slug', *derived.fields)
+        objects = []
+        changed = {}
+        for pk, slug, *current in stored:
+            values = derived.values(results[pk])
+            if [values[field] for field in derived.fields] == current:
+                continue
+            obj = model(pk=pk)
+            for field, value in values.items():
+                setattr(obj, field, value)
+            objects.append(obj)
+            changed[pk] = slug
+        if objects:
+            # bulk_update skips save() and signals: only derived columns change
+            with transaction.atomic():
+                model.objects.bulk_update(objects, derived.fields)
+            self.invalidate(derived, changed)
+        return len(results)
+    
+    def invalidate(self, derived, changed):
+        """Do what the save signals would: purge cached copies and refresh search documents"""
+        label = derived.label
+        namespaces = [content_type_namespace(label), *LIST_NAMESPACES.get(label, ())]
+        for pk, slug in changed.items():
+            namespaces.append(content_namespace(label, pk))
+            namespaces.extend(template.format(pk=pk, slug=slug) for template in ITEM_NAMESPACES.get(label, ()))
+        bump(*namespaces)
+        if label in SEARCH_SOURCES:
+            for instance in derived.model.objects.filter(pk__in=changed):
+                search_engine.index_instance(instance)
+    
+    def process(self, derived, chunk_size, workers):
+        options = derived.options()
+        total = 0
+        if workers == 1:
+            for rows in self.chunks(derived, chunk_size):
+                total += self.write(derived, derive_rows(rows, options))
+        else:
+            # Forked workers must not inherit the open database connection
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = []
+                for rows in self.chunks(derived, chunk_size):
+                    pending.append(executor.submit(derive_rows, rows, options))
+                    # Keep a bounded number of chunks in flight
+                    if len(pending) >= workers * 2:
+                        total += self.write(derived, pending.pop(0).result())
+                for future in pending:
+                    total += self.write(derived, future.result())
+        return total
@@ -0,0 +1,67 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from advertisements.models import Advertisement
+from advertisements.stats import ad_counter, daily_counter, IMPRESSION, CLICK
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Flush buffered ad impression/click counters to the database in batched updates'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of ads checked per cache round-trip'
+        )
+    
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        
+        # مخزن هذه العملية أولاً (يكفي وحده مع الواجهة الخلفية 'local')
+        total = ad_counter.flush()
+        daily_total = daily_counter.flush()
+        
+        if ad_counter.backend != 'cache' and daily_counter.backend != 'cache':
+            # المخزن المحلي يعيش داخل عمليات الخادم وتفرغه هي بنفسها
+            self.stdout.write(
+                self.style.WARNING(
+                    'AD_COUNTER_BACKEND and AD_STATS_BACKEND are "local": counters are '
+                    'flushed by the serving processes themselves'
+                )
+            )
+            self.stdout.write(self.style.SUCCESS(f'Flushed {total} ad events ({daily_total} into daily stats)'))
+            return
+        
+        # الكاش لا يدعم سرد المفاتيح، لذا نفحص كل الإعلانات على دفعات
+        today = timezone.localdate()
+        days = [today.isoformat(), (today - timedelta(days=1)).isoformat()]
+        kinds = (IMPRESSION, CLICK)
+        
+        ads = Advertisement.objects.values_list('id', 'placement_id')
+        total_keys, daily_keys = [], []
+        for ad_id, placement_id in ads.iterator(chunk_size=chunk_size):
+            total_keys.extend((ad_id, kind) for kind in kinds)
+            daily_keys.extend(
+                (ad_id, placement_id, day, kind) for day in days for kind in kinds
+            )
+            if len(total_keys) >= chunk_size:
+                total += self._flush(ad_counter, total_keys)
+                daily_total += self._flush(daily_counter, daily_keys)
+                total_keys, daily_keys = [], []
+        
+        total += self._flush(ad_counter, total_keys)
+        daily_total += self._flush(daily_counter, daily_keys)
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Flushed {total} ad events ({daily_total} into daily stats)')
+        )
+        logger.info(f'Flushed {total} buffered ad events')
+    
+    def _flush(self, buffer, keys):
+        if not keys or buffer.backend != 'cache':
+            return 0
+        return buffer.flush(keys)
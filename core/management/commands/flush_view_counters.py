@@ -0,0 +1,50 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from core.counters import COUNTED_MODELS, view_counter
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Flush buffered view counters to the database in batched updates'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of objects checked per cache round-trip'
+        )
+    
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        
+        if view_counter.backend != 'cache':
+            # المخزن المحلي يعيش داخل عمليات الخادم، هنا نفرغ مخزن هذه العملية فقط
+            flushed = view_counter.flush()
+            self.stdout.write(
+                self.style.WARNING(
+                    'VIEW_COUNTER_BACKEND is "local": counters are flushed by the '
+                    'serving processes themselves'
+                )
+            )
+            self.stdout.write(self.style.SUCCESS(f'Flushed {flushed} views'))
+            return
+        
+        total = 0
+        for label in COUNTED_MODELS:
+            model = apps.get_model(label)
+            keys = []
+            
+            # فحص جميع المعرفات على دفعات لأن الكاش لا يدعم سرد المفاتيح
+            for pk in model.objects.values_list('pk', flat=True).iterator(chunk_size=chunk_size):
+                keys.append((label, pk))
+                if len(keys) >= chunk_size:
+                    total += view_counter.flush(keys)
+                    keys = []
+            
+            if keys:
+                total += view_counter.flush(keys)
+        
+        self.stdout.write(self.style.SUCCESS(f'Flushed {total} views'))
+        logger.info(f'Flushed {total} buffered views')
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from articles.engagement import rebuild
+from articles.models import Article
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Recompute article rating and approved comment stats from ratings and comments'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--article',
+            action='append',
+            type=int,
+            help='Article id to rebuild (repeatable, default: all)'
+        )
+    
+    def handle(self, *args, **options):
+        queryset = Article.objects.all()
+        if options['article']:
+            queryset = queryset.filter(pk__in=options['article'])
+        
+        changed = rebuild(queryset)
+        
+        if changed:
+            logger.warning(f'Corrected engagement stats for {changed} articles')
+        self.stdout.write(
+            self.style.SUCCESS(f'{changed} articles corrected')
+        )
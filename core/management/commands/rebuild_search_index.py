@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.search import search_engine
+from core.search.sources import SEARCH_SOURCES
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for one or all content sources'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--content',
+            action='append',
+            choices=sorted(SEARCH_SOURCES),
+            help='Content source to rebuild (repeatable, default: all)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of objects loaded per database round-trip'
+        )
+    
+    def handle(self, *args, **options):
+        labels = options['content'] or sorted(SEARCH_SOURCES)
+        
+        for label in labels:
+            try:
+                count = search_engine.rebuild(label, chunk_size=options['chunk_size'])
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            
+            self.stdout.write(
+                self.style.SUCCESS(f'Indexed {count} objects for {label} ({search_engine.backend.name} backend)')
+            )
+            logger.info(f'Rebuilt search index for {label}: {count} objects')
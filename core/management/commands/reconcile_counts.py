@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from core.counting import COUNTED_MODELS, counts
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized content counters from the database and fix any drift'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--content',
+            action='append',
+            choices=sorted(COUNTED_MODELS),
+            help='Content type to reconcile (repeatable, default: all)'
+        )
+    
+    def handle(self, *args, **options):
+        labels = options['content'] or sorted(COUNTED_MODELS)
+        
+        for label in labels:
+            changed = counts.reconcile(label)
+            
+            if changed:
+                logger.warning(f'Reconciled {changed} drifted counters for {label}')
+            self.stdout.write(
+                self.style.SUCCESS(f'{label}: {changed} counters corrected')
+            )
@@ -0,0 +1,54 @@
+from datetime import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.rollups import ROLLUP_SOURCES, rollup, prune_raw_views
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Compact raw view rows into daily rollups and prune rolled-up raw rows'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--content',
+            choices=sorted(ROLLUP_SOURCES),
+            help='Only roll up this content type'
+        )
+        parser.add_argument(
+            '--since',
+            help='Recompute rollups starting from this date (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--retain-days',
+            type=int,
+            default=getattr(settings, 'ANALYTICS_RAW_RETENTION_DAYS', 90),
+            help='Keep raw view rows for this many days after they are rolled up'
+        )
+        parser.add_argument(
+            '--no-prune',
+            action='store_true',
+            help='Do not delete raw rows after rolling them up'
+        )
+    
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--since must be in YYYY-MM-DD format')
+        
+        labels = [options['content']] if options['content'] else sorted(ROLLUP_SOURCES)
+        
+        for label in labels:
+            days, rows = rollup(label, since=since)
+            self.stdout.write(
+                self.style.SUCCESS(f'{label}: rolled up {days} days into {rows} rows')
+            )
+            
+            if not options['no_prune']:
+                deleted = prune_raw_views(label, options['retain_days'])
+                if deleted:
+                    self.stdout.write(f'{label}: pruned {deleted} raw view rows')
+                    logger.info(f'Pruned {deleted} raw view rows for {label}')
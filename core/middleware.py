@@ -1,7 +1,7 @@
 from django.utils import translation
 from django.utils.deprecation import MiddlewareMixin
 from django.http import HttpResponseRedirect
-from .models import SiteSetting
+from .site_settings import get_site_settings
 
 class SiteMaintenanceMiddleware(MiddlewareMixin):
     """ميدلوير وضع الصيانة"""
@@ -11,7 +11,7 @@ class SiteMaintenanceMiddleware(MiddlewareMixin):
             return None
         
         try:
-            settings = SiteSetting.objects.first()
+            settings = get_site_settings()
             if settings and settings.maintenance_mode:
                 # السماح ببعض الصفحات أثناء الصيانة
                 allowed_paths = ['/accounts/login/', '/accounts/logout/', '/maintenance/']
@@ -29,7 +29,7 @@ class LanguageMiddleware(MiddlewareMixin):
         
         # التحقق من وجود إعدادات الموقع
         try:
-            settings = SiteSetting.objects.first()
+            settings = get_site_settings()
             if settings:
                 # استخدام اللغة الافتراضية من الإعدادات
                 if not language or language not in ['ar', 'en']:
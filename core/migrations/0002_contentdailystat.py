@@ -0,0 +1,33 @@
+# Generated by Django 5.2.10 on 2026-10-17 02:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_label', models.CharField(max_length=50, verbose_name='Content Type')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='Object ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Views')),
+                ('unique_ips', models.PositiveIntegerField(default=0, verbose_name='Unique IPs')),
+                ('unique_sessions', models.PositiveIntegerField(default=0, verbose_name='Unique Sessions')),
+                ('referrer_domains', models.JSONField(blank=True, default=dict, verbose_name='Referrer Domains')),
+            ],
+            options={
+                'verbose_name': 'Content Daily Stat',
+                'verbose_name_plural': 'Content Daily Stats',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['content_label', 'date'], name='core_conten_content_a24c42_idx')],
+                'unique_together': {('content_label', 'object_id', 'date')},
+            },
+        ),
+    ]
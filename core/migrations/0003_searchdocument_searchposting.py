@@ -0,0 +1,46 @@
+# Generated by Django 5.2.10 on 2026-10-17 02:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_contentdailystat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_label', models.CharField(max_length=50, verbose_name='Content Type')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='Object ID')),
+                ('title_text', models.TextField(blank=True, verbose_name='Title Terms')),
+                ('body_text', models.TextField(blank=True, verbose_name='Body Terms')),
+                ('length', models.FloatField(default=0, verbose_name='Weighted Length')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Search Document',
+                'verbose_name_plural': 'Search Documents',
+                'unique_together': {('content_label', 'object_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_label', models.CharField(max_length=50, verbose_name='Content Type')),
+                ('term', models.CharField(max_length=64, verbose_name='Term')),
+                ('weight', models.FloatField(verbose_name='Weight')),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='core.searchdocument')),
+            ],
+            options={
+                'verbose_name': 'Search Posting',
+                'verbose_name_plural': 'Search Postings',
+                'indexes': [models.Index(fields=['content_label', 'term'], name='core_search_content_adc53d_idx')],
+            },
+        ),
+    ]
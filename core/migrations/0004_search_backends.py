@@ -0,0 +1,45 @@
+from django.db import migrations
+
+
+def create_native_index(apps, schema_editor):
+    """جدول FTS5 على SQLite أو عمود tsvector مع فهرس GIN على PostgreSQL"""
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS core_search_fts USING fts5("
+                    "content_label UNINDEXED, title, body, tokenize='unicode61 remove_diacritics 2')"
+                )
+            except Exception:
+                # SQLite بدون FTS5: يتم استخدام جداول الفهرس العادية
+                pass
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                "ALTER TABLE core_searchdocument ADD COLUMN IF NOT EXISTS search_vector tsvector"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS core_searchdocument_vector_idx "
+                "ON core_searchdocument USING GIN (search_vector)"
+            )
+
+
+def drop_native_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute("DROP TABLE IF EXISTS core_search_fts")
+        elif connection.vendor == 'postgresql':
+            cursor.execute("DROP INDEX IF EXISTS core_searchdocument_vector_idx")
+            cursor.execute("ALTER TABLE core_searchdocument DROP COLUMN IF EXISTS search_vector")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_searchdocument_searchposting'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_native_index, drop_native_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.10 on 2026-10-17 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_search_backends'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_label', models.CharField(max_length=50, verbose_name='Content Type')),
+                ('status', models.CharField(max_length=20, verbose_name='Status')),
+                ('dimension', models.CharField(blank=True, max_length=64, verbose_name='Dimension')),
+                ('count', models.BigIntegerField(default=0, verbose_name='Count')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Content Count',
+                'verbose_name_plural': 'Content Counts',
+                'unique_together': {('content_label', 'status', 'dimension')},
+            },
+        ),
+    ]
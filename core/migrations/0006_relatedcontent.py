@@ -0,0 +1,28 @@
+# Generated by Django 5.2.10 on 2026-10-17 02:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_contentcount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedContent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_label', models.CharField(max_length=50, verbose_name='Content Type')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='Object ID')),
+                ('neighbours', models.JSONField(blank=True, default=list, verbose_name='Neighbours')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Related Content',
+                'verbose_name_plural': 'Related Content',
+                'unique_together': {('content_label', 'object_id')},
+            },
+        ),
+    ]
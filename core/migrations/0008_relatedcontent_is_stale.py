@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-17 03:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_rollupcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='relatedcontent',
+            name='is_stale',
+            field=models.BooleanField(db_index=True, default=False, verbose_name='Is Stale'),
+        ),
+    ]
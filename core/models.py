@@ -1,6 +1,6 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
-from django.core.cache import cache
+from .counters import record_view
 
 class SiteSetting(models.Model):
     site_name = models.CharField(_('Site Name'), max_length=100)
@@ -23,7 +23,8 @@ class SiteSetting(models.Model):
         self.pk = 1
         super().save(*args, **kwargs)
         # Clear cache when settings are updated
-        cache.delete('site_settings')
+        from .site_settings import site_settings_provider
+        site_settings_provider.invalidate()
 
 class Category(models.Model):
     name = models.CharField(_('Category Name'), max_length=100)
@@ -64,5 +65,111 @@ class BaseContent(models.Model):
         return self.title
     
     def increment_views(self):
+        # تُكتب الزيادة لاحقاً على دفعات، ونحدث النسخة الحالية للعرض فقط
+        record_view(self)
         self.views += 1
-        self.save(update_fields=['views'])
\ No newline at end of file
+
+class ContentDailyStat(models.Model):
+    """ملخص يومي لمشاهدات المحتوى يتم تجميعه من جداول المشاهدات الخام"""
+    content_label = models.CharField(_('Content Type'), max_length=50)
+    object_id = models.PositiveBigIntegerField(_('Object ID'))
+    date = models.DateField(_('Date'))
+    views = models.PositiveIntegerField(_('Views'), default=0)
+    unique_ips = models.PositiveIntegerField(_('Unique IPs'), default=0)
+    unique_sessions = models.PositiveIntegerField(_('Unique Sessions'), default=0)
+    referrer_domains = models.JSONField(_('Referrer Domains'), default=dict, blank=True)
+    
+    class Meta:
+        verbose_name = _('Content Daily Stat')
+        verbose_name_plural = _('Content Daily Stats')
+        ordering = ['-date']
+        unique_together = ['content_label', 'object_id', 'date']
+        indexes = [
+            models.Index(fields=['content_label', 'date']),
+        ]
+    
+    def __str__(self):
+        return f'{self.content_label}#{self.object_id} on {self.date}'
+
+class RollupCheckpoint(models.Model):
+    """آخر يوم تم تجميعه لكل نوع محتوى (حتى الأيام بدون مشاهدات)"""
+    content_label = models.CharField(_('Content Type'), max_length=50, unique=True)
+    rolled_up_until = models.DateField(_('Rolled Up Until'))
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = _('Rollup Checkpoint')
+        verbose_name_plural = _('Rollup Checkpoints')
+    
+    def __str__(self):
+        return f'{self.content_label} until {self.rolled_up_until}'
+
+class SearchDocument(models.Model):
+    """مستند مفهرس للبحث (نسخة مُحللة من كائن محتوى)"""
+    content_label = models.CharField(_('Content Type'), max_length=50)
+    object_id = models.PositiveBigIntegerField(_('Object ID'))
+    # المصطلحات بعد التحليل، تستخدمها واجهات FTS5 و PostgreSQL
+    title_text = models.TextField(_('Title Terms'), blank=True)
+    body_text = models.TextField(_('Body Terms'), blank=True)
+    # الطول الموزون للمستند (لحساب BM25)
+    length = models.FloatField(_('Weighted Length'), default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = _('Search Document')
+        verbose_name_plural = _('Search Documents')
+        unique_together = ['content_label', 'object_id']
+    
+    def __str__(self):
+        return f'{self.content_label}#{self.object_id}'
+
+class SearchPosting(models.Model):
+    """عنصر في قائمة مستندات المصطلح مع وزنه الموزون حسب الحقول"""
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='postings')
+    content_label = models.CharField(_('Content Type'), max_length=50)
+    term = models.CharField(_('Term'), max_length=64)
+    weight = models.FloatField(_('Weight'))
+    
+    class Meta:
+        verbose_name = _('Search Posting')
+        verbose_name_plural = _('Search Postings')
+        indexes = [
+            models.Index(fields=['content_label', 'term']),
+        ]
+    
+    def __str__(self):
+        return f'{self.term} -> {self.document}'
+
+class ContentCount(models.Model):
+    """عداد مخزن لعدد كائنات المحتوى حسب الحالة وبُعد اختياري (تصنيف، وسم...)"""
+    content_label = models.CharField(_('Content Type'), max_length=50)
+    status = models.CharField(_('Status'), max_length=20)
+    # '' للكل، أو مثل 'category:5' و 'tag:3' و 'featured'
+    dimension = models.CharField(_('Dimension'), max_length=64, blank=True)
+    count = models.BigIntegerField(_('Count'), default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = _('Content Count')
+        verbose_name_plural = _('Content Counts')
+        unique_together = ['content_label', 'status', 'dimension']
+    
+    def __str__(self):
+        return f'{self.content_label}[{self.status}:{self.dimension}] = {self.count}'
+
+class RelatedContent(models.Model):
+    """أقرب العناصر المحسوبة مسبقاً لكائن محتوى (معرفات مرتبة من الأقرب)"""
+    content_label = models.CharField(_('Content Type'), max_length=50)
+    object_id = models.PositiveBigIntegerField(_('Object ID'))
+    neighbours = models.JSONField(_('Neighbours'), default=list, blank=True)
+    # حُفظ الكائن بعد حساب جيرانه، فيعيد build_related_content --pending حسابها
+    is_stale = models.BooleanField(_('Is Stale'), default=False, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = _('Related Content')
+        verbose_name_plural = _('Related Content')
+        unique_together = ['content_label', 'object_id']
+    
+    def __str__(self):
+        return f'{self.content_label}#{self.object_id} -> {self.neighbours}'
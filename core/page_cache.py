@@ -0,0 +1,210 @@
+"""
+كاش الصفحات الكاملة للزوار المجهولين
+
+الـ views المعلمة بـ cache_anonymous تُخدم من الكاش للزوار غير المسجلين فقط.
+مفتاح النسخة صريح: المضيف، المسار (مع بادئة اللغة)، الاستعلام بعد التطبيع
+(حذف معاملات التتبع والقيم الفارغة وترتيب المفاتيح)، اللغة، وكوكي الوضع المظلم.
+كل نسخة مخزنة تحمل أجيال المساحات التي تعتمد عليها (من الديكور ومن depends
+داخل الـ view، مثل 'content:articles.article:5')، فزيادة أي جيل من إشارات
+الحفظ والحذف تُبطل الصفحات المرتبطة بالكائن فقط. الإعلانات ورمز CSRF فجوات
+تُملأ لكل زائر عند الخدمة من الكاش، ومشاهدة الكائن تُسجل عبر track.
+"""
+import hashlib
+import logging
+import re
+from urllib.parse import urlencode
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.deprecation import MiddlewareMixin
+
+from advertisements.sampling import visitor_key
+from advertisements.slots import fill_holes, punch_holes
+
+from .cache_versions import get_versions
+
+logger = logging.getLogger(__name__)
+
+POLICY_ATTR = 'page_cache_policy'
+STATE_ATTR = '_page_cache'
+# مساحات تعتمد عليها كل الصفحات: الإعدادات والقوائم في السياق العام
+GLOBAL_NAMESPACES = ('site_settings', 'categories', 'page_list')
+# ترويسات لا تُخزن مع الصفحة (خاصة بالطلب الأول)
+SKIPPED_HEADERS = frozenset({'content-length', 'etag', 'last-modified', 'set-cookie', 'x-page-cache'})
+MAX_QUERY_LENGTH = 512
+# النماذج التي تُبطل صفحاتها المخزنة عند حفظها أو حذفها (depends)
+PAGE_CACHE_MODELS = ('articles.article', 'articles.tag', 'pages.page', 'blog.post', 'books.book')
+
+CSRF_HOLE = '<!--csrf-hole-->'
+_CSRF_INPUT = re.compile(r'(name=["\']csrfmiddlewaretoken["\'] value=["\'])[^"\']*(["\'])')
+
+
+def content_namespace(label, pk):
+    return f'content:{label}:{pk}'
+
+
+def content_type_namespace(label):
+    """مساحة كل كائنات النوع (للصفحات التي تعرض قوائم بديلة منه)"""
+    return f'content:{label}'
+
+
+class PagePolicy:
+    """إعدادات تخزين view: المدة، المساحات (بمعاملات الرابط)، ودالة تسجيل المشاهدة"""
+
+    def __init__(self, timeout=None, namespaces=(), track=None):
+        self.timeout = timeout
+        self.namespaces = namespaces
+        self.track = track
+
+
+def cache_anonymous(timeout=None, namespaces=(), track=None):
+    """
+    تفعيل كاش الصفحة الكاملة للزوار المجهولين
+    namespaces: مثل 'page:{slug}'؛ track: دالة (request، كائن فيه pk فقط)
+    تُستدعى عند الخدمة من الكاش للكائن المسجل بـ depends
+    """
+    def decorator(view_func):
+        setattr(view_func, POLICY_ATTR, PagePolicy(timeout, namespaces, track))
+        return view_func
+    return decorator
+
+
+def depends(request, *items):
+    """
+    تسجيل ما تعتمد عليه الصفحة الحالية: كائنات (تُبطل بحفظها أو حذفها) أو أسماء مساحات
+    أول كائن هو الذي تُسجل مشاهدته عند الخدمة من الكاش
+    """
+    state = getattr(request, STATE_ATTR, None)
+    if state is None:
+        return
+    namespaces = []
+    for item in items:
+        if isinstance(item, str):
+            namespaces.append(item)
+            continue
+        label = item._meta.label_lower
+        namespaces.append(content_namespace(label, item.pk))
+        if state['object'] is None:
+            state['object'] = (label, item.pk)
+    # الأجيال وقت الاعتماد، فتغيير أثناء العرض يجعل النسخة قديمة من البداية
+    state['versions'].update(get_versions(*namespaces))
+
+
+def normalized_query(request):
+    """الاستعلام بدون معاملات التتبع والقيم الفارغة، بترتيب ثابت"""
+    ignored = getattr(settings, 'PAGE_CACHE_IGNORED_PARAMS', ('fbclid', 'gclid'))
+    pairs = sorted(
+        (key, value)
+        for key, values in request.GET.lists()
+        for value in values
+        if value and key not in ignored and not key.startswith('utm_')
+    )
+    return urlencode(pairs)
+
+
+def variant_key(request):
+    """مفتاح نسخة الصفحة، أو None إذا كان الاستعلام غير قابل للتخزين"""
+    query = normalized_query(request)
+    if len(query) > MAX_QUERY_LENGTH:
+        return None
+    variant = '|'.join([
+        request.get_host(),
+        request.path,
+        query,
+        getattr(request, 'LANGUAGE_CODE', settings.LANGUAGE_CODE),
+        'dark' if request.COOKIES.get('dark_mode') == 'true' else 'light',
+    ])
+    return 'page_cache:' + hashlib.md5(variant.encode('utf-8')).hexdigest()
+
+
+def cacheable_request(request):
+    if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+        return False
+    # رسائل معلقة، أو طلب شرطي تجيبه طبقة ETag بـ 304
+    if request.COOKIES.get(getattr(settings, 'MESSAGE_COOKIE_NAME', 'messages')):
+        return False
+    return 'If-None-Match' not in request.headers
+
+
+def storable_response(request, response):
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return False
+    if not response.get('Content-Type', '').startswith('text/html'):
+        return False
+    cache_control = response.get('Cache-Control', '')
+    if 'private' in cache_control or 'no-store' in cache_control or 'no-cache' in cache_control:
+        return False
+    session = getattr(request, 'session', None)
+    return not (session is not None and session.modified)
+
+
+class AnonymousPageCacheMiddleware(MiddlewareMixin):
+    """خدمة الـ views المعلمة بـ cache_anonymous من الكاش للزوار المجهولين"""
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        policy = getattr(view_func, POLICY_ATTR, None)
+        if policy is None or not getattr(settings, 'PAGE_CACHE_ENABLED', True):
+            return None
+        if not cacheable_request(request):
+            return None
+        key = variant_key(request)
+        if key is None:
+            return None
+
+        namespaces = [*GLOBAL_NAMESPACES, *(namespace.format(**view_kwargs) for namespace in policy.namespaces)]
+        state = {'key': key, 'policy': policy, 'versions': get_versions(*namespaces), 'object': None}
+        setattr(request, STATE_ATTR, state)
+
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        current = get_versions(*entry['versions'])
+        if current != entry['versions']:
+            return None
+
+        state['hit'] = True
+        if policy.track is not None and entry['object']:
+            label, pk = entry['object']
+            try:
+                policy.track(request, apps.get_model(label)(pk=pk))
+            except Exception:
+                logger.exception(f'Failed to record cached view for {label}#{pk}')
+        return self.from_entry(request, entry)
+
+    def from_entry(self, request, entry):
+        content = fill_holes(entry['content'], visitor=visitor_key(request))
+        if CSRF_HOLE in content:
+            content = content.replace(CSRF_HOLE, get_token(request))
+        response = HttpResponse(content, status=entry['status'])
+        for header, value in entry['headers']:
+            response[header] = value
+        response['X-Page-Cache'] = 'hit'
+        return response
+
+    def process_response(self, request, response):
+        state = getattr(request, STATE_ATTR, None)
+        if state is None or state.get('hit'):
+            return response
+        if not storable_response(request, response):
+            return response
+
+        charset = response.charset or 'utf-8'
+        content = punch_holes(response.content.decode(charset))
+        content = _CSRF_INPUT.sub(lambda match: f'{match.group(1)}{CSRF_HOLE}{match.group(2)}', content)
+        entry = {
+            'status': response.status_code,
+            'headers': [
+                (header, value) for header, value in response.items()
+                if header.lower() not in SKIPPED_HEADERS
+            ],
+            'content': content,
+            'versions': state['versions'],
+            'object': state['object'],
+        }
+        timeout = state['policy'].timeout or getattr(settings, 'PAGE_CACHE_TIMEOUT', 600)
+        cache.set(state['key'], entry, timeout)
+        response['X-Page-Cache'] = 'miss'
+        return response
@@ -0,0 +1,232 @@
+"""
+ترقيم الصفحات بالمؤشر (keyset pagination)
+
+بدلاً من OFFSET و COUNT(*) الكاملة، تُطلب الصفحة التالية بشرط "بعد آخر صف"
+على أعمدة الترتيب نفسها (مثل -is_pinned, -published_at) مع المعرف كفاصل
+نهائي، فتكلف الصفحة 500 نفس تكلفة الصفحة الأولى. المؤشر نص مبهم (JSON بترميز
+base64) يحمل قيم آخر صف واتجاه التنقل. القيم الفارغة (NULL) تأتي دائماً في
+آخر الترتيب. العدد الكلي اختياري: عدد محسوب مسبقاً أو عدد مخزن في الكاش.
+"""
+import base64
+import binascii
+import json
+from functools import reduce
+
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+
+CURSOR_PARAM = 'cursor'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage:
+    """صفحة نتائج متوافقة مع أهم واجهات Page في Django"""
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    ترقيم QuerySet بالمؤشر على ترتيبه الحالي (أو ordering)
+    يدعم أسماء الحقول والتعليقات (annotations) مع '-' للترتيب التنازلي
+    count: عدد كلي جاهز أو دالة تعيده؛ count_key: مفتاح كاش لعدد دقيق مخزن
+    """
+
+    def __init__(self, queryset, per_page, ordering=None, count=None,
+                 count_key=None, count_timeout=300):
+        self.per_page = int(per_page)
+        self._count = count
+        self.count_key = count_key
+        self.count_timeout = count_timeout
+
+        ordering = list(ordering or queryset.query.order_by or queryset.model._meta.ordering)
+        names = [name.lstrip('-') for name in ordering]
+        if 'pk' not in names and 'id' not in names:
+            # المعرف يجعل الترتيب كاملاً، باتجاه آخر عمود
+            ordering.append('-pk' if ordering and ordering[-1].startswith('-') else 'pk')
+
+        self.keys = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        self.queryset = queryset
+        self.model = queryset.model
+
+    def _nullable(self, name):
+        if name in self.queryset.query.annotations:
+            return True
+        if name == 'pk':
+            return False
+        try:
+            return self.model._meta.get_field(name).null
+        except FieldDoesNotExist:
+            return True
+
+    def _field(self, name):
+        if name == 'pk':
+            return self.model._meta.pk
+        try:
+            return self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+
+    def _order_by(self, backwards):
+        expressions = []
+        for name, desc in self.keys:
+            descending = desc != backwards
+            # القيم الفارغة في النهاية للأمام، وفي البداية عند الرجوع للخلف
+            expression = F(name).desc if descending else F(name).asc
+            if not self._nullable(name):
+                expressions.append(expression())
+            elif backwards:
+                expressions.append(expression(nulls_first=True))
+            else:
+                expressions.append(expression(nulls_last=True))
+        return expressions
+
+    def _beyond(self, name, desc, value, backwards):
+        """شرط الصفوف الواقعة بعد القيمة value على عمود واحد في اتجاه التنقل"""
+        nullable = self._nullable(name)
+        if value is None:
+            # الفارغ آخر الترتيب: لا شيء بعده للأمام، وكل غير الفارغ قبله
+            return Q(**{f'{name}__isnull': False}) if backwards else None
+        lookup = 'lt' if desc != backwards else 'gt'
+        condition = Q(**{f'{name}__{lookup}': value})
+        if nullable and not backwards:
+            condition |= Q(**{f'{name}__isnull': True})
+        return condition
+
+    def _tie(self, name, value):
+        if value is None:
+            return Q(**{f'{name}__isnull': True})
+        return Q(**{name: value})
+
+    def _filter(self, values, backwards):
+        conditions = []
+        ties = []
+        for (name, desc), value in zip(self.keys, values):
+            beyond = self._beyond(name, desc, value, backwards)
+            if beyond is not None:
+                conditions.append(reduce(lambda a, b: a & b, ties, beyond))
+            ties.append(self._tie(name, value))
+        if not conditions:
+            return Q(pk__in=[])
+        return reduce(lambda a, b: a | b, conditions)
+
+    def _values(self, obj):
+        values = []
+        for name, _ in self.keys:
+            if isinstance(obj, dict):
+                values.append(obj[self.model._meta.pk.attname if name == 'pk' else name])
+            else:
+                values.append(getattr(obj, name))
+        return values
+
+    def encode_cursor(self, obj, backwards=False):
+        values = []
+        for value in self._values(obj):
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            elif not isinstance(value, (int, float, str, bool, type(None))):
+                value = str(value)
+            values.append(value)
+        raw = json.dumps({'v': values, 'b': int(backwards)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            values = data['v']
+            if len(values) != len(self.keys):
+                raise InvalidCursor(cursor)
+            decoded = []
+            for (name, _), value in zip(self.keys, values):
+                field = self._field(name)
+                decoded.append(field.to_python(value) if field is not None and value is not None else value)
+            return decoded, bool(data.get('b'))
+        except (ValueError, KeyError, TypeError, binascii.Error, ValidationError):
+            raise InvalidCursor(cursor)
+
+    def page(self, cursor=None):
+        """الصفحة بعد المؤشر (أو الأولى إذا كان المؤشر فارغاً أو غير صالح)"""
+        values, backwards = None, False
+        if cursor:
+            try:
+                values, backwards = self.decode_cursor(cursor)
+            except InvalidCursor:
+                values = None
+
+        queryset = self.queryset.order_by(*self._order_by(backwards))
+        if values is not None:
+            queryset = queryset.filter(self._filter(values, backwards))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or backwards:
+                next_cursor = self.encode_cursor(rows[-1])
+            if values is not None and (has_more or not backwards):
+                previous_cursor = self.encode_cursor(rows[0], backwards=True)
+        return KeysetPage(rows, self, next_cursor, previous_cursor)
+
+    @cached_property
+    def count(self):
+        """العدد الكلي إن طُلب: قيمة جاهزة، أو عدد دقيق مخزن في الكاش، أو None"""
+        if callable(self._count):
+            return self._count()
+        if self._count is not None:
+            return self._count
+        if self.count_key is None:
+            return None
+        count = cache.get(self.count_key)
+        if count is None:
+            count = self.queryset.order_by().count()
+            cache.set(self.count_key, count, self.count_timeout)
+        return count
+
+
+def paginate(request, queryset, per_page, ordering=None, **kwargs):
+    """صفحة الطلب الحالي حسب معامل cursor"""
+    paginator = KeysetPaginator(queryset, per_page, ordering=ordering, **kwargs)
+    return paginator.page(request.GET.get(CURSOR_PARAM))
+
+
+class KeysetPaginationMixin:
+    """ترقيم بالمؤشر لـ ListView بدلاً من Paginator (نفس paginate_by)"""
+
+    def paginate_queryset(self, queryset, page_size):
+        page = paginate(self.request, queryset, page_size)
+        return page.paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,358 @@
+"""
+المحتوى ذو الصلة
+
+لكل عنصر منشور تُحسب أقرب RELATED_CONTENT_TOP_K عناصر من نفس النوع مسبقاً
+وتُخزن معرفاتها في RelatedContent، فتجلب صفحة التفاصيل العناصر المرتبطة
+باستعلام id__in واحد. نتيجة كل جار مجموع أوزان عدة إشارات:
+- الاختيار اليدوي (مثل related_articles)
+- المجموعات المشتركة (الوسوم، التصنيف، المؤلف...) بتطبيع جيب التمام
+- المشاهدة في نفس الجلسة خلال آخر RELATED_CONTENT_COVIEW_DAYS يوماً
+- تشابه TF-IDF للعنوان والمقتطف (بتحليل core.search.text)
+أمر build_related_content يعيد الحساب لكل العناصر. حفظ عنصر لا يحمل النوع
+كاملاً في الطلب: يُعلَّم صفه كقديم (وتبقى جيرانه الحالية معروضة)، والعناصر
+الجديدة تعرض البديل حتى يعيد build_related_content --pending حساب كل العناصر
+المعلقة دفعة واحدة.
+"""
+import heapq
+import logging
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .cache_versions import bump, make_key
+from .search.text import analyze
+
+logger = logging.getLogger(__name__)
+
+# الجلسات التي شاهدت عناصر أكثر من هذا لا تُعد دليلاً على الصلة (زواحف، تصفح عشوائي)
+MAX_SESSION_ITEMS = 50
+# قيمة الكاش للعناصر التي لم تُحسب بعد
+MISSING = 'missing'
+
+
+class RelatedSource:
+    """
+    تعريف نوع محتوى للمحتوى ذي الصلة
+    groups: (مسار الحقل، الوزن) لمجموعات مشتركة مثل 'tags' و 'category'
+    coviews: (نموذج المشاهدات، حقل العنصر، حقل الجلسة، الوزن)
+    picks: (حقل ManyToMany للاختيار اليدوي، الوزن)
+    """
+
+    def __init__(self, label, filters=None, text_fields=('title', 'excerpt'), text_weight=1.0,
+                 groups=(), coviews=None, picks=None, select_related=()):
+        self.label = label
+        self.filters = filters or {}
+        self.text_fields = text_fields
+        self.text_weight = text_weight
+        self.groups = groups
+        self.coviews = coviews
+        self.picks = picks
+        self.select_related = select_related
+
+    @property
+    def model(self):
+        return apps.get_model(self.label)
+
+    def get_queryset(self):
+        queryset = self.model.objects.filter(**self.filters)
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        return queryset
+
+    def should_index(self, instance):
+        return all(getattr(instance, name) == value for name, value in self.filters.items())
+
+
+RELATED_SOURCES = {
+    'articles.article': RelatedSource(
+        'articles.article',
+        filters={'status': 'published'},
+        groups=[('tags', 1.0), ('category', 0.5)],
+        coviews=('articles.articleview', 'article', 'session_key', 1.0),
+        picks=('related_articles', 10.0),
+        select_related=('author', 'category'),
+    ),
+    'books.book': RelatedSource(
+        'books.book',
+        filters={'status': 'published'},
+        groups=[('categories', 1.0), ('author', 1.0), ('book_type', 0.2)],
+    ),
+    'blog.post': RelatedSource(
+        'blog.post',
+        filters={'status': 'published'},
+        groups=[('category', 1.0)],
+        select_related=('author', 'category'),
+    ),
+    'pages.page': RelatedSource(
+        'pages.page',
+        filters={'status': 'published'},
+        groups=[('parent', 1.0)],
+        coviews=('pages.pageview', 'page', 'ip_address', 0.5),
+    ),
+}
+
+
+def namespace(label):
+    return f'related:{label}'
+
+
+class Corpus:
+    """ميزات كل العناصر المنشورة لنوع واحد في الذاكرة"""
+
+    def __init__(self, source, max_group=500, coview_days=90):
+        self.source = source
+        self.max_group = max_group
+        self.coview_days = coview_days
+        self.ids = []
+        # pk -> {المصطلح: الوزن} بعد التطبيع، والمصطلح -> [(pk، الوزن)]
+        self.vectors = {}
+        self.postings = defaultdict(list)
+        # لكل مجموعة: (الوزن، pk -> مفاتيحه، المفتاح -> أعضاؤه)
+        self.groups = []
+        self.coviews = defaultdict(Counter)
+        self.sessions = Counter()
+        self.picks = defaultdict(list)
+        self._load()
+
+    def _load(self):
+        source = self.source
+        queryset = source.get_queryset().select_related(None).order_by()
+        self.ids = list(queryset.values_list('pk', flat=True))
+        known = set(self.ids)
+        self._load_text(queryset)
+        for path, weight in source.groups:
+            by_item = defaultdict(set)
+            members = defaultdict(list)
+            for pk, key in queryset.values_list('pk', path).distinct():
+                if key is None or key == '':
+                    continue
+                by_item[pk].add(key)
+                members[key].append(pk)
+            self.groups.append((weight, by_item, members))
+        if source.coviews:
+            self._load_coviews(known)
+        if source.picks:
+            field, _ = source.picks
+            for pk, pick in queryset.values_list('pk', field):
+                if pick in known:
+                    self.picks[pk].append(pick)
+
+    def _load_text(self, queryset):
+        documents = {}
+        frequencies = Counter()
+        for pk, *texts in queryset.values_list('pk', *self.source.text_fields).iterator(chunk_size=2000):
+            terms = Counter(analyze(strip_tags(' '.join(text or '' for text in texts))))
+            documents[pk] = terms
+            frequencies.update(terms.keys())
+
+        total = len(documents)
+        for pk, terms in documents.items():
+            vector = {}
+            for term, tf in terms.items():
+                df = frequencies[term]
+                # المصطلحات الشائعة جداً لا تميز بين العناصر وتجعل القوائم طويلة
+                if df < 2 or df > self.max_group:
+                    continue
+                vector[term] = (1 + math.log(tf)) * (math.log((1 + total) / (1 + df)) + 1)
+            norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+            if not norm:
+                continue
+            vector = {term: weight / norm for term, weight in vector.items()}
+            self.vectors[pk] = vector
+            for term, weight in vector.items():
+                self.postings[term].append((pk, weight))
+
+    def _load_coviews(self, known):
+        model_label, item_field, session_field, _ = self.source.coviews
+        since = timezone.now() - timedelta(days=self.coview_days)
+        rows = apps.get_model(model_label).objects.filter(created_at__gte=since).values_list(
+            session_field, f'{item_field}_id'
+        ).distinct().order_by()
+        sessions = defaultdict(set)
+        for session, pk in rows.iterator(chunk_size=5000):
+            if session and pk in known:
+                sessions[session].add(pk)
+        for items in sessions.values():
+            if len(items) > MAX_SESSION_ITEMS:
+                continue
+            for pk in items:
+                self.sessions[pk] += 1
+                if len(items) > 1:
+                    for other in items:
+                        if other != pk:
+                            self.coviews[pk][other] += 1
+
+    def scores(self, pk):
+        """نتيجة الصلة بين العنصر وكل مرشح"""
+        scores = Counter()
+        source = self.source
+        if source.picks:
+            for other in self.picks.get(pk, ()):
+                scores[other] += source.picks[1]
+
+        for term, weight in self.vectors.get(pk, {}).items():
+            for other, other_weight in self.postings[term]:
+                scores[other] += source.text_weight * weight * other_weight
+
+        if source.coviews:
+            coview_weight = source.coviews[3]
+            for other, together in self.coviews.get(pk, {}).items():
+                scores[other] += coview_weight * together / math.sqrt(self.sessions[pk] * self.sessions[other])
+
+        hubs = []
+        for weight, by_item, members in self.groups:
+            keys = by_item.get(pk)
+            if not keys:
+                continue
+            shared = Counter()
+            for key in keys:
+                if len(members[key]) > self.max_group:
+                    hubs.append((weight, by_item, key))
+                    continue
+                for other in members[key]:
+                    shared[other] += 1
+            for other, count in shared.items():
+                scores[other] += weight * count / math.sqrt(len(keys) * len(by_item[other]))
+
+        # المجموعات الكبيرة جداً (تصنيف عام) ترفع نتيجة المرشحين الموجودين فقط
+        for weight, by_item, key in hubs:
+            keys = by_item[pk]
+            for other in list(scores):
+                other_keys = by_item.get(other, ())
+                if key in other_keys:
+                    scores[other] += weight / math.sqrt(len(keys) * len(other_keys))
+
+        scores.pop(pk, None)
+        return scores
+
+    def neighbours(self, pk, top_k):
+        """أقرب top_k عناصر (الأحدث أولاً عند التساوي)"""
+        scores = self.scores(pk)
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: (item[1], item[0]))
+        return [other for other, score in best if score > 0]
+
+
+class RelatedContentEngine:
+    """حساب الجيران وتخزينهم وقراءتهم لصفحات التفاصيل"""
+
+    def _setting(self, name, default):
+        return getattr(settings, f'RELATED_CONTENT_{name}', default)
+
+    def corpus(self, label):
+        return Corpus(
+            RELATED_SOURCES[label],
+            max_group=self._setting('MAX_GROUP', 500),
+            coview_days=self._setting('COVIEW_DAYS', 90),
+        )
+
+    def rebuild(self, label):
+        """إعادة حساب جيران كل العناصر المنشورة للنوع، وتعيد عددها"""
+        from .models import RelatedContent
+        corpus = self.corpus(label)
+        top_k = self._setting('TOP_K', 10)
+        rows = [
+            RelatedContent(content_label=label, object_id=pk, neighbours=corpus.neighbours(pk, top_k))
+            for pk in corpus.ids
+        ]
+        with transaction.atomic():
+            RelatedContent.objects.filter(content_label=label).delete()
+            RelatedContent.objects.bulk_create(rows, batch_size=1000)
+        bump(namespace(label))
+        return len(rows)
+
+    def update(self, instance):
+        """تعليم جيران عنصر لإعادة الحساب (أو حذفها إذا لم يعد منشوراً)"""
+        from .models import RelatedContent
+        label = instance._meta.label_lower
+        source = RELATED_SOURCES.get(label)
+        if source is None:
+            return
+        if not source.should_index(instance):
+            self.remove(instance)
+            return
+        # العنصر الجديد بلا صف يظهر في pending تلقائياً
+        RelatedContent.objects.filter(content_label=label, object_id=instance.pk).update(
+            is_stale=True, updated_at=timezone.now()
+        )
+
+    def pending(self, label):
+        """معرفات العناصر المنشورة التي تحتاج حساب جيرانها: القديمة والتي لم تُحسب بعد"""
+        from .models import RelatedContent
+        rows = RelatedContent.objects.filter(content_label=label)
+        stale = set(rows.filter(is_stale=True).values_list('object_id', flat=True))
+        missing = RELATED_SOURCES[label].get_queryset().exclude(
+            pk__in=rows.values('object_id')
+        ).values_list('pk', flat=True)
+        return stale | set(missing)
+
+    def refresh_pending(self, label):
+        """حساب جيران العناصر المعلقة بتحميل واحد للنوع، وتعيد عددها"""
+        from .models import RelatedContent
+        started = timezone.now()
+        pending = self.pending(label)
+        if not pending:
+            return 0
+        corpus = self.corpus(label)
+        known = set(corpus.ids)
+        top_k = self._setting('TOP_K', 10)
+        with transaction.atomic():
+            for pk in pending:
+                if pk not in known:
+                    RelatedContent.objects.filter(content_label=label, object_id=pk).delete()
+                    continue
+                neighbours = corpus.neighbours(pk, top_k)
+                # صف عُلِّم مجدداً أثناء الحساب يبقى معلقاً للدفعة التالية
+                updated = RelatedContent.objects.filter(
+                    content_label=label, object_id=pk, updated_at__lte=started
+                ).update(neighbours=neighbours, is_stale=False, updated_at=timezone.now())
+                if not updated:
+                    RelatedContent.objects.get_or_create(
+                        content_label=label, object_id=pk, defaults={'neighbours': neighbours}
+                    )
+        bump(namespace(label))
+        return len(pending)
+
+    def remove(self, instance):
+        from .models import RelatedContent
+        label = instance._meta.label_lower
+        RelatedContent.objects.filter(content_label=label, object_id=instance.pk).delete()
+        cache.delete(self._key(label, instance.pk))
+
+    def _key(self, label, pk):
+        return make_key(namespace(label), 'ids', pk)
+
+    def neighbour_ids(self, instance):
+        """معرفات الجيران المخزنة، أو None إذا لم تُحسب بعد"""
+        from .models import RelatedContent
+        label = instance._meta.label_lower
+        key = self._key(label, instance.pk)
+        ids = cache.get(key)
+        if ids is None:
+            ids = RelatedContent.objects.filter(content_label=label, object_id=instance.pk).values_list(
+                'neighbours', flat=True
+            ).first()
+            cache.set(key, MISSING if ids is None else ids, self._setting('CACHE_TIMEOUT', 3600))
+        return None if ids == MISSING else ids
+
+    def related(self, instance, limit, fallback=None):
+        """
+        العناصر المرتبطة المنشورة بترتيب الصلة (استعلام id__in واحد)
+        fallback: QuerySet يُستخدم للعناصر التي لم تُحسب جيرانها بعد
+        """
+        ids = self.neighbour_ids(instance)
+        if ids is None:
+            return list(fallback[:limit]) if fallback is not None else []
+        if not ids:
+            return []
+        found = RELATED_SOURCES[instance._meta.label_lower].get_queryset().in_bulk(ids)
+        return [found[pk] for pk in ids if pk in found][:limit]
+
+
+related_content = RelatedContentEngine()
@@ -0,0 +1,175 @@
+"""
+تجميع جداول المشاهدات الخام (ArticleView / PageView) في ملخصات يومية
+
+التجميع تزايدي: يبدأ من آخر يوم تم تجميعه (ويعيد حسابه لأنه قد يكون
+جزئياً)، وكل يوم يُستبدل بالكامل داخل معاملة واحدة لذا التشغيل المتكرر آمن.
+آخر يوم مُجمّع يُحفظ في RollupCheckpoint، فالأيام بدون مشاهدات لا يُعاد مسحها.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from urllib.parse import urlparse
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+from .models import ContentDailyStat, RollupCheckpoint
+
+logger = logging.getLogger(__name__)
+
+# content_label -> (نموذج المشاهدات، حقل المحتوى، حقل الجلسة، حقل المصدر)
+ROLLUP_SOURCES = {
+    'articles.article': ('articles.ArticleView', 'article_id', 'session_key', None),
+    'pages.page': ('pages.PageView', 'page_id', None, 'referrer'),
+}
+
+MAX_REFERRER_DOMAINS = 20
+
+
+def _day_bounds(day):
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(day, time.min), tz)
+    return start, start + timedelta(days=1)
+
+
+def _referrer_domain(referrer):
+    if not referrer:
+        return ''
+    return urlparse(referrer).netloc.lower()
+
+
+def rollup_day(content_label, day):
+    """إعادة حساب ملخص يوم واحد لنوع محتوى واحد، ويعيد عدد الصفوف"""
+    model_label, content_field, session_field, referrer_field = ROLLUP_SOURCES[content_label]
+    model = apps.get_model(model_label)
+    start, end = _day_bounds(day)
+    raw = model.objects.filter(created_at__gte=start, created_at__lt=end)
+
+    aggregates = {
+        'views': Count('id'),
+        'unique_ips': Count('ip_address', distinct=True),
+    }
+    if session_field:
+        aggregates['unique_sessions'] = Count(session_field, distinct=True)
+
+    rows = {
+        row[content_field]: row
+        for row in raw.values(content_field).annotate(**aggregates).order_by()
+    }
+
+    referrers = defaultdict(lambda: defaultdict(int))
+    if referrer_field:
+        for row in raw.exclude(**{referrer_field: ''}).values(
+            content_field, referrer_field
+        ).annotate(hits=Count('id')).order_by():
+            domain = _referrer_domain(row[referrer_field])
+            if domain:
+                referrers[row[content_field]][domain] += row['hits']
+
+    stats = []
+    for object_id, row in rows.items():
+        domains = sorted(referrers[object_id].items(), key=lambda item: item[1], reverse=True)
+        stats.append(ContentDailyStat(
+            content_label=content_label,
+            object_id=object_id,
+            date=day,
+            views=row['views'],
+            unique_ips=row['unique_ips'],
+            unique_sessions=row.get('unique_sessions', 0),
+            referrer_domains=dict(domains[:MAX_REFERRER_DOMAINS]),
+        ))
+
+    with transaction.atomic():
+        ContentDailyStat.objects.filter(content_label=content_label, date=day).delete()
+        ContentDailyStat.objects.bulk_create(stats, batch_size=500)
+
+    return len(stats)
+
+
+def rolled_up_until(content_label):
+    """آخر يوم تم تجميعه لنوع المحتوى"""
+    checkpoint = RollupCheckpoint.objects.filter(
+        content_label=content_label
+    ).values_list('rolled_up_until', flat=True).first()
+    if checkpoint is not None:
+        return checkpoint
+    # قبل حفظ أول نقطة: آخر يوم فيه ملخصات
+    return ContentDailyStat.objects.filter(
+        content_label=content_label
+    ).aggregate(Max('date'))['date__max']
+
+
+def rollup(content_label, since=None):
+    """تجميع كل الأيام من آخر يوم مُجمّع حتى اليوم، ويعيد (عدد الأيام، عدد الصفوف)"""
+    model_label = ROLLUP_SOURCES[content_label][0]
+    model = apps.get_model(model_label)
+    today = timezone.localdate()
+
+    start_day = since or rolled_up_until(content_label)
+    if start_day is None:
+        first = model.objects.aggregate(Min('created_at'))['created_at__min']
+        if first is None:
+            return 0, 0
+        start_day = timezone.localdate(first)
+
+    days = rows = 0
+    day = start_day
+    while day <= today:
+        rows += rollup_day(content_label, day)
+        days += 1
+        day += timedelta(days=1)
+
+    # اليوم الحالي جزئي، فالتشغيل التالي يبدأ منه
+    RollupCheckpoint.objects.update_or_create(
+        content_label=content_label, defaults={'rolled_up_until': today}
+    )
+
+    logger.info(f'Rolled up {days} days ({rows} rows) for {content_label}')
+    return days, rows
+
+
+def prune_raw_views(content_label, retain_days):
+    """
+    حذف صفوف المشاهدات الخام الأقدم من retain_days يوماً
+    بشرط أن تكون أيامها قد جُمّعت بالفعل
+    """
+    last_day = rolled_up_until(content_label)
+    if last_day is None:
+        return 0
+
+    # آخر يوم مُجمّع قد يكون جزئياً، لذا لا نحذف إلا ما قبله
+    cutoff_day = min(last_day, timezone.localdate() - timedelta(days=retain_days))
+    cutoff, _ = _day_bounds(cutoff_day)
+
+    model = apps.get_model(ROLLUP_SOURCES[content_label][0])
+    deleted, _ = model.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+def daily_totals(content_label, days=30, object_id=None):
+    """إجمالي المشاهدات اليومية من جدول الملخصات (بدون مسح الجداول الخام)"""
+    since = timezone.localdate() - timedelta(days=days - 1)
+    stats = ContentDailyStat.objects.filter(content_label=content_label, date__gte=since)
+    if object_id is not None:
+        stats = stats.filter(object_id=object_id)
+    return list(
+        stats.values('date').annotate(
+            views=Sum('views'),
+            unique_ips=Sum('unique_ips'),
+            unique_sessions=Sum('unique_sessions'),
+        ).order_by('date')
+    )
+
+
+def top_referrer_domains(content_label, days=30, limit=10):
+    """أكثر النطاقات إحالة خلال الفترة"""
+    since = timezone.localdate() - timedelta(days=days - 1)
+    totals = defaultdict(int)
+    for domains in ContentDailyStat.objects.filter(
+        content_label=content_label, date__gte=since
+    ).exclude(referrer_domains={}).values_list('referrer_domains', flat=True):
+        for domain, hits in domains.items():
+            totals[domain] += hits
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
@@ -0,0 +1,11 @@
+"""
+البحث النصي في المحتوى
+
+فهرس مقلوب (مصطلح ← المستندات مع وزن الحقول) يُحدث تدريجياً عند حفظ المحتوى
+أو حذفه، مع ترتيب BM25 وواجهات اختيارية لـ SQLite FTS5 و PostgreSQL tsvector.
+"""
+from .engine import search_engine, SearchResult
+from .federated import federated_search, SEARCH_TYPES
+from .autocomplete import autocomplete_index
+
+__all__ = ['search_engine', 'SearchResult', 'federated_search', 'SEARCH_TYPES', 'autocomplete_index']
@@ -0,0 +1,384 @@
+"""
+اقتراحات البحث أثناء الكتابة
+
+شجرة بادئات (trie) داخل ذاكرة العملية فوق عناوين المقالات والكتب والصفحات،
+أسماء الوسوم والتصنيفات، ومؤلفي الكتب. كل عقدة تحفظ أفضل AUTOCOMPLETE_TOP_K
+اقتراحات في فرعها، فالبحث عن بادئة هو مرور على حروفها فقط. كل اقتراح يُفهرس
+من بداية كل كلمة فيه، وتُفهرس كل النسخ اللغوية للحقل (مثل name_ar و name_en
+من modeltranslation). الذاكرة محدودة بعدد الاقتراحات وعمق البادئة.
+
+إشارات الحفظ والحذف تحدث شجرة العملية الحالية مباشرة، تزيد رقم الإصدار
+المشترك في الكاش وتسجل الكائن المتغير تحت رقم الإصدار الجديد. بقية العمليات
+تعيد تطبيق التغييرات المسجلة كائناً كائناً عند فحص الإصدار، ولا تعيد بناء
+الشجرة كاملة إلا إذا فُقد جزء من السجل أو تجاوز AUTOCOMPLETE_MAX_REPLAY.
+"""
+import logging
+import math
+import re
+import threading
+import time
+from urllib.parse import urlencode
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import NoReverseMatch, reverse
+from django.utils import translation
+
+from .text import normalize
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'autocomplete:version'
+CHANGE_KEY = 'autocomplete:change:{}'
+
+_SEPARATORS = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def normalize_prefix(text):
+    """توحيد النص للمقارنة بالبادئة (بدون حذف كلمات التوقف أو تجذيع)"""
+    return _SEPARATORS.sub(' ', normalize(text)).strip()
+
+
+class Suggestion:
+    """اقتراح واحد: النص المعروض ونوعه وروابطه لكل لغة"""
+
+    __slots__ = ('key', 'text', 'kind', 'urls', 'score', 'owners')
+
+    def __init__(self, text, kind, urls, score):
+        self.key = normalize_prefix(text)
+        self.text = text
+        self.kind = kind
+        self.urls = urls
+        self.score = score
+        # الكائنات التي تنتج هذا الاقتراح (مثل عدة كتب لنفس المؤلف)
+        self.owners = set()
+
+    def as_dict(self, language):
+        return {
+            'text': self.text,
+            'type': self.kind,
+            'url': self.urls.get(language) or next(iter(self.urls.values()), None),
+        }
+
+
+class _Node:
+    __slots__ = ('children', 'top', 'entries')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []
+        # اقتراحات ينتهي مفتاحها (أو يُقطع) عند هذه العقدة
+        self.entries = []
+
+
+class PrefixTrie:
+    """شجرة بادئات تحفظ أفضل top_k اقتراحات لكل عقدة"""
+
+    def __init__(self, top_k=10, max_depth=24):
+        self.top_k = top_k
+        self.max_depth = max_depth
+        self.root = _Node()
+        self.size = 0
+
+    def _keys(self, suggestion):
+        # الاقتراح يطابق البادئة من بداية أي كلمة فيه، ومن بعد "ال" التعريف
+        words = suggestion.key.split(' ')
+        keys = set()
+        for i, word in enumerate(words):
+            rest = ' '.join(words[i:])
+            keys.add(rest[:self.max_depth])
+            if word.startswith('ال') and len(word) > 4:
+                keys.add(rest[2:self.max_depth + 2])
+        return [key for key in keys if key]
+
+    def _rank(self, items):
+        return sorted(items, key=lambda s: (-s.score, s.key))[:self.top_k]
+
+    def insert(self, suggestion):
+        for key in self._keys(suggestion):
+            node = self.root
+            path = [node]
+            for char in key:
+                node = node.children.setdefault(char, _Node())
+                path.append(node)
+            node.entries.append(suggestion)
+            for visited in path:
+                if suggestion not in visited.top:
+                    visited.top = self._rank(visited.top + [suggestion])
+        self.size += 1
+
+    def remove(self, suggestion):
+        for key in self._keys(suggestion):
+            path = [(None, self.root)]
+            node = self.root
+            for char in key:
+                node = node.children.get(char)
+                if node is None:
+                    break
+                path.append((char, node))
+            else:
+                node.entries = [s for s in node.entries if s is not suggestion]
+                # إعادة حساب أفضل الاقتراحات من الأسفل للأعلى: الفرع + ما ينتهي هنا
+                for depth in range(len(path) - 1, -1, -1):
+                    char, current = path[depth]
+                    if suggestion in current.top:
+                        candidates = list(current.entries)
+                        for child in current.children.values():
+                            candidates.extend(child.top)
+                        current.top = self._rank(set(candidates))
+                    if depth and not current.top and not current.children:
+                        del path[depth - 1][1].children[char]
+        self.size -= 1
+
+    def lookup(self, prefix, limit):
+        node = self.root
+        for char in prefix[:self.max_depth]:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        if len(prefix) <= self.max_depth:
+            return node.top[:limit]
+        # البادئة أطول من عمق الشجرة: تصفية أفضل اقتراحات آخر عقدة
+        return [s for s in node.top if prefix in s.key][:limit]
+
+
+class AutocompleteSource:
+    """مصدر اقتراحات: نموذج، فلاتر، والحقول التي تُقترح"""
+
+    def __init__(self, label, fields, filters=None, score=None):
+        self.label = label
+        # (اسم الحقل، نوع الاقتراح، دالة الرابط أو None لرابط الكائن)
+        self.fields = fields
+        self.filters = filters or {}
+        self.score = score or (lambda instance: 0)
+
+    @property
+    def model(self):
+        return apps.get_model(self.label)
+
+    def get_queryset(self):
+        return self.model.objects.filter(**self.filters)
+
+    def should_index(self, instance):
+        return all(getattr(instance, name) == value for name, value in self.filters.items())
+
+    def _variants(self, instance, field):
+        """قيم الحقل ونسخه اللغوية (field_ar, field_en...) إن وجدت"""
+        names = [field] + [f'{field}_{code}' for code, _ in settings.LANGUAGES]
+        concrete = {f.name for f in instance._meta.fields}
+        values = []
+        for name in names:
+            value = getattr(instance, name, None) if name in concrete else None
+            if value and value not in values:
+                values.append(value)
+        return values
+
+    def _urls(self, instance, url_func, text):
+        urls = {}
+        for code, _ in settings.LANGUAGES:
+            with translation.override(code):
+                try:
+                    urls[code] = url_func(instance, text) if url_func else instance.get_absolute_url()
+                except NoReverseMatch:
+                    urls[code] = None
+        return urls
+
+    def suggestions(self, instance):
+        """الاقتراحات التي ينتجها الكائن: dict بمفتاح (النوع، النص الموحد)"""
+        score = self.score(instance)
+        found = {}
+        for field, kind, url_func in self.fields:
+            for text in self._variants(instance, field):
+                suggestion = Suggestion(text, kind, self._urls(instance, url_func, text), score)
+                if suggestion.key:
+                    found.setdefault((kind, suggestion.key), suggestion)
+        return found
+
+
+def _popularity(boost):
+    def score(instance):
+        return boost + math.log1p(getattr(instance, 'views', 0) or 0)
+    return score
+
+
+def _book_author_url(book, author):
+    return '{}?{}'.format(reverse('books:list'), urlencode({'q': author}))
+
+
+AUTOCOMPLETE_SOURCES = {
+    'articles.article': AutocompleteSource(
+        'articles.article',
+        fields=[('title', 'article', None)],
+        filters={'status': 'published'},
+        score=_popularity(1.0),
+    ),
+    'articles.tag': AutocompleteSource(
+        'articles.tag',
+        fields=[('name', 'tag', None)],
+        score=_popularity(2.0),
+    ),
+    'articles.category': AutocompleteSource(
+        'articles.category',
+        fields=[('name', 'category', None)],
+        filters={'is_active': True},
+        score=lambda category: 3.0,
+    ),
+    'blog.category': AutocompleteSource(
+        'blog.category',
+        fields=[('name', 'category', None)],
+        filters={'is_active': True},
+        score=lambda category: 3.0,
+    ),
+    'books.book': AutocompleteSource(
+        'books.book',
+        fields=[
+            ('title', 'book', lambda book, text: reverse('books:detail', kwargs={'slug': book.slug})),
+            ('author', 'author', _book_author_url),
+        ],
+        filters={'status': 'published'},
+        score=_popularity(1.0),
+    ),
+    'pages.page': AutocompleteSource(
+        'pages.page',
+        fields=[('title', 'page', None)],
+        filters={'status': 'published'},
+        score=_popularity(0.5),
+    ),
+}
+
+
+class AutocompleteIndex:
+    """شجرة الاقتراحات للعملية الحالية مع تحديث تدريجي من سجل التغييرات المشترك"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._trie = None
+        self._suggestions = {}
+        self._by_object = {}
+        self.version = None
+        self._checked_at = 0.0
+
+    def _setting(self, name, default):
+        return getattr(settings, f'AUTOCOMPLETE_{name}', default)
+
+    def _shared_version(self):
+        return cache.get(VERSION_KEY, 0)
+
+    def _bump(self):
+        if not cache.add(VERSION_KEY, 1, None):
+            try:
+                return cache.incr(VERSION_KEY)
+            except ValueError:
+                cache.add(VERSION_KEY, 1, None)
+        return self._shared_version()
+
+    def _record(self, version, owner):
+        """تسجيل الكائن الذي غيّر الإصدار version لتعيد العمليات الأخرى تطبيقه"""
+        cache.set(CHANGE_KEY.format(version), owner, self._setting('CHANGE_TTL', 3600))
+
+    def _apply(self, owner, found):
+        """استبدال اقتراحات الكائن owner بالاقتراحات found (داخل القفل)"""
+        trie = self._trie
+        old = self._by_object.pop(owner, set())
+        for ident in old - set(found):
+            suggestion = self._suggestions.get(ident)
+            if suggestion is None:
+                continue
+            suggestion.owners.discard(owner)
+            if not suggestion.owners:
+                trie.remove(suggestion)
+                del self._suggestions[ident]
+
+        for ident, suggestion in found.items():
+            existing = self._suggestions.get(ident)
+            if existing is None:
+                if trie.size >= self._setting('MAX_ENTRIES', 50000):
+                    continue
+                existing = self._suggestions[ident] = suggestion
+                trie.insert(existing)
+            existing.owners.add(owner)
+        kept = {ident for ident in found if ident in self._suggestions}
+        if kept:
+            self._by_object[owner] = kept
+
+    def _build(self):
+        version = self._shared_version()
+        self._trie = PrefixTrie(self._setting('TOP_K', 10), self._setting('MAX_DEPTH', 24))
+        self._suggestions = {}
+        self._by_object = {}
+        for label, source in AUTOCOMPLETE_SOURCES.items():
+            for instance in source.get_queryset().iterator(chunk_size=1000):
+                self._apply((label, instance.pk), source.suggestions(instance))
+        self.version = version
+        self._checked_at = time.monotonic()
+
+    def _replay(self, version):
+        """تطبيق التغييرات المسجلة حتى الإصدار version؛ False إذا لزمت إعادة البناء"""
+        if self.version is None or not 0 < version - self.version <= self._setting('MAX_REPLAY', 500):
+            return False
+        keys = [CHANGE_KEY.format(v) for v in range(self.version + 1, version + 1)]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            return False
+        for label, pk in dict.fromkeys(changes[key] for key in keys):
+            source = AUTOCOMPLETE_SOURCES.get(label)
+            if source is None:
+                continue
+            instance = source.get_queryset().filter(pk=pk).first()
+            self._apply((label, pk), source.suggestions(instance) if instance is not None else {})
+        self.version = version
+        return True
+
+    def _ensure(self):
+        now = time.monotonic()
+        if self._trie is not None and now - self._checked_at < self._setting('CHECK_INTERVAL', 5):
+            return
+        with self._lock:
+            version = self._shared_version()
+            if self._trie is None or (self.version != version and not self._replay(version)):
+                try:
+                    self._build()
+                except Exception:
+                    logger.exception('Failed to build autocomplete index')
+                    if self._trie is None:
+                        raise
+            self._checked_at = now
+
+    def update(self, instance):
+        """إضافة اقتراحات الكائن أو تحديثها (أو حذفها إذا لم يعد منشوراً)"""
+        label = instance._meta.label_lower
+        source = AUTOCOMPLETE_SOURCES.get(label)
+        if source is None:
+            return
+        found = source.suggestions(instance) if source.should_index(instance) else {}
+        self._changed((label, instance.pk), found)
+
+    def remove(self, instance):
+        """حذف اقتراحات الكائن"""
+        label = instance._meta.label_lower
+        if label in AUTOCOMPLETE_SOURCES:
+            self._changed((label, instance.pk), {})
+
+    def _changed(self, owner, found):
+        with self._lock:
+            version = self._bump()
+            self._record(version, owner)
+            if self._trie is None:
+                return
+            # إذا تغيّر الإصدار من عملية أخرى أيضاً يطبق أول فحص كل التغييرات بالترتيب
+            if self.version is not None and version == self.version + 1:
+                self._apply(owner, found)
+                self.version = version
+
+    def suggest(self, prefix, limit=10, language=None):
+        """أفضل الاقتراحات التي تبدأ إحدى كلماتها بالبادئة"""
+        prefix = normalize_prefix(prefix)
+        if not prefix:
+            return []
+        self._ensure()
+        language = language or settings.LANGUAGE_CODE
+        return [s.as_dict(language) for s in self._trie.lookup(prefix, limit)]
+
+
+autocomplete_index = AutocompleteIndex()
@@ -0,0 +1,232 @@
+"""
+واجهات تنفيذ البحث
+
+- DatabaseBackend: قوائم المستندات في جدول SearchPosting وترتيب BM25 في بايثون
+  (تعمل على أي قاعدة بيانات، وهي المرجع الاحتياطي دائماً)
+- SQLiteFTS5Backend: جدول core_search_fts الافتراضي وترتيب bm25() المدمج
+- PostgresBackend: عمود search_vector مع فهرس GIN وترتيب ts_rank_cd
+
+الواجهات الأصلية تستقبل المصطلحات بعد التحليل (core.search.text)، لذلك
+يبقى التوحيد والتجذيع العربي واحداً في كل الواجهات.
+"""
+import logging
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Avg, Count
+
+from core.cache_versions import make_key
+from core.models import SearchDocument, SearchPosting
+
+logger = logging.getLogger(__name__)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+FTS_TABLE = 'core_search_fts'
+
+
+def namespace(label):
+    """مساحة الكاش (core.cache_versions) لفهرس مصدر"""
+    return f'search:{label}'
+
+
+class DatabaseBackend:
+    """فهرس مقلوب في جداول Django مع ترتيب BM25"""
+
+    name = 'database'
+
+    def sync(self, document, title_terms, body_terms):
+        """تحديث البنية الخاصة بالواجهة بعد كتابة المستند وقوائمه"""
+
+    def remove(self, document_ids):
+        """حذف المستندات من البنية الخاصة بالواجهة"""
+
+    def clear(self, label):
+        """حذف كل مستندات المصدر من البنية الخاصة بالواجهة"""
+
+    def stats(self, label):
+        """عدد المستندات ومتوسط الطول الموزون (مخزن حتى تغير الفهرس)"""
+        key = make_key(namespace(label), 'stats')
+        stats = cache.get(key)
+        if stats is None:
+            row = SearchDocument.objects.filter(content_label=label).aggregate(
+                total=Count('id'), avg_length=Avg('length')
+            )
+            stats = (row['total'], row['avg_length'] or 0.0)
+            cache.set(key, stats, None)
+        return stats
+
+    def search(self, label, terms, limit):
+        """
+        المستندات التي تحتوي كل المصطلحات مرتبة بـ BM25
+        تعيد (قائمة (object_id, score)، العدد الكلي)
+        """
+        total_docs, avg_length = self.stats(label)
+        if not total_docs:
+            return [], 0
+
+        postings = SearchPosting.objects.filter(content_label=label, term__in=terms)
+        frequencies = dict(
+            postings.values_list('term').annotate(df=Count('id')).order_by()
+        )
+        if len(frequencies) < len(terms):
+            return [], 0
+
+        # البدء بأندر مصطلح يقلل عدد الصفوف المقروءة لبقية المصطلحات
+        rarest = min(terms, key=frequencies.get)
+        candidates = SearchPosting.objects.filter(
+            content_label=label, term=rarest
+        ).values('document_id')
+        rows = postings.filter(document_id__in=candidates).values_list(
+            'document__object_id', 'document__length', 'term', 'weight'
+        )
+
+        matched = defaultdict(dict)
+        lengths = {}
+        for object_id, length, term, weight in rows.iterator(chunk_size=2000):
+            matched[object_id][term] = weight
+            lengths[object_id] = length
+
+        idf = {
+            term: math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+            for term, df in frequencies.items()
+        }
+        avg_length = avg_length or 1.0
+        hits = []
+        for object_id, weights in matched.items():
+            if len(weights) < len(terms):
+                continue
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[object_id] / avg_length)
+            score = sum(
+                idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+                for term, tf in weights.items()
+            )
+            hits.append((object_id, score))
+
+        hits.sort(key=lambda hit: (-hit[1], -hit[0]))
+        return hits[:limit], len(hits)
+
+
+class SQLiteFTS5Backend(DatabaseBackend):
+    """SQLite FTS5: المستند في core_search_fts بنفس معرف SearchDocument"""
+
+    name = 'fts5'
+    # أوزان الأعمدة في bm25(): content_label, title, body
+    COLUMN_WEIGHTS = (0.0, 2.0, 1.0)
+
+    @classmethod
+    def available(cls):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE]
+            )
+            return cursor.fetchone() is not None
+
+    def sync(self, document, title_terms, body_terms):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [document.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, content_label, title, body) VALUES (%s, %s, %s, %s)',
+                [document.pk, document.content_label, ' '.join(title_terms), ' '.join(body_terms)],
+            )
+
+    def remove(self, document_ids):
+        with connection.cursor() as cursor:
+            for document_id in document_ids:
+                cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [document_id])
+
+    def clear(self, label):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE content_label = %s', [label])
+
+    def search(self, label, terms, limit):
+        # المصطلحات محللة مسبقاً؛ علامات التنصيص تمنع تفسيرها كعوامل FTS5
+        match = ' AND '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+        weights = ', '.join(str(w) for w in self.COLUMN_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND content_label = %s',
+                [match, label],
+            )
+            total = cursor.fetchone()[0]
+            if not total:
+                return [], 0
+            cursor.execute(
+                f'SELECT d.object_id, bm25({FTS_TABLE}, {weights}) AS rank '
+                f'FROM {FTS_TABLE} JOIN core_searchdocument d ON d.id = {FTS_TABLE}.rowid '
+                f'WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.content_label = %s '
+                f'ORDER BY rank LIMIT %s',
+                [match, label, limit],
+            )
+            # bm25() في FTS5 سالبة: الأصغر هو الأفضل
+            return [(object_id, -rank) for object_id, rank in cursor.fetchall()], total
+
+
+class PostgresBackend(DatabaseBackend):
+    """PostgreSQL: عمود search_vector (العنوان وزن A والنص وزن B) مع فهرس GIN"""
+
+    name = 'postgres'
+
+    @classmethod
+    def available(cls):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = 'core_searchdocument' AND column_name = 'search_vector'"
+            )
+            return cursor.fetchone() is not None
+
+    def sync(self, document, title_terms, body_terms):
+        # إعداد 'simple' لأن التوحيد والتجذيع تمّا قبل الكتابة
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE core_searchdocument SET search_vector = "
+                "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B') "
+                "WHERE id = %s",
+                [' '.join(title_terms), ' '.join(body_terms), document.pk],
+            )
+
+    def search(self, label, terms, limit):
+        query = ' & '.join(terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT object_id, ts_rank_cd(search_vector, q) AS rank, COUNT(*) OVER () "
+                "FROM core_searchdocument, to_tsquery('simple', %s) q "
+                "WHERE content_label = %s AND search_vector @@ q "
+                "ORDER BY rank DESC, object_id DESC LIMIT %s",
+                [query, label, limit],
+            )
+            rows = cursor.fetchall()
+        total = rows[0][2] if rows else 0
+        return [(object_id, rank) for object_id, rank, _ in rows], total
+
+
+_backend = None
+
+
+def get_backend():
+    """
+    الواجهة المحددة في SEARCH_BACKEND: 'auto' أو 'database' أو 'fts5' أو 'postgres'
+    في وضع 'auto' تُستخدم الواجهة الأصلية لقاعدة البيانات إذا أنشأتها الهجرة
+    """
+    global _backend
+    if _backend is not None:
+        return _backend
+
+    choice = getattr(settings, 'SEARCH_BACKEND', 'auto')
+    candidates = {'fts5': SQLiteFTS5Backend, 'postgres': PostgresBackend}
+    if choice == 'auto':
+        choice = {'sqlite': 'fts5', 'postgresql': 'postgres'}.get(connection.vendor, 'database')
+
+    backend_class = candidates.get(choice)
+    try:
+        if backend_class is not None and backend_class.available():
+            _backend = backend_class()
+    except Exception:
+        logger.exception('Search backend %s is not available', choice)
+    if _backend is None:
+        _backend = DatabaseBackend()
+    return _backend
@@ -0,0 +1,137 @@
+"""
+محرك البحث: فهرسة الكائنات تدريجياً والبحث المرتب
+
+فهرسة كائن تعيد كتابة مستنده وقوائمه فقط، ثم ترفع جيل مساحة المصدر
+(search:<label>) فتبطل إحصائيات BM25 ونتائج البحث المخزنة لهذا المصدر.
+"""
+import hashlib
+import logging
+from collections import Counter, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.cache_versions import bump, make_key
+from core.models import SearchDocument, SearchPosting
+
+from .backends import DatabaseBackend, get_backend, namespace
+from .sources import PRIMARY_WEIGHT, get_source, source_for
+from .text import analyze
+
+logger = logging.getLogger(__name__)
+
+
+class SearchResult(namedtuple('SearchResult', ['hits', 'total'])):
+    """نتائج البحث: hits قائمة (object_id, score) مرتبة، و total عدد كل المطابقات"""
+
+    @property
+    def ids(self):
+        return [object_id for object_id, _ in self.hits]
+
+
+EMPTY_RESULT = SearchResult([], 0)
+
+
+class SearchEngine:
+    """فهرسة مصادر core.search.sources والبحث فيها"""
+
+    @property
+    def backend(self):
+        return get_backend()
+
+    def _terms(self, source, instance):
+        weights = Counter()
+        title_terms, body_terms = [], []
+        for text, weight in source.extract(instance):
+            terms = analyze(text)
+            for term in terms:
+                weights[term] += weight
+            (title_terms if weight >= PRIMARY_WEIGHT else body_terms).extend(terms)
+        return weights, title_terms, body_terms
+
+    def index_instance(self, instance):
+        """إضافة الكائن للفهرس أو تحديثه (أو حذفه إذا لم يعد قابلاً للفهرسة)"""
+        source = source_for(instance)
+        if source is None:
+            return
+        if not source.should_index(instance):
+            self.remove_instance(instance)
+            return
+
+        weights, title_terms, body_terms = self._terms(source, instance)
+        with transaction.atomic():
+            document, _ = SearchDocument.objects.update_or_create(
+                content_label=source.label,
+                object_id=instance.pk,
+                defaults={
+                    'title_text': ' '.join(title_terms),
+                    'body_text': ' '.join(body_terms),
+                    'length': float(sum(weights.values())),
+                },
+            )
+            document.postings.all().delete()
+            SearchPosting.objects.bulk_create([
+                SearchPosting(document=document, content_label=source.label, term=term, weight=weight)
+                for term, weight in weights.items()
+            ])
+            self.backend.sync(document, title_terms, body_terms)
+        bump(namespace(source.label))
+
+    def remove_instance(self, instance):
+        """حذف الكائن من الفهرس"""
+        source = source_for(instance)
+        if source is None:
+            return
+        documents = SearchDocument.objects.filter(content_label=source.label, object_id=instance.pk)
+        document_ids = list(documents.values_list('id', flat=True))
+        if not document_ids:
+            return
+        with transaction.atomic():
+            self.backend.remove(document_ids)
+            documents.delete()
+        bump(namespace(source.label))
+
+    def rebuild(self, label, chunk_size=500):
+        """إعادة بناء فهرس مصدر كامل، وتعيد عدد الكائنات المفهرسة"""
+        source = get_source(label)
+        if source is None:
+            raise ValueError(f'Unknown search source: {label}')
+
+        with transaction.atomic():
+            self.backend.clear(label)
+            SearchDocument.objects.filter(content_label=label).delete()
+        count = 0
+        for instance in source.get_queryset().iterator(chunk_size=chunk_size):
+            self.index_instance(instance)
+            count += 1
+        bump(namespace(label))
+        return count
+
+    def search(self, label, query, limit=None):
+        """
+        البحث في مصدر بنص حر (كل المصطلحات مطلوبة)
+        النتائج مخزنة حتى تتغير فهرسة المصدر
+        """
+        terms = list(dict.fromkeys(analyze(query)))
+        if not terms or get_source(label) is None:
+            return EMPTY_RESULT
+
+        limit = limit or getattr(settings, 'SEARCH_MAX_RESULTS', 1000)
+        digest = hashlib.md5(' '.join(sorted(terms)).encode('utf-8')).hexdigest()
+        key = make_key(namespace(label), 'q', digest, limit)
+        result = cache.get(key)
+        if result is None:
+            try:
+                hits, total = self.backend.search(label, terms, limit)
+            except Exception:
+                logger.exception('Search backend %s failed, using the database index', self.backend.name)
+                hits, total = DatabaseBackend.search(self.backend, label, terms, limit)
+            result = SearchResult(hits, total)
+            cache.set(key, tuple(result), getattr(settings, 'SEARCH_CACHE_TIMEOUT', 300))
+        else:
+            result = SearchResult(*result)
+        return result
+
+
+search_engine = SearchEngine()
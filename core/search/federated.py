@@ -0,0 +1,149 @@
+"""
+البحث الموحد في كل أنواع المحتوى
+
+يرسل الاستعلام لفهرس كل نوع بالتوازي (ThreadPoolExecutor)، بطلب واحد للفهرس
+وآخر لتحميل أفضل النتائج لكل نوع. العدد الكلي لكل نوع يأتي من الفهرس
+نفسه، والنتائج تُدمج حسب الدرجة مع حصة لكل نوع. الاستعلامات المتكررة تُخدم
+من ذاكرة LRU داخل العملية، مفتاحها الاستعلام بعد التحليل وأجيال فهارس الأنواع
+(فأي تعديل في محتوى نوع يُبطل نتائجه تلقائياً).
+"""
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.translation import gettext_lazy as _
+
+from core.cache_versions import get_versions
+
+from .backends import namespace
+from .engine import search_engine
+from .sources import get_source
+from .text import analyze
+
+logger = logging.getLogger(__name__)
+
+# نوع البحث في الرابط ← (مصدر الفهرس، العنوان)
+SEARCH_TYPES = OrderedDict([
+    ('articles', ('articles.article', _('Articles'))),
+    ('books', ('books.book', _('Books'))),
+    ('posts', ('blog.post', _('Blog Posts'))),
+    ('pages', ('pages.page', _('Pages'))),
+])
+
+
+class LRUCache:
+    """ذاكرة LRU صغيرة آمنة بين الخيوط"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class FederatedSearch:
+    """البحث في عدة فهارس بالتوازي ودمج النتائج"""
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self.cache = LRUCache(getattr(settings, 'SEARCH_LRU_SIZE', 256))
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'SEARCH_FEDERATED_WORKERS', 4),
+                    thread_name_prefix='search',
+                )
+            return self._executor
+
+    def _search_type(self, search_type, query, quota):
+        """بحث نوع واحد: النتائج من الفهرس ثم تحميل أفضل quota كائن"""
+        label, title = SEARCH_TYPES[search_type]
+        result = search_engine.search(label, query)
+        top = result.hits[:quota]
+        found = get_source(label).get_queryset().in_bulk([object_id for object_id, _ in top])
+        items = [(found[object_id], score) for object_id, score in top if object_id in found]
+        return {
+            'type': search_type,
+            'title': title,
+            'items': [item for item, _ in items],
+            'scores': [score for _, score in items],
+            'count': result.total,
+        }
+
+    def _run(self, search_type, query, quota):
+        # كل خيط يستخدم اتصاله الخاص بقاعدة البيانات، ويغلقه حسب CONN_MAX_AGE
+        close_old_connections()
+        try:
+            return self._search_type(search_type, query, quota)
+        finally:
+            close_old_connections()
+
+    def search(self, query, types=None, quota=None):
+        """
+        البحث في الأنواع المحددة (أو كلها)
+        تعيد dict فيه groups (مجموعة لكل نوع) و merged (أفضل النتائج من كل الأنواع)
+        """
+        types = [t for t in (types or SEARCH_TYPES) if t in SEARCH_TYPES]
+        quota = quota or getattr(settings, 'SEARCH_PER_TYPE', 5)
+        terms = sorted(set(analyze(query)))
+        if not terms or not types:
+            return {'groups': [], 'merged': [], 'total': 0}
+
+        versions = get_versions(*(namespace(SEARCH_TYPES[t][0]) for t in types))
+        key = (' '.join(terms), tuple(types), quota, tuple(sorted(versions.items())))
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+
+        if len(types) == 1:
+            groups = [self._search_type(types[0], query, quota)]
+        else:
+            futures = [self.executor.submit(self._run, t, query, quota) for t in types]
+            groups = [future.result() for future in futures]
+
+        merged = sorted(
+            (
+                (score, group['type'], item)
+                for group in groups
+                for item, score in zip(group['items'], group['scores'])
+            ),
+            key=lambda row: row[0],
+            reverse=True,
+        )
+        result = {
+            'groups': groups,
+            'merged': [{'type': t, 'item': item, 'score': score} for score, t, item in merged],
+            'total': sum(group['count'] for group in groups),
+        }
+        self.cache.set(key, result)
+        return result
+
+
+federated_search = FederatedSearch()
@@ -0,0 +1,126 @@
+"""
+مصادر المحتوى القابلة للفهرسة
+
+كل مصدر يحدد النموذج، الكائنات التي تُفهرس، والحقول مع أوزانها. الحقول التي
+وزنها PRIMARY_WEIGHT أو أكثر تُعامل كعنوان في واجهات FTS5 و tsvector.
+"""
+from django.apps import apps
+from django.utils.html import strip_tags
+
+PRIMARY_WEIGHT = 2.0
+
+
+class SearchSource:
+    """تعريف مصدر محتوى للبحث"""
+
+    def __init__(self, label, fields, filters=None, select_related=(), prefetch_related=()):
+        self.label = label
+        # (دالة تعيد النص من الكائن، الوزن)
+        self.fields = fields
+        self.filters = filters or {}
+        self.select_related = select_related
+        self.prefetch_related = prefetch_related
+
+    @property
+    def model(self):
+        return apps.get_model(self.label)
+
+    def get_queryset(self):
+        queryset = self.model.objects.filter(**self.filters)
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        return queryset
+
+    def should_index(self, instance):
+        return all(getattr(instance, name) == value for name, value in self.filters.items())
+
+    def extract(self, instance):
+        """قائمة (النص، الوزن) لكل حقل في الكائن"""
+        return [(getter(instance) or '', weight) for getter, weight in self.fields]
+
+
+def _field(attr):
+    return lambda instance: getattr(instance, attr)
+
+
+def _html(attr):
+    """نص حقل HTML (محرر النصوص) بدون الوسوم"""
+    return lambda instance: strip_tags(getattr(instance, attr) or '')
+
+
+def _related_name(attr):
+    def getter(instance):
+        related = getattr(instance, attr, None)
+        return getattr(related, 'name', None) or getattr(related, 'username', None)
+    return getter
+
+
+def _tag_names(instance):
+    return ' '.join(tag.name for tag in instance.tags.all())
+
+
+def _blog_category(post):
+    category = post.category
+    return f'{category.name_ar} {category.name_en}' if category else ''
+
+
+SEARCH_SOURCES = {
+    'articles.article': SearchSource(
+        'articles.article',
+        fields=[
+            (_field('title'), 3.0),
+            (_tag_names, 2.0),
+            (_related_name('category'), 1.5),
+            (_field('excerpt'), 1.5),
+            (_html('content'), 1.0),
+            (_related_name('author'), 1.0),
+        ],
+        filters={'status': 'published'},
+        select_related=('category', 'author'),
+        prefetch_related=('tags',),
+    ),
+    'books.book': SearchSource(
+        'books.book',
+        fields=[
+            (_field('title'), 3.0),
+            (_field('author'), 2.0),
+            (_field('excerpt'), 1.5),
+            (_field('publisher'), 1.0),
+            (_html('content'), 1.0),
+        ],
+        filters={'status': 'published'},
+    ),
+    'blog.post': SearchSource(
+        'blog.post',
+        fields=[
+            (_field('title'), 3.0),
+            (_field('seo_keywords'), 2.0),
+            (_blog_category, 1.5),
+            (_field('excerpt'), 1.5),
+            (_html('content'), 1.0),
+            (_related_name('author'), 1.0),
+        ],
+        filters={'status': 'published'},
+        select_related=('category', 'author'),
+    ),
+    'pages.page': SearchSource(
+        'pages.page',
+        fields=[
+            (_field('title'), 3.0),
+            (_field('seo_keywords'), 2.0),
+            (_field('excerpt'), 1.5),
+            (_html('content'), 1.0),
+        ],
+        filters={'status': 'published'},
+    ),
+}
+
+
+def get_source(label):
+    return SEARCH_SOURCES.get(label)
+
+
+def source_for(instance):
+    return SEARCH_SOURCES.get(instance._meta.label_lower)
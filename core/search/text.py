@@ -0,0 +1,82 @@
+"""
+تحليل النصوص للفهرسة والبحث (عربي/إنجليزي)
+
+- إزالة التشكيل والتطويل
+- توحيد أشكال الألف والياء والتاء المربوطة
+- تجزئة إلى كلمات وحذف كلمات التوقف
+- تجذيع خفيف (حذف السوابق واللواحق الشائعة) بدون قاموس
+"""
+import re
+import unicodedata
+
+# علامات التشكيل، الألف الخنجرية، والتطويل
+_DIACRITICS = re.compile('[\u064B-\u065F\u0670\u0640]')
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+_CHAR_MAP = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي',
+    'ة': 'ه',
+    'ؤ': 'و',
+    'ئ': 'ي',
+})
+
+# بعد التوحيد (لذلك "إلى" تصبح "الي")
+STOPWORDS = frozenset("""
+في من الي علي عن مع هذا هذه ذلك تلك التي الذي الذين او ان لا ما لم لن قد كان كانت هو هي هم
+ثم بين كل بعد قبل حتي اذا عند غير ايضا كما لكن و ف ب ل
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+""".split())
+
+_AR_PREFIXES = ('وال', 'بال', 'كال', 'فال', 'لل', 'ال')
+_AR_SUFFIXES = ('ها', 'ان', 'ات', 'ون', 'ين', 'يه', 'يا', 'ه', 'ي')
+MIN_TOKEN_LENGTH = 2
+MAX_TOKEN_LENGTH = 64
+
+
+def normalize(text):
+    """توحيد النص: حروف صغيرة، بدون تشكيل، وأشكال موحدة للحروف"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', str(text)).casefold()
+    text = _DIACRITICS.sub('', text)
+    return text.translate(_CHAR_MAP)
+
+
+def _is_arabic(token):
+    return '\u0600' <= token[0] <= '\u06FF'
+
+
+def stem(token):
+    """تجذيع خفيف يحافظ على ثلاثة أحرف على الأقل"""
+    if _is_arabic(token):
+        if len(token) > 3 and token[0] == 'و' and token[1:3] != 'ال':
+            token = token[1:]
+        for prefix in _AR_PREFIXES:
+            if token.startswith(prefix) and len(token) - len(prefix) >= 2:
+                token = token[len(prefix):]
+                break
+        for suffix in _AR_SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+                token = token[:-len(suffix)]
+                break
+        return token
+
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """كلمات النص بعد التوحيد (بدون تجذيع)"""
+    return [
+        token for token in _TOKEN.findall(normalize(text))
+        if MIN_TOKEN_LENGTH <= len(token) <= MAX_TOKEN_LENGTH and not token.isdigit()
+    ]
+
+
+def analyze(text):
+    """المصطلحات المفهرسة للنص: توحيد، حذف كلمات التوقف، ثم تجذيع"""
+    return [stem(token) for token in tokenize(text) if token not in STOPWORDS]
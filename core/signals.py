@@ -0,0 +1,132 @@
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from .models import SiteSetting
+from .site_settings import site_settings_provider
+from . import counting
+from .comment_tree import COMMENT_TREES, comment_trees
+from .related import RELATED_SOURCES, related_content
+from .search import search_engine
+from .sitemaps import SITEMAP_SECTIONS, sections_for, sitemaps
+from .cache_versions import bump
+from .page_cache import PAGE_CACHE_MODELS, content_namespace, content_type_namespace
+from .search.sources import SEARCH_SOURCES
+from .search.autocomplete import AUTOCOMPLETE_SOURCES, autocomplete_index
+
+@receiver(post_delete, sender=SiteSetting)
+def clear_site_settings_cache(sender, instance, **kwargs):
+    """مسح كاش إعدادات الموقع عند حذفها"""
+    site_settings_provider.invalidate()
+
+def update_search_index(sender, instance, raw=False, **kwargs):
+    """تحديث فهرس البحث للكائن (أو حذفه منه إذا لم يعد منشوراً)"""
+    if raw:
+        return
+    # الفهرسة بعد نجاح المعاملة حتى تكون العلاقات (مثل الوسوم) محفوظة
+    transaction.on_commit(lambda: search_engine.index_instance(instance))
+
+def remove_from_search_index(sender, instance, **kwargs):
+    """حذف الكائن من فهرس البحث"""
+    search_engine.remove_instance(instance)
+
+for label in SEARCH_SOURCES:
+    model = apps.get_model(label)
+    post_save.connect(update_search_index, sender=model, dispatch_uid=f'search_index_save:{label}')
+    post_delete.connect(remove_from_search_index, sender=model, dispatch_uid=f'search_index_delete:{label}')
+
+def update_autocomplete(sender, instance, raw=False, **kwargs):
+    """تحديث اقتراحات البحث للكائن"""
+    if raw:
+        return
+    transaction.on_commit(lambda: autocomplete_index.update(instance))
+
+def remove_from_autocomplete(sender, instance, **kwargs):
+    """حذف اقتراحات البحث للكائن"""
+    autocomplete_index.remove(instance)
+
+for label in AUTOCOMPLETE_SOURCES:
+    model = apps.get_model(label)
+    post_save.connect(update_autocomplete, sender=model, dispatch_uid=f'autocomplete_save:{label}')
+    post_delete.connect(remove_from_autocomplete, sender=model, dispatch_uid=f'autocomplete_delete:{label}')
+
+def update_related_content(sender, instance, raw=False, **kwargs):
+    """تعليم جيران الكائن لإعادة الحساب بعد حفظه"""
+    if raw or not getattr(settings, 'RELATED_CONTENT_INCREMENTAL', True):
+        return
+    transaction.on_commit(lambda: related_content.update(instance))
+
+def remove_related_content(sender, instance, **kwargs):
+    """حذف جيران الكائن المحسوبين"""
+    related_content.remove(instance)
+
+for label in RELATED_SOURCES:
+    model = apps.get_model(label)
+    post_save.connect(update_related_content, sender=model, dispatch_uid=f'related_save:{label}')
+    post_delete.connect(remove_related_content, sender=model, dispatch_uid=f'related_delete:{label}')
+
+def invalidate_comment_tree(sender, instance, raw=False, **kwargs):
+    """إبطال شجرة التعليقات المخزنة للكائن صاحب التعليق"""
+    if not raw:
+        comment_trees.invalidate(instance)
+
+for source in COMMENT_TREES.values():
+    model = source.model
+    post_save.connect(invalidate_comment_tree, sender=model, dispatch_uid=f'comment_tree_save:{source.comment_label}')
+    post_delete.connect(invalidate_comment_tree, sender=model, dispatch_uid=f'comment_tree_delete:{source.comment_label}')
+
+def schedule_sitemap(sender, instance, raw=False, **kwargs):
+    """إعادة توليد ملفات خريطة الموقع للقسم في الخلفية بعد الحفظ أو الحذف"""
+    if raw or not getattr(settings, 'SITEMAP_AUTO_BUILD', False):
+        return
+    for section in sections_for(instance._meta.label_lower):
+        transaction.on_commit(lambda name=section.name: sitemaps.schedule(name))
+
+for section in SITEMAP_SECTIONS.values():
+    model = section.model
+    post_save.connect(schedule_sitemap, sender=model, dispatch_uid=f'sitemap_save:{section.name}')
+    post_delete.connect(schedule_sitemap, sender=model, dispatch_uid=f'sitemap_delete:{section.name}')
+
+def purge_page_cache(sender, instance, raw=False, **kwargs):
+    """إبطال الصفحات المخزنة للزوار التي تعرض الكائن"""
+    if not raw:
+        label = instance._meta.label_lower
+        bump(content_namespace(label, instance.pk), content_type_namespace(label))
+
+for label in PAGE_CACHE_MODELS:
+    model = apps.get_model(label)
+    post_save.connect(purge_page_cache, sender=model, dispatch_uid=f'page_cache_save:{label}')
+    post_delete.connect(purge_page_cache, sender=model, dispatch_uid=f'page_cache_delete:{label}')
+
+def remember_counted_state(sender, instance, raw=False, **kwargs):
+    """حفظ الحالة السابقة للكائن لحساب فروق العدادات"""
+    if not raw:
+        counting.remember_state(instance)
+
+def update_counts_on_save(sender, instance, raw=False, **kwargs):
+    """تحديث عدادات المحتوى بعد الحفظ"""
+    if not raw:
+        counting.instance_saved(instance)
+
+def update_counts_on_delete(sender, instance, **kwargs):
+    """تحديث عدادات المحتوى بعد الحذف"""
+    counting.instance_deleted(instance)
+
+def _relation_receiver(counted):
+    def update_counts_on_relation(sender, instance, action, reverse, pk_set, **kwargs):
+        counting.relation_changed(counted, instance, action, reverse, pk_set)
+    return update_counts_on_relation
+
+for label, counted in counting.COUNTED_MODELS.items():
+    model = counted.model
+    pre_save.connect(remember_counted_state, sender=model, dispatch_uid=f'counts_pre_save:{label}')
+    post_save.connect(update_counts_on_save, sender=model, dispatch_uid=f'counts_save:{label}')
+    pre_delete.connect(remember_counted_state, sender=model, dispatch_uid=f'counts_pre_delete:{label}')
+    post_delete.connect(update_counts_on_delete, sender=model, dispatch_uid=f'counts_delete:{label}')
+    if counted.m2m:
+        through = getattr(model, counted.m2m[1]).through
+        m2m_changed.connect(
+            _relation_receiver(counted), sender=through, weak=False,
+            dispatch_uid=f'counts_m2m:{label}'
+        )
@@ -0,0 +1,101 @@
+"""
+مزود إعدادات الموقع (SiteSetting) المشترك بين الميدلوير ومعالجات السياق
+
+طبقتان من الكاش: نسخة داخل ذاكرة العملية لبضع ثوان، ثم الكاش المشترك.
+في وضع stale-while-revalidate تبقى القيمة القديمة في الكاش المشترك بعد
+انتهاء مدة حداثتها، ويقوم طلب واحد فقط (يحصل على قفل في الكاش) بإعادة
+تحميلها من قاعدة البيانات بينما تستمر بقية الطلبات بالقيمة القديمة.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache_versions import bump
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'site_settings'
+LOCK_KEY = 'site_settings:refresh'
+
+
+def default_site_settings():
+    """إعدادات افتراضية إذا لم يتم إعدادها"""
+    from .models import SiteSetting
+    return SiteSetting(
+        site_name="منصة التعليم",
+        site_description="منصة تعليمية متكاملة",
+        default_language="ar"
+    )
+
+
+class SiteSettingsProvider:
+    """قراءة SiteSetting مع كاش محلي ومشترك وإبطال عند الحفظ"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = None
+        self._local_expires = 0.0
+
+    def _setting(self, name, default):
+        return getattr(settings, f'SITE_SETTINGS_{name}', default)
+
+    def _load(self):
+        from .models import SiteSetting
+        instance = SiteSetting.objects.first()
+        fresh_until = time.time() + self._setting('FRESH_FOR', 300)
+        # None يعني عدم وجود إعدادات، ويُخزن حتى لا نستعلم في كل طلب
+        cache.set(CACHE_KEY, (instance, fresh_until), self._setting('CACHE_TIMEOUT', 3600))
+        return instance
+
+    def _fetch(self):
+        entry = cache.get(CACHE_KEY)
+        if not isinstance(entry, tuple):
+            return self._load()
+
+        instance, fresh_until = entry
+        if time.time() < fresh_until:
+            return instance
+
+        if not self._setting('STALE_WHILE_REVALIDATE', True):
+            return self._load()
+
+        # طلب واحد فقط يعيد التحميل، والبقية تستخدم القيمة القديمة
+        if cache.add(LOCK_KEY, 1, self._setting('REFRESH_LOCK_TIMEOUT', 30)):
+            try:
+                return self._load()
+            except Exception:
+                logger.exception('Failed to refresh site settings, serving stale value')
+            finally:
+                cache.delete(LOCK_KEY)
+        return instance
+
+    def get(self):
+        """إعدادات الموقع الحالية (أو الإعدادات الافتراضية)"""
+        now = time.monotonic()
+        with self._lock:
+            instance, expires = self._local, self._local_expires
+        if now >= expires:
+            instance = self._fetch()
+            with self._lock:
+                self._local = instance
+                self._local_expires = now + self._setting('LOCAL_TTL', 5)
+        return instance if instance is not None else default_site_settings()
+
+    def invalidate(self):
+        """مسح النسخة المحلية والمشتركة بعد حفظ الإعدادات أو حذفها"""
+        cache.delete(CACHE_KEY)
+        # الصفحات المخزنة لدى المتصفحات (ETag) تتضمن جيل الإعدادات
+        bump('site_settings')
+        with self._lock:
+            self._local = None
+            self._local_expires = 0.0
+
+
+site_settings_provider = SiteSettingsProvider()
+
+
+def get_site_settings():
+    return site_settings_provider.get()
@@ -0,0 +1,280 @@
+"""
+خرائط الموقع الثابتة
+
+لكل قسم (مقالات، صفحات، تدوينات، كتب) تُكتب ملفات sitemap مضغوطة بـ gzip،
+كل ملف يغطي نطاقاً ثابتاً من المعرفات (SITEMAP_CHUNK_SIZE معرف) فلا يتجاوز
+حد 50 ألف رابط، ثم فهرس sitemap.xml يشير إليها. الصفوف تُقرأ بـ values_list
+و iterator() وتُكتب مباشرة إلى ملف مؤقت يُستبدل بالملف النهائي.
+ملف manifest.json يحفظ لكل نطاق آخر تعديل (Max(updated_at)) وعدد الروابط،
+فإعادة التوليد تكتب النطاقات التي تغيرت فقط. أمر build_sitemaps يولد الكل
+(دورياً)، ومع SITEMAP_AUTO_BUILD يجدول الحفظ والحذف إعادة توليد القسم في خيط
+خلفي. التوليد محمي بقفل ملف (flock) فلا تتداخل قراءة manifest وكتابته بين
+العمليات.
+"""
+import gzip
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.db import close_old_connections
+from django.db.models import Count, F, IntegerField, Max
+from django.db.models.functions import Cast, Floor
+from django.urls import reverse
+from django.utils import translation
+
+try:
+    import fcntl
+except ImportError:  # Windows: القفل داخل العملية فقط
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = 'sitemap.xml'
+MANIFEST_NAME = 'manifest.json'
+LOCK_NAME = '.build.lock'
+# الحد الأقصى للروابط في ملف sitemap واحد حسب البروتوكول
+MAX_URLS = 50000
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+class SitemapSection:
+    """
+    قسم في خريطة الموقع
+    url_name: اسم الرابط المعكوس، ويُمرر له الحقل slug
+    """
+
+    def __init__(self, name, label, url_name, filters=None, lastmod_field='updated_at',
+                 changefreq='weekly', priority='0.5'):
+        self.name = name
+        self.label = label
+        self.url_name = url_name
+        self.filters = filters or {}
+        self.lastmod_field = lastmod_field
+        self.changefreq = changefreq
+        self.priority = priority
+
+    @property
+    def model(self):
+        return apps.get_model(self.label)
+
+    def get_queryset(self):
+        return self.model.objects.filter(**self.filters).order_by()
+
+    def should_include(self, instance):
+        return all(getattr(instance, name) == value for name, value in self.filters.items())
+
+    def filename(self, chunk):
+        return f'{self.name}-{chunk}.xml.gz'
+
+
+SITEMAP_SECTIONS = {
+    'articles': SitemapSection(
+        'articles', 'articles.article', 'articles:detail',
+        filters={'status': 'published'}, changefreq='weekly', priority='0.8',
+    ),
+    'pages': SitemapSection(
+        'pages', 'pages.page', 'pages:detail',
+        filters={'status': 'published', 'show_in_sitemap': True}, changefreq='monthly', priority='0.6',
+    ),
+    'posts': SitemapSection(
+        'posts', 'blog.post', 'blog:post_detail',
+        filters={'status': 'published'}, changefreq='weekly', priority='0.7',
+    ),
+    'books': SitemapSection(
+        'books', 'books.book', 'books:detail',
+        filters={'status': 'published'}, changefreq='monthly', priority='0.7',
+    ),
+}
+
+
+def sections_for(label):
+    return [section for section in SITEMAP_SECTIONS.values() if section.label == label]
+
+
+class SitemapBuilder:
+    """توليد ملفات الأقسام والفهرس على القرص"""
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        # الأقسام المجدولة ولم يبدأ توليدها بعد (لتجميع عدة حفظات في توليد واحد)
+        self._pending = set()
+
+    @property
+    def root(self):
+        return Path(getattr(settings, 'SITEMAP_ROOT', Path(settings.MEDIA_ROOT) / 'sitemaps'))
+
+    @property
+    def chunk_size(self):
+        return min(max(getattr(settings, 'SITEMAP_CHUNK_SIZE', 10000), 1), MAX_URLS)
+
+    def base_url(self):
+        protocol = getattr(settings, 'SITEMAP_PROTOCOL', 'https')
+        return f'{protocol}://{Site.objects.get_current().domain}'
+
+    def file_url(self, filename):
+        return f'{self.base_url()}{getattr(settings, "SITEMAP_URL", "/sitemaps/")}{filename}'
+
+    # ---------- manifest ----------
+
+    def load_manifest(self):
+        try:
+            with open(self.root / MANIFEST_NAME, encoding='utf-8') as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return {}
+
+    def save_manifest(self, manifest):
+        self._write_atomic(self.root / MANIFEST_NAME, lambda fp: json.dump(manifest, fp), mode='w')
+
+    def _write_atomic(self, path, write, mode='wb'):
+        """الكتابة في ملف مؤقت ثم استبداله، فلا يقرأ الزاحف ملفاً ناقصاً"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'.{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            if mode == 'gzip':
+                with gzip.open(tmp, 'wt', encoding='utf-8') as fp:
+                    write(fp)
+            else:
+                with open(tmp, mode, **({'encoding': 'utf-8'} if 'b' not in mode else {})) as fp:
+                    write(fp)
+            os.replace(tmp, path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    # ---------- chunks ----------
+
+    def chunk_states(self, section):
+        """لكل نطاق معرفات: [آخر تعديل، عدد الروابط] باستعلام تجميعي واحد"""
+        size = self.chunk_size
+        rows = section.get_queryset().annotate(
+            chunk=Cast(Floor(F('pk') / size), IntegerField())
+        ).values('chunk').annotate(
+            lastmod=Max(section.lastmod_field), total=Count('pk')
+        ).values_list('chunk', 'lastmod', 'total')
+        return {
+            str(chunk): [lastmod.isoformat() if lastmod else None, total]
+            for chunk, lastmod, total in rows
+        }
+
+    def _urls(self, section, chunk):
+        size = self.chunk_size
+        rows = section.get_queryset().filter(
+            pk__gte=chunk * size, pk__lt=(chunk + 1) * size
+        ).order_by('pk').values_list('slug', section.lastmod_field)
+        for slug, lastmod in rows.iterator(chunk_size=2000):
+            if slug:
+                yield reverse(section.url_name, kwargs={'slug': slug}), lastmod
+
+    def write_chunk(self, section, chunk):
+        base_url = self.base_url()
+
+        def write(fp):
+            fp.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{XMLNS}">\n')
+            for path, lastmod in self._urls(section, chunk):
+                fp.write(f'<url><loc>{escape(base_url + path)}</loc>')
+                if lastmod:
+                    fp.write(f'<lastmod>{lastmod.date().isoformat()}</lastmod>')
+                fp.write(f'<changefreq>{section.changefreq}</changefreq>'
+                         f'<priority>{section.priority}</priority></url>\n')
+            fp.write('</urlset>\n')
+
+        # الروابط بلغة الموقع الافتراضية (i18n_patterns تضيف البادئة)
+        with translation.override(settings.LANGUAGE_CODE):
+            self._write_atomic(self.root / section.filename(chunk), write, mode='gzip')
+
+    def build_section(self, section, manifest, force=False):
+        """إعادة كتابة النطاقات التي تغيرت في القسم، وتعيد عددها"""
+        states = self.chunk_states(section)
+        previous = manifest.get(section.name, {})
+        written = 0
+        for chunk, state in sorted(states.items(), key=lambda item: int(item[0])):
+            if force or previous.get(chunk) != state or not (self.root / section.filename(chunk)).exists():
+                self.write_chunk(section, int(chunk))
+                written += 1
+        for chunk in set(previous) - set(states):
+            # نطاق لم يعد فيه محتوى منشور
+            (self.root / section.filename(chunk)).unlink(missing_ok=True)
+        manifest[section.name] = states
+        return written
+
+    def write_index(self, manifest):
+        entries = []
+        for name, section in SITEMAP_SECTIONS.items():
+            for chunk, (lastmod, _) in sorted(manifest.get(name, {}).items(), key=lambda item: int(item[0])):
+                entries.append((self.file_url(section.filename(chunk)), lastmod))
+
+        def write(fp):
+            fp.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{XMLNS}">\n')
+            for url, lastmod in entries:
+                fp.write(f'<sitemap><loc>{escape(url)}</loc>')
+                if lastmod:
+                    fp.write(f'<lastmod>{lastmod}</lastmod>')
+                fp.write('</sitemap>\n')
+            fp.write('</sitemapindex>\n')
+
+        self._write_atomic(self.root / INDEX_NAME, write, mode='w')
+
+    @contextmanager
+    def _file_lock(self):
+        """قفل بين العمليات حول قراءة manifest وتعديله وكتابته"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / LOCK_NAME, 'a') as fp:
+            if fcntl is not None:
+                fcntl.flock(fp, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fp, fcntl.LOCK_UN)
+
+    def build(self, names=None, force=False):
+        """توليد الأقسام المحددة (أو كلها) ثم الفهرس، وتعيد عدد الملفات المكتوبة لكل قسم"""
+        with self._lock, self._file_lock():
+            manifest = self.load_manifest()
+            written = {}
+            for name in names or SITEMAP_SECTIONS:
+                written[name] = self.build_section(SITEMAP_SECTIONS[name], manifest, force=force)
+            self.write_index(manifest)
+            self.save_manifest(manifest)
+        return written
+
+    # ---------- background ----------
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sitemaps')
+        return self._executor
+
+    def schedule(self, name):
+        """توليد القسم في الخلفية (الجدولات المتكررة قبل بدء التوليد تُدمج)"""
+        if name in self._pending:
+            return
+        self._pending.add(name)
+        self.executor.submit(self._run, name)
+
+    def _run(self, name):
+        self._pending.discard(name)
+        close_old_connections()
+        try:
+            self.build([name])
+        except Exception:
+            logger.exception(f'Failed to build sitemap section {name}')
+        finally:
+            close_old_connections()
+
+    def index_path(self):
+        return self.root / INDEX_NAME
+
+
+sitemaps = SitemapBuilder()
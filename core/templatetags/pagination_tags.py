@@ -0,0 +1,24 @@
+from django import template
+from core.pagination import CURSOR_PARAM
+
+register = template.Library()
+
+@register.simple_tag(takes_context=True)
+def cursor_url(context, page, direction='next'):
+    """Query string for the next/previous keyset page, keeping the other GET params"""
+    cursor = page.next_cursor if direction == 'next' else page.previous_cursor
+    params = context['request'].GET.copy()
+    params.pop('page', None)
+    params.pop(CURSOR_PARAM, None)
+    if cursor:
+        params[CURSOR_PARAM] = cursor
+    query = params.urlencode()
+    return f'?{query}' if query else '?'
+
+@register.inclusion_tag('partials/cursor_pagination.html', takes_context=True)
+def cursor_pagination(context, page):
+    """Previous/next links for a KeysetPage"""
+    return {
+        'request': context['request'],
+        'page': page,
+    }
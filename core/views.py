@@ -1,9 +1,17 @@
+import hashlib
+from django.conf import settings
 from django.shortcuts import render
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_GET
 from django.db.models import Count
 from django.utils.translation import gettext_lazy as _
 from articles.models import Article
 from books.models import Book
 from blog.models import Post, Category
+from .search import federated_search, autocomplete_index, SEARCH_TYPES
+from .counting import counts
+from .sitemaps import SITEMAP_SECTIONS, sitemaps
 
 def home(request):    
     # المقالات المميزة
@@ -23,8 +31,8 @@ def home(request):
     
     # الإحصائيات
     stats = {
-        'total_articles': Article.objects.filter(status='published').count(),
-        'total_books': Book.objects.filter(status='published').count(),
+        'total_articles': counts.count('articles.article', queryset=Article.objects.filter(status='published')),
+        'total_books': counts.count('books.book', queryset=Book.objects.filter(status='published')),
         'total_students': 1250,  # في التطبيق الحقيقي، سيتم حسابها من قاعدة البيانات
     }
     stats_fallback = {
@@ -63,65 +71,74 @@ def search(request):
     search_type = request.GET.get('type', 'all')
     
     results = []
+    merged = []
     
     if query:
-        if search_type in ['all', 'courses']:
-            courses = Course.objects.filter(
-                status='published',
-                title__icontains=query
-            )[:5]
-            results.append({
-                'type': 'courses',
-                'title': _('Courses'),
-                'items': courses,
-                'count': courses.count(),
-            })
-        
-        if search_type in ['all', 'articles']:
-            articles = Article.objects.filter(
-                status='published',
-                title__icontains=query
-            )[:5]
-            results.append({
-                'type': 'articles',
-                'title': _('Articles'),
-                'items': articles,
-                'count': articles.count(),
-            })
-        
-        if search_type in ['all', 'books']:
-            books = Book.objects.filter(
-                status='published',
-                title__icontains=query
-            )[:5]
-            results.append({
-                'type': 'books',
-                'title': _('Books'),
-                'items': books,
-                'count': books.count(),
-            })
-        
-        if search_type in ['all', 'scholarships']:
-            scholarships = Scholarship.objects.filter(
-                status='published',
-                title__icontains=query
-            )[:5]
-            results.append({
-                'type': 'scholarships',
-                'title': _('Scholarships'),
-                'items': scholarships,
-                'count': scholarships.count(),
-            })
+        # بحث متوازٍ في فهارس كل الأنواع (أو النوع المحدد فقط)
+        types = None if search_type == 'all' else [search_type]
+        found = federated_search.search(query, types)
+        results = found['groups']
+        merged = found['merged']
     
     context = {
         'query': query,
         'search_type': search_type,
+        'search_types': [(key, title) for key, (label, title) in SEARCH_TYPES.items()],
         'results': results,
+        'merged_results': merged,
         'has_results': any(r['count'] > 0 for r in results),
     }
     
     return render(request, 'core/search.html', context)
 
+@require_GET
+def search_autocomplete(request):
+    """اقتراحات البحث أثناء الكتابة (JSON)"""
+    query = request.GET.get('q', '')[:100]
+    try:
+        limit = min(max(int(request.GET.get('limit', 8)), 1), 20)
+    except ValueError:
+        limit = 8
+    language = getattr(request, 'LANGUAGE_CODE', settings.LANGUAGE_CODE)
+    
+    suggestions = autocomplete_index.suggest(query, limit, language)
+    
+    # ETag من إصدار الفهرس والطلب، فتعيد المتصفحات والبروكسي استخدام الاستجابة
+    etag = '"{}"'.format(hashlib.md5(
+        f'{autocomplete_index.version}:{language}:{limit}:{query}'.encode('utf-8')
+    ).hexdigest())
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse(
+            {'query': query, 'suggestions': suggestions},
+            json_dumps_params={'ensure_ascii': False},
+        )
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=getattr(settings, 'AUTOCOMPLETE_MAX_AGE', 300))
+    return response
+
+@require_GET
+def sitemap_index(request):
+    """فهرس خريطة الموقع المولد مسبقاً"""
+    path = sitemaps.index_path()
+    if not path.exists():
+        # أول طلب قبل تشغيل build_sitemaps: التوليد في الخلفية
+        for name in SITEMAP_SECTIONS:
+            sitemaps.schedule(name)
+        response = HttpResponse(status=503)
+        response['Retry-After'] = '120'
+        return response
+    return FileResponse(open(path, 'rb'), content_type='application/xml')
+
+@require_GET
+def sitemap_file(request, filename):
+    """ملف قسم مضغوط (في الإنتاج يخدمه خادم الويب مباشرة من SITEMAP_ROOT)"""
+    path = sitemaps.root / filename
+    if '/' in filename or not filename.endswith('.xml.gz') or not path.is_file():
+        raise Http404
+    return FileResponse(open(path, 'rb'), content_type='application/gzip')
+
 def privacy_policy(request):
     """سياسة الخصوصية"""
     return render(request, 'core/privacy.html')
@@ -4,6 +4,7 @@ from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
 from django.urls import reverse
 from ckeditor.widgets import CKEditorWidget
+from core.comment_tree import comment_trees
 from .models import Page, PageComment, PageRating, PageView
 from .forms import PageForm
 import csv
@@ -212,13 +213,19 @@ class PageCommentAdmin(admin.ModelAdmin):
         return obj.content[:100] + '...' if len(obj.content) > 100 else obj.content
     content_preview.short_description = _('Content')
     
+    def _update_comments(self, queryset, **fields):
+        # update() sends no signals, so the cached comment trees are invalidated explicitly
+        page_ids = set(queryset.values_list('page_id', flat=True))
+        queryset.update(**fields)
+        comment_trees.invalidate_objects('pages.page', page_ids)
+    
     def approve_comments(self, request, queryset):
-        queryset.update(is_approved=True)
+        self._update_comments(queryset, is_approved=True)
         self.message_user(request, _('Selected comments have been approved.'))
     approve_comments.short_description = _('Approve selected comments')
     
     def disapprove_comments(self, request, queryset):
-        queryset.update(is_approved=False)
+        self._update_comments(queryset, is_approved=False)
         self.message_user(request, _('Selected comments have been disapproved.'))
     disapprove_comments.short_description = _('Disapprove selected comments')
 
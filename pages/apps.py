@@ -4,4 +4,8 @@ from django.utils.translation import gettext_lazy as _
 class PagesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pages'
-    verbose_name = _('Pages')
\ No newline at end of file
+    verbose_name = _('Pages')
+    
+    def ready(self):
+        # Connect cache invalidation and notification signals
+        import pages.signals
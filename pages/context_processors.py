@@ -1,36 +1,39 @@
+from django.db.models import Sum
+
+from core.global_context import global_context
 from .models import Page
 
-def pages_menu(request):
-    """Add pages menu to all templates"""
-    if request.user.is_authenticated:
-        # Show all pages for authenticated users
-        menu_pages = Page.objects.filter(
-            status__in=['published', 'private'],
-            show_in_menu=True,
-            parent__isnull=True
-        ).order_by('order')
-    else:
-        # Show only published pages for anonymous users
-        menu_pages = Page.objects.filter(
-            status='published',
-            show_in_menu=True,
-            parent__isnull=True
-        ).order_by('order')
-    
+
+def _menu_pages(request):
+    """Top-level menu pages (private pages only for authenticated users)"""
+    statuses = ['published', 'private'] if request.user.is_authenticated else ['published']
+    return list(Page.objects.filter(
+        status__in=statuses,
+        show_in_menu=True,
+        parent__isnull=True
+    ).order_by('order'))
+
+
+def _page_stats(request):
+    """Page statistics, materialized so the cached value never re-queries"""
     return {
-        'menu_pages': menu_pages
+        'total_published_pages': Page.objects.filter(status='published').count(),
+        'total_views': Page.objects.aggregate(Sum('views'))['views__sum'] or 0,
+        'popular_pages': list(Page.objects.filter(status='published').order_by('-views')[:5]),
     }
 
+
+global_context.register(
+    'menu_pages', _menu_pages, namespace='page_list',
+    vary=lambda request: 'auth' if request.user.is_authenticated else 'anon',
+)
+global_context.register('page_stats', _page_stats, namespace='page_list')
+
+
+def pages_menu(request):
+    """Add pages menu to all templates"""
+    return global_context.items(request, 'menu_pages')
+
 def page_stats(request):
     """Add page statistics to context"""
-    from django.db.models import Count
-    
-    stats = {
-        'total_published_pages': Page.objects.filter(status='published').count(),
-        'total_views': Page.objects.aggregate(Sum('views'))['views__sum'] or 0,
-        'popular_pages': Page.objects.filter(status='published').order_by('-views')[:5],
-    }
-    
-    return {
-        'page_stats': stats
-    }
\ No newline at end of file
+    return global_context.items(request, 'page_stats')
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.10 on 2026-10-17 02:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='page',
+            name='reading_time',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Reading Time (minutes)'),
+        ),
+        migrations.AddField(
+            model_name='page',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Word Count'),
+        ),
+    ]
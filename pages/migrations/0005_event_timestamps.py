@@ -0,0 +1,19 @@
+# Generated by Django 5.2.10 on 2026-10-17 03:15
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0004_content_derived_fields'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pageview',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -1,10 +1,14 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
+from django.utils import timezone
 from django.urls import reverse
 from ckeditor.fields import RichTextField
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
+from core.counters import record_view
+from core.related import related_content
+from core.content import derive_content
 
 class Page(models.Model):
     PAGE_STATUS = [
@@ -27,6 +31,8 @@ class Page(models.Model):
     slug = models.SlugField(unique=True, max_length=250)
     content = RichTextField(_('Content'))
     excerpt = models.TextField(_('Excerpt'), blank=True, max_length=500)
+    word_count = models.PositiveIntegerField(_('Word Count'), default=0, editable=False)
+    reading_time = models.PositiveIntegerField(_('Reading Time (minutes)'), default=1, editable=False)
     featured_image = models.ImageField(
         upload_to='pages/%Y/%m/%d/',
         blank=True,
@@ -81,9 +87,8 @@ class Page(models.Model):
         if not self.seo_title:
             self.seo_title = self.title
         
-        # Auto-generate excerpt from content if empty
-        if not self.excerpt and self.content:
-            self.excerpt = self.content[:497] + '...' if len(self.content) > 500 else self.content
+        # Plain-text excerpt, SEO description, word count and reading time from the content
+        derive_content(self)
         
         super().save(*args, **kwargs)
     
@@ -128,16 +133,18 @@ class Page(models.Model):
         return True
     
     def get_related_pages(self, limit=5):
-        """Get related pages based on category/tags or similar content"""
-        # Implementation can be extended based on requirements
-        return Page.objects.filter(
+        """Get related pages from the precomputed neighbours (core.related)"""
+        # Pages not scored yet fall back to their siblings
+        fallback = Page.objects.filter(
             status='published',
             parent=self.parent
-        ).exclude(id=self.id)[:limit]
+        ).exclude(id=self.id)
+        return related_content.related(self, limit, fallback=fallback)
     
     def increment_views(self):
-        self.views = models.F('views') + 1
-        self.save(update_fields=['views'])
+        # Buffered write-behind increment; the in-memory value is for display only
+        record_view(self)
+        self.views += 1
 
 
 class PageComment(models.Model):
@@ -180,7 +187,8 @@ class PageView(models.Model):
     ip_address = models.GenericIPAddressField()
     user_agent = models.TextField(blank=True)
     referrer = models.URLField(blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # وقت الحدث نفسه (يُمرر من طابور التحليلات) وليس وقت الكتابة
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         verbose_name = _('Page View')
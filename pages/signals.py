@@ -1,33 +1,31 @@
+from django.conf import settings
 from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
-from django.core.cache import cache
-from django.contrib.auth.models import User
-from .models import Page, PageComment
+from core.cache_versions import bump
+from .models import Page, PageComment, PageRating
 
 @receiver(post_save, sender=Page)
 def clear_page_cache(sender, instance, **kwargs):
     """Clear cache when page is saved"""
-    # Clear detail page cache
-    cache_key = f'page_detail_{instance.slug}_*'
-    cache.delete_pattern(cache_key)
-    
-    # Clear list page cache
-    cache.delete('page_list')
-    
-    # Clear sitemap cache
-    cache.delete('pages_sitemap')
+    # Clear detail and list page caches
+    bump(f'page:{instance.slug}', 'page_list')
 
 @receiver(pre_delete, sender=Page)
 def clear_cache_on_delete(sender, instance, **kwargs):
     """Clear cache when page is deleted"""
-    cache_key = f'page_detail_{instance.slug}_*'
-    cache.delete_pattern(cache_key)
-    cache.delete('page_list')
-    cache.delete('pages_sitemap')
+    bump(f'page:{instance.slug}', 'page_list')
+
+@receiver(post_save, sender=PageRating)
+@receiver(pre_delete, sender=PageRating)
+def clear_cache_on_rating(sender, instance, **kwargs):
+    """The average rating is part of the cached page"""
+    bump(f'page:{instance.page.slug}')
 
 @receiver(post_save, sender=PageComment)
 def send_comment_notification(sender, instance, created, **kwargs):
-    """Send email notification for new comments"""
+    """Send email notification for new comments (enabled by PAGE_COMMENT_NOTIFICATIONS)"""
+    if not getattr(settings, 'PAGE_COMMENT_NOTIFICATIONS', False):
+        return
     if created and instance.is_approved:
         # Send notification to page author
         page_author = instance.page.author
@@ -46,7 +44,7 @@ def send_comment_notification(sender, instance, created, **kwargs):
             send_mail(
                 subject=subject,
                 message=plain_message,
-                from_email='noreply@example.com',
+                from_email=settings.DEFAULT_FROM_EMAIL,
                 recipient_list=[page_author.email],
                 html_message=html_message,
                 fail_silently=True
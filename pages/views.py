@@ -1,17 +1,21 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.http import Http404, JsonResponse, HttpResponseForbidden
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
 from django.db.models import Q, Count, Avg
 from django.views.decorators.http import require_POST
-from django.views.decorators.cache import cache_page
 from django.views.generic import ListView, DetailView
-from django.core.cache import cache
 import json
 
-from .models import Page, PageComment, PageRating, PageView
+from core.analytics import record_page_view
+from core.conditional import conditional_content
+from core.page_cache import cache_anonymous, depends
+from core.pagination import paginate, KeysetPaginationMixin
+from core.comment_tree import comment_trees, namespace as comment_tree_namespace
+from core.related import namespace as related_namespace
+
+from .models import Page, PageComment, PageRating
 from .forms import PageCommentForm, PageRatingForm, PageSearchForm
 
 def get_client_ip(request):
@@ -23,16 +27,20 @@ def get_client_ip(request):
         ip = request.META.get('REMOTE_ADDR')
     return ip
 
-@cache_page(60 * 15)  # Cache for 15 minutes
+def track_page_view(request, page):
+    """Record a view answered with 304 Not Modified"""
+    page.increment_views()
+    record_page_view(request, page)
+
+@cache_anonymous(60 * 15, namespaces=('page:{slug}',), track=track_page_view)  # Anonymous visitors, 15 minutes
+@conditional_content(
+    'pages.page',
+    filters={'status': 'published'},
+    namespaces=('page:{slug}', comment_tree_namespace('pages.page', '{pk}'), related_namespace('pages.page')),
+    track=track_page_view,
+)
 def page_detail(request, slug):
     """Display single page with enhanced features"""
-    # Try to get from cache first
-    cache_key = f'page_detail_{slug}_{request.LANGUAGE_CODE}'
-    cached_page = cache.get(cache_key)
-    
-    if cached_page and not request.user.is_staff:
-        return cached_page
-    
     page = get_object_or_404(Page, slug=slug)
     
     # Check page accessibility
@@ -47,13 +55,11 @@ def page_detail(request, slug):
     if not request.user.is_staff:  # Don't track admin views
         page.increment_views()
         
-        # Save detailed view info
-        PageView.objects.create(
-            page=page,
-            ip_address=get_client_ip(request),
-            user_agent=request.META.get('HTTP_USER_AGENT', ''),
-            referrer=request.META.get('HTTP_REFERER', '')
-        )
+        # Queue detailed view info; written in batches by the analytics pipeline
+        record_page_view(request, page)
+    
+    # Cached anonymous copies are purged when the page, its comments or related pages change
+    depends(request, page, comment_tree_namespace('pages.page', page.pk), related_namespace('pages.page'))
     
     # Get sidebar pages
     sidebar_pages = None
@@ -63,8 +69,9 @@ def page_detail(request, slug):
             show_in_menu=True
         ).exclude(id=page.id).order_by('-views')[:5]
     
-    # Get comments
-    comments = page.comments.filter(is_approved=True).order_by('-created_at')
+    # Get comment threads (one query, cached until a comment changes)
+    comment_tree = comment_trees.get(page)
+    comments = comment_tree.page(request.GET.get('comments_page'))
     
     # Get average rating
     avg_rating = page.ratings.aggregate(Avg('rating'))['rating__avg'] or 0
@@ -88,6 +95,7 @@ def page_detail(request, slug):
         'sidebar_pages': sidebar_pages,
         'breadcrumbs': page.get_breadcrumbs(),
         'comments': comments,
+        'comments_count': comment_tree.total,
         'comment_form': comment_form,
         'rating_form': rating_form,
         'avg_rating': round(avg_rating, 1),
@@ -102,13 +110,7 @@ def page_detail(request, slug):
     # Use appropriate template
     template_name = f'pages/{page.template}.html'
     
-    response = render(request, template_name, context)
-    
-    # Cache the response
-    if page.status == 'published':
-        cache.set(cache_key, response, 60 * 15)
-    
-    return response
+    return render(request, template_name, context)
 
 def page_list(request):
     """Display all pages with filtering and pagination"""
@@ -142,16 +144,8 @@ def page_list(request):
         if date_to:
             pages = pages.filter(created_at__date__lte=date_to)
     
-    # Pagination
-    paginator = Paginator(pages, 12)  # 12 pages per page
-    page_number = request.GET.get('page')
-    
-    try:
-        page_obj = paginator.page(page_number)
-    except PageNotAnInteger:
-        page_obj = paginator.page(1)
-    except EmptyPage:
-        page_obj = paginator.page(paginator.num_pages)
+    # Keyset pagination (12 pages per page)
+    page_obj = paginate(request, pages, 12)
     
     context = {
         'pages': page_obj,
@@ -240,19 +234,8 @@ def add_rating(request, slug):
     return redirect(page.get_absolute_url())
 
 def page_sitemap(request):
-    """Generate sitemap for pages"""
-    pages = Page.objects.filter(
-        status='published',
-        show_in_sitemap=True,
-        parent__isnull=True
-    ).order_by('-updated_at')
-    
-    context = {
-        'pages': pages,
-        'lastmod': pages.first().updated_at if pages.exists() else None,
-    }
-    
-    return render(request, 'pages/sitemap.xml', context, content_type='application/xml')
+    """Pages are listed in the static sitemap index"""
+    return redirect('sitemap_index', permanent=True)
 
 def page_search(request):
     """Advanced search for pages"""
@@ -294,7 +277,7 @@ def page_preview(request, slug):
     
     return render(request, f'pages/{page.template}.html', context)
 
-class PageListView(ListView):
+class PageListView(KeysetPaginationMixin, ListView):
     """Class-based view for page list"""
     model = Page
     template_name = 'pages/list_class.html'
@@ -351,6 +334,8 @@ class PageDetailView(DetailView):
         if not self.request.user.is_staff:
             page.increment_views()
         
+        comment_tree = comment_trees.get(page)
+        
         # Add additional context
         context.update({
             'sidebar_pages': Page.objects.filter(
@@ -358,7 +343,8 @@ class PageDetailView(DetailView):
                 show_in_menu=True
             ).exclude(id=page.id).order_by('-views')[:5],
             'breadcrumbs': page.get_breadcrumbs(),
-            'comments': page.comments.filter(is_approved=True).order_by('-created_at'),
+            'comments': comment_tree.page(self.request.GET.get('comments_page')),
+            'comments_count': comment_tree.total,
             'comment_form': PageCommentForm(),
             'rating_form': PageRatingForm(),
             'avg_rating': page.ratings.aggregate(Avg('rating'))['rating__avg'] or 0,